@@ -0,0 +1,33 @@
+"""include processing in outbox pending index
+
+Revision ID: a7c9e1f3b5d6
+Revises: e6a8c0e2b4d5
+Create Date: 2026-10-15 20:02:45.381207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1f3b5d6'
+down_revision: Union[str, Sequence[str], None] = 'e6a8c0e2b4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_outbox_pending', table_name='outbox', postgresql_concurrently=True)
+        op.create_index('ix_outbox_pending', 'outbox', ['status', 'scheduled_at'], unique=False, postgresql_where=sa.text("status IN ('pending', 'processing', 'failed')"), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_outbox_pending', table_name='outbox', postgresql_concurrently=True)
+        op.create_index('ix_outbox_pending', 'outbox', ['status', 'scheduled_at'], unique=False, postgresql_where=sa.text("status IN ('pending', 'failed')"), postgresql_concurrently=True)
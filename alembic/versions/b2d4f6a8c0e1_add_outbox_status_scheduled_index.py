@@ -0,0 +1,35 @@
+"""add outbox status scheduled index
+
+Revision ID: b2d4f6a8c0e1
+Revises: f1a3c5e7b9d2
+Create Date: 2026-10-15 18:41:37.502916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c0e1'
+down_revision: Union[str, Sequence[str], None] = 'f1a3c5e7b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_outbox_status_scheduled', 'outbox', ['status', 'scheduled_at'], unique=False, postgresql_using='btree', postgresql_concurrently=True)
+        op.drop_index('ix_outbox_scheduled_at', table_name='outbox', postgresql_concurrently=True)
+        op.drop_index('ix_outbox_status', table_name='outbox', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_outbox_status', 'outbox', ['status'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_outbox_scheduled_at', 'outbox', ['scheduled_at'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_outbox_status_scheduled', table_name='outbox', postgresql_concurrently=True)
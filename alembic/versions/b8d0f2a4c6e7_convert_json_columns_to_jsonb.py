@@ -0,0 +1,52 @@
+"""convert json columns to jsonb
+
+Revision ID: b8d0f2a4c6e7
+Revises: a7c9e1f3b5d6
+Create Date: 2026-10-15 20:31:12.604518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d0f2a4c6e7'
+down_revision: Union[str, Sequence[str], None] = 'a7c9e1f3b5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = (
+    ('meters', 'meter_metadata'),
+    ('outbox', 'payload'),
+    ('photos', 'exif_data'),
+    ('task_results', 'params'),
+    ('task_results', 'result'),
+    ('task_results', 'progress'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, column_name in JSON_COLUMNS:
+        op.alter_column(
+            table_name, column_name,
+            existing_type=sa.JSON(),
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using=f'{column_name}::jsonb',
+        )
+    op.alter_column('meters', 'meter_metadata', server_default=sa.text("'{}'::jsonb"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('meters', 'meter_metadata', server_default=None)
+    for table_name, column_name in JSON_COLUMNS:
+        op.alter_column(
+            table_name, column_name,
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            type_=sa.JSON(),
+            postgresql_using=f'{column_name}::json',
+        )
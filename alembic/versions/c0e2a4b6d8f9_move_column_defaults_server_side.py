@@ -0,0 +1,41 @@
+"""move column defaults server side
+
+Revision ID: c0e2a4b6d8f9
+Revises: b8d0f2a4c6e7
+Create Date: 2026-10-15 20:48:37.219064
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0e2a4b6d8f9'
+down_revision: Union[str, Sequence[str], None] = 'b8d0f2a4c6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SERVER_DEFAULTS = (
+    ('meters', 'status', "'active'"),
+    ('outbox', 'retry_count', '0'),
+    ('outbox', 'max_retries', '5'),
+    ('outbox', 'status', "'pending'"),
+    ('outbox', 'scheduled_at', 'now()'),
+    ('photos', 'upload_status', "'pending'"),
+    ('readings', 'reading_type', "'manual'"),
+    ('readings', 'sync_status', "'synced'"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, column_name, default in SERVER_DEFAULTS:
+        op.alter_column(table_name, column_name, server_default=sa.text(default))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name, column_name, _ in SERVER_DEFAULTS:
+        op.alter_column(table_name, column_name, server_default=None)
@@ -0,0 +1,37 @@
+"""add outbox and photo partial indexes
+
+Revision ID: d4f6a8c0e2b3
+Revises: b2d4f6a8c0e1
+Create Date: 2026-10-15 19:07:52.118034
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f6a8c0e2b3'
+down_revision: Union[str, Sequence[str], None] = 'b2d4f6a8c0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_outbox_pending', 'outbox', ['status', 'scheduled_at'], unique=False, postgresql_where=sa.text("status IN ('pending', 'failed')"), postgresql_concurrently=True)
+        op.drop_index('ix_outbox_status_scheduled', table_name='outbox', postgresql_concurrently=True)
+        op.create_index('ix_photos_upload_status_pending', 'photos', ['created_at'], unique=False, postgresql_where=sa.text("upload_status = 'pending'"), postgresql_concurrently=True)
+        op.drop_index('ix_photos_upload_status', table_name='photos', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_photos_upload_status', 'photos', ['upload_status'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_photos_upload_status_pending', table_name='photos', postgresql_concurrently=True)
+        op.create_index('ix_outbox_status_scheduled', 'outbox', ['status', 'scheduled_at'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_outbox_pending', table_name='outbox', postgresql_concurrently=True)
@@ -0,0 +1,45 @@
+"""convert reading photos to jsonb
+
+Revision ID: e6a8c0e2b4d5
+Revises: d4f6a8c0e2b3
+Create Date: 2026-10-15 19:34:10.662419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a8c0e2b4d5'
+down_revision: Union[str, Sequence[str], None] = 'd4f6a8c0e2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'readings', 'photos',
+        existing_type=postgresql.ARRAY(sa.String()),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=False,
+        server_default=sa.text("'[]'::jsonb"),
+        postgresql_using='to_jsonb(photos)',
+    )
+    # CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_readings_photos_gin', 'readings', ['photos'], unique=False, postgresql_using='gin', postgresql_ops={'photos': 'jsonb_path_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_readings_photos_gin', table_name='readings', postgresql_concurrently=True)
+    # Pas de sous-requête possible dans ALTER ... USING : passage par une colonne temporaire
+    op.add_column('readings', sa.Column('photos_array', postgresql.ARRAY(sa.String()), nullable=True))
+    op.execute("UPDATE readings SET photos_array = ARRAY(SELECT jsonb_array_elements_text(photos))")
+    op.drop_column('readings', 'photos')
+    op.alter_column('readings', 'photos_array', new_column_name='photos', nullable=False)
@@ -0,0 +1,35 @@
+"""add reading and task filter indexes
+
+Revision ID: f1a3c5e7b9d2
+Revises: e5b7a9c3d1f2
+Create Date: 2026-10-15 16:02:11.318472
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a3c5e7b9d2'
+down_revision: Union[str, Sequence[str], None] = 'e5b7a9c3d1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY ne peut pas tourner dans une transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_readings_user_sync_status_reading_date_desc', 'readings', ['user_id', 'sync_status', sa.text('reading_date DESC'), sa.text('id DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_results_user_created_at_desc', 'task_results', ['user_id', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_task_results_user_status_created_at_desc', 'task_results', ['user_id', 'status', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_task_results_user_status_created_at_desc', table_name='task_results', postgresql_concurrently=True)
+        op.drop_index('ix_task_results_user_created_at_desc', table_name='task_results', postgresql_concurrently=True)
+        op.drop_index('ix_readings_user_sync_status_reading_date_desc', table_name='readings', postgresql_concurrently=True)
@@ -1,20 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 
-from app.core.s3_config import S3Config
 from app.services.storage_service import storage_service
+from app.utils.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
 
 router = APIRouter()
-import boto3
-
-s3 = boto3.client(
-    "s3",
-    endpoint_url=S3Config.ENDPOINT_URL,
-    aws_access_key_id=S3Config.ACCESS_KEY_ID,
-    aws_secret_access_key=S3Config.SECRET_ACCESS_KEY
-)
-
-BUCKET_NAME = S3Config.BUCKET_NAME
 
 
 class AppVersionResponse(BaseModel):
@@ -22,16 +12,20 @@ class AppVersionResponse(BaseModel):
     url: str
 
 
-@router.get("/app/version", response_model=AppVersionResponse)
-async def get_app_version():
-    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix="apk/")
-    files = sorted(response.get("Contents", []), key=lambda x: x["LastModified"], reverse=True)
+@router.api_route("/app/version", methods=["GET", "HEAD"], response_model=AppVersionResponse)
+async def get_app_version(request: Request, response: Response):
+    latest = await storage_service.get_latest_apk_cached(prefix="apk/")
 
-    if not files:
-        return {"version": "0.0.0", "url": ""}
+    if not latest:
+        version, url = "0.0.0", ""
+    else:
+        version, url, _ = latest  # ex: apk/mon_app_v1.2.0.apk -> "1.2.0"
+        version = version or "0.0.0"
 
-    latest = files[0]["Key"]  # ex: apk/mon_app_v1.2.0.apk
-    version = latest.split("_v")[-1].replace(".apk", "")  # extrait "1.2.0"
-    url = f"{S3Config.ENDPOINT_URL}/{BUCKET_NAME}/{latest}"
+    # Client déjà à jour : 304 sans corps
+    etag = make_etag(version, url)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
 
     return {"version": version, "url": url}
@@ -1,87 +1,110 @@
 import logging
 
-
 from fastapi import APIRouter, status, Depends, HTTPException, Response
-from sqlalchemy import select
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select, update, exists, lambda_stmt, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import CurrentUser, get_current_user, revoke_token, security, \
+	invalidate_user, load_user, get_current_admin
 from app.auth.jwt import auth_service
-from app.database import get_session
+from app.database import get_write_session, get_user_lookup_session
 from app.models.user import User
-from app.schemas.auth import UserResponse, RegisterRequest, LoginResponse, LoginRequest
+from app.services.api_key_service import api_key_service
+from app.schemas.auth import UserResponse, RegisterRequest, LoginResponse, LoginRequest, InvalidateAPIKeyRequest
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+USER_BY_USERNAME_STMT = lambda_stmt(lambda: select(User).where(User.username == bindparam("username")))
+USERNAME_EXISTS_STMT = lambda_stmt(lambda: select(exists().where(User.username == bindparam("username"))))
+
 @router.post("/register", response_model=UserResponse,
 			 status_code=status.HTTP_201_CREATED)
 async def register(
 		request: RegisterRequest,
-		session: AsyncSession = Depends(get_session)
+		db: AsyncSession = Depends(get_write_session)
 ):
 	"""Register a new user."""
-	async with session as db:
-		# Check if user exits
-		result = await db.execute(select(User).where(User.username == request.username))
-		if result.scalar_one_or_none():
-			raise HTTPException(
-				status_code=status.HTTP_400_BAD_REQUEST,
-				detail="Username already registered"
-			)
-
-		# Create new user
-		user = User(
+	# Check if user exits (EXISTS: stops at the first index hit, returns a boolean)
+	if await db.scalar(USERNAME_EXISTS_STMT, {"username": request.username}):
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="Username already registered"
+		)
+
+	# Create new user; RETURNING brings back the server defaults without a refresh,
+	# and ON CONFLICT covers a concurrent registration of the same username
+	user = await db.scalar(
+		pg_insert(User)
+		.values(
 			username=request.username,
-			hashed_password=auth_service.hash_password(request.password),
+			hashed_password=await auth_service.hash_password_async(request.password),
 			full_name=request.full_name,
 			role=request.role
 		)
-		db.add(user)
-		await db.commit()
-		await db.refresh(user)
+		.on_conflict_do_nothing(index_elements=["username"])
+		.returning(User)
+	)
+	if user is None:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="Username already registered"
+		)
+	await db.commit()
 
-		logger.info(f"New user registered: {user.username}")
+	logger.info(f"New user registered: {user.username}")
 
-		return user
+	return user
 
 @router.post("/login", response_model=LoginResponse)
 async def login(
 		request: LoginRequest,
-		session: AsyncSession = Depends(get_session)
+		db: AsyncSession = Depends(get_write_session)
 ):
 	"""Login and get access token."""
-	async with session as db:
-		result = await db.execute(select(User).where(User.username == request.username))
-		user = result.scalar_one_or_none()
-
-		if not user or not auth_service.verify_password(request.password, user.hashed_password):
-			raise HTTPException(
-				status_code=status.HTTP_401_UNAUTHORIZED,
-				detail="Incorrect username or password",
-				headers={"WWW-Authenticate": "Bearer"}
-			)
-		if not user.is_active:
-			raise HTTPException(
-				status_code=status.HTTP_400_BAD_REQUEST,
-				detail="Inactive user"
-			)
-		# Create tokens
-		access_token = auth_service.create_access_token({"sub": str(user.id), "role": user.role})
-		refresh_token = auth_service.create_refresh_token({"sub": str(user.id)})
-
-		logger.info(f"User logged in: {user.username}")
-
-		return LoginResponse(
-			access_token=access_token,
-			refresh_token=refresh_token,
-			user=UserResponse.model_validate(user)
+	result = await db.execute(USER_BY_USERNAME_STMT, {"username": request.username})
+	user = result.scalar_one_or_none()
+
+	# Le hachage est coûteux en CPU : vérification dans le pool de processus dédié
+	verified, new_hash = False, None
+	if user:
+		verified, new_hash = await auth_service.verify_and_update_password_async(
+			request.password, user.hashed_password
+		)
+	if not verified:
+		raise HTTPException(
+			status_code=status.HTTP_401_UNAUTHORIZED,
+			detail="Incorrect username or password",
+			headers={"WWW-Authenticate": "Bearer"}
 		)
+	# Ancien hachage (bcrypt) : migration transparente vers argon2id
+	if new_hash:
+		await db.execute(update(User).where(User.id == user.id).values(hashed_password=new_hash))
+		await db.commit()
+		invalidate_user(user.id)
+	if not user.is_active:
+		raise HTTPException(
+			status_code=status.HTTP_400_BAD_REQUEST,
+			detail="Inactive user"
+		)
+	# Create tokens
+	access_token = auth_service.create_access_token({"sub": str(user.id), "role": user.role})
+	refresh_token = auth_service.create_refresh_token({"sub": str(user.id)})
+
+	logger.info(f"User logged in: {user.username}")
+
+	return LoginResponse(
+		access_token=access_token,
+		refresh_token=refresh_token,
+		user=UserResponse.model_validate(user)
+	)
 
 @router.post("/refresh", response_model=LoginResponse)
 async def refresh_token(
 		refresh_token: str,
-		session: AsyncSession = Depends(get_session)
+		session: AsyncSession = Depends(get_user_lookup_session)
 ):
 	"""Refresh access token"""
 	payload = auth_service.decode_token(refresh_token)
@@ -92,36 +115,46 @@ async def refresh_token(
 			detail="Invalid refresh token"
 		)
 
-	user_id = payload.get("sub")
-	async with session as db:
-		result = await db.execute(select(User).where(User.id == user_id))
-		user = result.scalar_one_or_none()
-
-		if not user or not user.is_active:
-			raise HTTPException(
-				status_code=status.HTTP_401_UNAUTHORIZED,
-				detail="User not found or inactive"
-			)
-		# Create new tokens
-		access_token = auth_service.create_access_token({"sub": str(user.id), "role": user.role})
-		new_refresh_token = auth_service.create_refresh_token({"sub": str(user.id)})
-
-		return LoginResponse(
-			access_token=access_token,
-			refresh_token=new_refresh_token,
-			user=UserResponse.model_validate(user)
+	user = await load_user(payload.get("sub"), session)
+
+	if not user or not user.is_active:
+		raise HTTPException(
+			status_code=status.HTTP_401_UNAUTHORIZED,
+			detail="User not found or inactive"
 		)
+	# Create new tokens
+	access_token = auth_service.create_access_token({"sub": str(user.id), "role": user.role})
+	new_refresh_token = auth_service.create_refresh_token({"sub": str(user.id)})
+
+	return LoginResponse(
+		access_token=access_token,
+		refresh_token=new_refresh_token,
+		user=UserResponse.model_validate(user)
+	)
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: CurrentUser = Depends(get_current_user)):
 	"""Get current user information"""
 	return current_user
 
 @router.post("/logout")
-async def logout(response: Response, current_user: User = Depends(get_current_user)):
+async def logout(
+		response: Response,
+		credentials: HTTPAuthorizationCredentials = Depends(security),
+		current_user: CurrentUser = Depends(get_current_user)
+):
 	"""Logout user (a client should remove tokens)"""
-	# In a production app, you might want to blocklist the token in Redis
+	# Blocklist Redis : le jeton est refusé par tous les workers jusqu'à son expiration
+	await revoke_token(credentials.credentials)
 	response.delete_cookie("access_token")
 	return {"message": "Successfully logged out"}
 
 
+@router.post("/api-keys/invalidate", status_code=status.HTTP_204_NO_CONTENT)
+async def invalidate_api_key(
+		request: InvalidateAPIKeyRequest,
+		current_user: CurrentUser = Depends(get_current_admin)
+):
+	"""Purge a revoked API key from the validation caches"""
+	# Les autres workers sont prévenus par pub/sub (api_key:invalidate)
+	await api_key_service.invalidate_api_key(request.api_key)
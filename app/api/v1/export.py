@@ -1,25 +1,35 @@
-import io
 from typing import Optional
 
 from botocore.exceptions import ClientError
-from fastapi import APIRouter, Depends, Query, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, Query, HTTPException, status, UploadFile, File, Request, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, datetime
 
-from app.core.s3_config import S3Config
-from app.database import get_session
-from app.auth.dependencies import get_current_user
+from app.database import get_session, get_write_session
+from app.auth.dependencies import CurrentUser, get_current_user
 
-from app.models.user import UserRole, User
+from app.models.user import UserRole
 from app.schemas.photo import UpdateInfo
 from app.services.export_service import ExportService
 from app.services.storage_service import storage_service
+from app.utils.http_cache import make_etag, etag_matches, not_modified, set_cache_headers
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_file(file_obj, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Lit un fichier par morceaux pour StreamingResponse, puis le ferme"""
+    try:
+        while chunk := file_obj.read(chunk_size):
+            yield chunk
+    finally:
+        file_obj.close()
+
 
 @router.get("/readings/excel")
 async def export_readings_excel(
@@ -27,8 +37,8 @@ async def export_readings_excel(
         end_date: date = Query(..., description="Date de fin (YYYY-MM-DD)"),
         include_photos: bool = Query(True, description="Inclure les liens vers les photos"),
         user_id: Optional[str] = Query(None, description="Filtrer par ID utilisateur"),
-        current_user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_session)
+        current_user: CurrentUser = Depends(get_current_user),
+        db: AsyncSession = Depends(get_write_session)  # curseur serveur : transaction requise
 ):
     """
     Exporte les relevés de compteurs en fichier Excel.
@@ -63,7 +73,7 @@ async def export_readings_excel(
 
         # Génération du fichier Excel
         export_service = ExportService(db)
-        excel_buffer = await export_service.export_readings(
+        excel_file = await export_service.export_readings(
             start_date=start_date,
             end_date=end_date,
             include_photos=include_photos,
@@ -73,9 +83,9 @@ async def export_readings_excel(
         # Nom du fichier avec dates
         filename = f"readings_export_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
 
-        # Retour du fichier Excel en streaming
+        # Retour du fichier Excel en streaming (par morceaux, sans copie en mémoire)
         return StreamingResponse(
-            io.BytesIO(excel_buffer.getvalue()),
+            _iter_file(excel_file),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
@@ -98,22 +108,25 @@ async def export_readings_excel(
 async def get_export_stats(
         start_date: date = Query(..., description="Date de début"),
         end_date: date = Query(..., description="Date de fin"),
-        current_user: User = Depends(get_current_user),
+        current_user: CurrentUser = Depends(get_current_user),
         db: AsyncSession = Depends(get_session)
 ):
     """
     Obtient les statistiques pour la période donnée avant l'export.
     Utile pour prévisualiser ce qui sera exporté.
     """
-    from sqlalchemy import select, func, and_
+    from sqlalchemy import select, func, and_, tuple_
     from app.models.reading import Reading
     from app.models.meter import Meter
 
     try:
-        # Construction de la requête de base
+        # Une seule requête : GROUPING SETS donne les totaux (grouping = 1)
+        # et la ventilation par type de compteur dans le même parcours
         query = (
             select(
-                func.count(Reading.id).label("total_readings"),
+                func.grouping(Meter.type).label("is_total"),
+                Meter.type,
+                func.count(Reading.id).label("count"),
                 func.count(func.distinct(Reading.meter_id)).label("unique_meters"),
                 func.count(func.distinct(Reading.user_id)).label("unique_users")
             )
@@ -124,6 +137,7 @@ async def get_export_stats(
                     Reading.reading_date <= datetime.combine(end_date, datetime.max.time())
                 )
             )
+            .group_by(func.grouping_sets(tuple_(Meter.type), tuple_()))
         )
 
         # Filtrer par utilisateur si ce n'est pas un admin
@@ -131,29 +145,13 @@ async def get_export_stats(
             query = query.where(Reading.user_id == current_user.id)
 
         result = await db.execute(query)
-        stats = result.one()
-
-        # Statistiques par type de compteur
-        type_stats_query = (
-            select(
-                Meter.type,
-                func.count(Reading.id).label("count")
-            )
-            .join(Reading, Meter.id == Reading.meter_id)
-            .where(
-                and_(
-                    Reading.reading_date >= datetime.combine(start_date, datetime.min.time()),
-                    Reading.reading_date <= datetime.combine(end_date, datetime.max.time())
-                )
-            )
-            .group_by(Meter.type)
-        )
-
-        if current_user.role not in ["admin", "supervisor"]:
-            type_stats_query = type_stats_query.where(Reading.user_id == current_user.id)
-
-        type_result = await db.execute(type_stats_query)
-        readings_by_type = {row.type: row.count for row in type_result}
+        stats = None
+        readings_by_type = {}
+        for row in result:
+            if row.is_total:
+                stats = row
+            else:
+                readings_by_type[row.type] = row.count
 
         return {
             "period": {
@@ -161,13 +159,13 @@ async def get_export_stats(
                 "end_date": end_date.isoformat()
             },
             "statistics": {
-                "total_readings": stats.total_readings,
+                "total_readings": stats.count,
                 "unique_meters": stats.unique_meters,
                 "unique_users": stats.unique_users,
                 "readings_by_type": readings_by_type
             },
             "user_filter": current_user.role not in ["admin", "supervisor"],
-            "estimated_file_size_kb": (stats.total_readings * 2) + 100  # Estimation approximative
+            "estimated_file_size_kb": (stats.count * 2) + 100  # Estimation approximative
         }
 
     except Exception as e:
@@ -181,8 +179,8 @@ async def get_export_stats(
 @router.get("/readings/excel/all")
 async def export_readings_all(
     include_photos: bool = Query(True, description="Inclure les liens vers les photos"),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_session)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_write_session)  # curseur serveur : transaction requise
 ):
     """
     Exporte tous les relevés de compteurs en fichier Excel, sans filtrer par date.
@@ -203,7 +201,7 @@ async def export_readings_all(
 
         # Génération du fichier Excel
         export_service = ExportService(db)
-        excel_buffer = await export_service.export_readings_all(
+        excel_file = await export_service.export_readings_all(
             include_photos=include_photos,
             user_id=user_id
         )
@@ -212,9 +210,9 @@ async def export_readings_all(
         today = date.today()
         filename = f"readings_export_all_{today.strftime('%Y%m%d')}.xlsx"
 
-        # Retour du fichier Excel en streaming
+        # Retour du fichier Excel en streaming (par morceaux, sans copie en mémoire)
         return StreamingResponse(
-            io.BytesIO(excel_buffer.getvalue()),
+            _iter_file(excel_file),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
@@ -232,37 +230,28 @@ async def export_readings_all(
         )
 
 
-@router.get("/check-update", response_model=UpdateInfo)
-async def check_update():
+@router.api_route("/check-update", methods=["GET", "HEAD"], response_model=UpdateInfo)
+async def check_update(request: Request, response: Response):
     try:
-        # List the most recent APK in the apks/ prefix
-        response = storage_service.s3_client.list_objects_v2(
-            Bucket=storage_service.bucket_name,
-            Prefix='apks/',
-            MaxKeys=1
-        )
+        # Dernière APK du préfixe apks/ (cache en mémoire, S3 interrogé au plus toutes les 5 min)
+        latest = await storage_service.get_latest_apk_cached(prefix='apks/')
 
-        if 'Contents' not in response or not response['Contents']:
+        if not latest:
             logger.error("Aucun APK trouvé dans le bucket")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Aucun APK trouvé dans le bucket"
             )
 
-        # Get the latest APK key (most recent by default sorting)
-        latest_key = response['Contents'][0]['Key']
-
-        # Fetch metadata to get version
-        metadata_response = storage_service.s3_client.head_object(
-            Bucket=storage_service.bucket_name,
-            Key=latest_key
-        )
-        metadata = metadata_response.get('Metadata', {})
-        version = metadata.get('version', '1.0.0')  # Fallback version if not set
-        changelog = metadata.get('changelog', 'Latest update')  # Optional changelog metadata
+        version, public_url, changelog = latest
+        version = version or '1.0.0'  # Fallback version if not set
+        changelog = changelog or 'Latest update'  # Optional changelog metadata
 
-        # Construct public URL
-        public_url = f"{S3Config.ENDPOINT_URL}/{storage_service.bucket_name}/{latest_key}"
+        # Client déjà à jour : 304 sans corps
+        etag = make_etag(version, public_url, changelog)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_cache_headers(response, etag)
 
         return UpdateInfo(
             version=version,
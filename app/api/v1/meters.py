@@ -1,140 +1,184 @@
-import base64
 import logging
+from functools import partial
 from typing import Optional
 
-from celery.result import AsyncResult
-from fastapi import APIRouter, Query, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
-from sqlalchemy import select, or_, func, delete
+import anyio
+from fastapi import APIRouter, Query, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, or_, func, delete, update, tuple_, lambda_stmt, bindparam, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth.dependencies import get_current_user, require_role
-from app.core.celery_app import celery_app
-from app.database import get_session
+from app.auth.dependencies import CurrentUser, get_current_user, require_role
+from app.core.celery_app import celery_app, get_task_meta, TASK_READY_STATES
+from app.database import get_session, get_write_session
 from app.models.meter import Meter
 from app.models.reading import Reading
-from app.models.user import UserRole, User
+from app.models.user import UserRole
 from app.schemas.base import PaginatedResponse
 from app.schemas.meter import MeterResponse, MeterCreate, MeterUpdate, MeterImportResponse, MeterResponseWithReading, \
-    MeterListResponse
+    MeterListResponse, MeterImportPresignRequest, MeterImportPresignResponse, MeterImportRequest
 from app.schemas.reading import ReadingResponse
 from app.services.meter_service import MeterService
+from app.services.storage_service import storage_service
+from app.utils.pagination import encode_cursor, decode_cursor, cached_count
 from app.workers.import_meter_from_import import import_meters_from_file
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Hot single-key lookup, built once and reused with its cached compilation
+METER_BY_ID_STMT = lambda_stmt(lambda: select(Meter).where(Meter.id == bindparam("meter_id")))
+
+# Validates a whole page in one call instead of one model_validate per row
+_meters_adapter = TypeAdapter(list[MeterResponse])
+
+
+def _meter_filters(search: Optional[str], status: Optional[str], type: Optional[str]) -> list:
+    """WHERE clauses shared by the meter listings"""
+    filters = []
+    if search:
+        filters.append(or_(
+            Meter.meter_number.ilike(f"%{search}%"),
+            Meter.client_name.ilike(f"%{search}%"),
+            Meter.location_address.ilike(f"%{search}%")
+        ))
+    if status:
+        filters.append(Meter.status == status)
+    if type:
+        filters.append(Meter.type == type)
+    return filters
+
+
+def _cursor_filter(cursor: str):
+    """WHERE (created_at, id) < cursor, matching ORDER BY created_at DESC, id DESC"""
+    return tuple_(Meter.created_at, Meter.id) < decode_cursor(cursor)
+
 
 @router.get("/", response_model=PaginatedResponse)
 async def list_meters(
-        skip: int = Query(0, ge=0),
+        skip: int = Query(0, ge=0, deprecated=True),
         limit: int = Query(100, ge=1, le=1000),
+        cursor: Optional[str] = None,
+        include_total: bool = True,
         search: Optional[str] = None,
         status: Optional[str] = None,
         type: Optional[str] = None,
-        session: AsyncSession = Depends(get_session),
+        db: AsyncSession = Depends(get_session),
         current_user=Depends(get_current_user)
 ):
-    """List all meters with pagination and filters"""
-    async with session as db:
-        query = select(Meter)
-
-        # Apply filters
-        filters = []
-        if search:
-            filters.append(or_(
-                Meter.meter_number.ilike(f"%{search}%"),
-                Meter.client_name.ilike(f"%{search}%"),
-                Meter.location_address.ilike(f"%{search}%")
-            ))
-        if status:
-            filters.append(Meter.status == status)
-        if type:
-            filters.append(Meter.type == type)
-
-        if filters:
-            query = query.where(*filters)
-
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await db.scalar(count_query)
-
-        # Apply pagination
-        query = query.offset(skip).limit(limit).order_by(Meter.created_at.desc())
-        result = await db.execute(query)
-        meters = result.scalars().all()
-
-        return PaginatedResponse(
-            total=total,
-            skip=skip,
-            limit=limit,
-            data=[MeterResponse.model_validate(m) for m in meters]
+    """List all meters with pagination and filters (keyset pagination through `cursor`)"""
+    query = select(Meter)
+
+    # Apply filters
+    filters = _meter_filters(search, status, type)
+    if filters:
+        query = query.where(*filters)
+
+    # Seek past the cursor instead of OFFSET (deprecated); one extra row tells if a next page exists
+    if cursor:
+        query = query.where(_cursor_filter(cursor))
+    else:
+        query = query.offset(skip)
+    query = query.limit(limit + 1).order_by(Meter.created_at.desc(), Meter.id.desc())
+    meters = (await db.scalars(query)).all()
+
+    next_cursor = None
+    if len(meters) > limit:
+        meters = meters[:limit]
+        next_cursor = encode_cursor(meters[-1].created_at, meters[-1].id)
+
+    # Total is optional and cached briefly per filter set
+    total = 0
+    if include_total:
+        total = await cached_count(
+            db, select(func.count(Meter.id)).where(*filters),
+            "meters", search, status, type
         )
 
+    return PaginatedResponse(
+        total=total,
+        skip=skip,
+        limit=limit,
+        data=_meters_adapter.validate_python(meters, from_attributes=True),
+        next_cursor=next_cursor
+    )
+
 @router.get("/with-readings", response_model=PaginatedResponse)
 async def list_meters_with_readings(
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=1000000),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     search: Optional[str] = None,
     status: Optional[str] = None,
     type: Optional[str] = None,
-    session: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user)
 ):
     """List all meters that have at least one reading, with pagination and filters"""
-    async with session as db:
-        # Subquery to get meters with readings
-        subquery = select(Meter.id).join(Reading, Meter.id == Reading.meter_id).distinct()
-
-        # Main query
-        query = select(Meter).where(Meter.id.in_(subquery))
-
-        # Apply filters
-        filters = []
-        if search:
-            filters.append(or_(
-                Meter.meter_number.ilike(f"%{search}%"),
-                Meter.client_name.ilike(f"%{search}%"),
-                Meter.location_address.ilike(f"%{search}%")
-            ))
-        if status:
-            filters.append(Meter.status == status)
-        if type:
-            filters.append(Meter.type == type)
-
-        if filters:
-            query = query.where(*filters)
-
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = await db.scalar(count_query)
-
-        # Apply pagination
-        query = query.offset(skip).limit(limit).order_by(Meter.created_at.desc())
-        result = await db.execute(query)
-        meters = result.scalars().all()
-
-        # Fetch latest reading for each meter
-        meter_responses = []
-        for meter in meters:
-            latest_reading = await db.execute(
-                select(Reading)
-                .where(Reading.meter_id == meter.id)
-                .order_by(Reading.reading_date.desc())
-                .limit(1)
-            )
-            reading = latest_reading.scalar_one_or_none()
-            meter_response = MeterResponseWithReading(
-                **MeterResponse.model_validate(meter).model_dump(),
-                readings=ReadingResponse.model_validate(reading) if reading else None
-            )
-            meter_responses.append(meter_response)
-
-        return PaginatedResponse(
-            total=total,
-            skip=skip,
-            limit=limit,
-            data=meter_responses
+    # Meters with at least one reading (EXISTS -> semi-join)
+    has_readings = select(Reading.id).where(Reading.meter_id == Meter.id).exists()
+
+    query = select(Meter).where(has_readings)
+
+    # Apply filters
+    filters = _meter_filters(search, status, type)
+    if filters:
+        query = query.where(*filters)
+
+    # Seek past the cursor instead of OFFSET (deprecated); one extra row tells if a next page exists
+    if cursor:
+        query = query.where(_cursor_filter(cursor))
+    else:
+        query = query.offset(skip)
+    query = query.limit(limit + 1).order_by(Meter.created_at.desc(), Meter.id.desc())
+    meters = (await db.scalars(query)).all()
+
+    next_cursor = None
+    if len(meters) > limit:
+        meters = meters[:limit]
+        next_cursor = encode_cursor(meters[-1].created_at, meters[-1].id)
+
+    # Total is optional and cached briefly per filter set
+    total = 0
+    if include_total:
+        total = await cached_count(
+            db, select(func.count(Meter.id)).where(has_readings, *filters),
+            "meters_with_readings", search, status, type
+        )
+
+    # Fetch latest reading of every meter in the page in a single query
+    latest_by_meter = {}
+    if meters:
+        ranked = select(
+            Reading,
+            func.row_number().over(
+                partition_by=Reading.meter_id,
+                order_by=Reading.reading_date.desc()
+            ).label("rn")
+        ).where(Reading.meter_id.in_([meter.id for meter in meters])).subquery()
+        latest_reading = aliased(Reading, ranked)
+        latest_result = await db.execute(select(latest_reading).where(ranked.c.rn == 1))
+        latest_by_meter = {reading.meter_id: reading for reading in latest_result.scalars()}
+
+    meter_responses = []
+    for meter in meters:
+        reading = latest_by_meter.get(meter.id)
+        meter_response = MeterResponseWithReading(
+            **MeterResponse.model_validate(meter).model_dump(),
+            readings=ReadingResponse.model_validate(reading) if reading else None
         )
+        meter_responses.append(meter_response)
+
+    return PaginatedResponse(
+        total=total,
+        skip=skip,
+        limit=limit,
+        data=meter_responses,
+        next_cursor=next_cursor
+    )
 
 
 @router.get("/all", response_model=MeterListResponse)
@@ -142,84 +186,70 @@ async def list_all_meters(
     search: Optional[str] = None,
     status: Optional[str] = None,
     type: Optional[str] = None,
-    session: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_session),
     current_user=Depends(get_current_user)
 ):
     """List all meters without pagination, with optional filters"""
-    async with session as db:
-        query = select(Meter)
-
-        # Apply filters
-        filters = []
-        if search:
-            filters.append(or_(
-                Meter.meter_number.ilike(f"%{search}%"),
-                Meter.client_name.ilike(f"%{search}%"),
-                Meter.location_address.ilike(f"%{search}%")
-            ))
-        if status:
-            filters.append(Meter.status == status)
-        if type:
-            filters.append(Meter.type == type)
-
-        if filters:
-            query = query.where(*filters)
-
-        # Execute query
-        result = await db.execute(query.order_by(Meter.created_at.desc()))
-        meters = result.scalars().all()
-
-        # Prepare response
-        return MeterListResponse(
-            total=len(meters),
-            data=[MeterResponse.model_validate(m) for m in meters]
-        )
+    query = select(Meter)
+
+    # Apply filters
+    filters = _meter_filters(search, status, type)
+    if filters:
+        query = query.where(*filters)
+
+    # Execute query
+    result = await db.execute(query.order_by(Meter.created_at.desc()))
+    meters = result.scalars().all()
+
+    # Prepare response
+    return MeterListResponse(
+        total=len(meters),
+        data=_meters_adapter.validate_python(meters, from_attributes=True)
+    )
 
 
 @router.get("/{meter_id}", response_model=MeterResponse)
 async def get_meter(
         meter_id: str,
-        session: AsyncSession = Depends(get_session),
+        db: AsyncSession = Depends(get_session),
         current_user = Depends(get_current_user)
 ):
     """Get a specific meter by ID"""
-    async with session as db:
-        result = await db.execute(select(Meter).where(Meter.id == meter_id))
-        meter = result.scalar_one_or_none()
+    result = await db.execute(METER_BY_ID_STMT, {"meter_id": meter_id})
+    meter = result.scalar_one_or_none()
 
-        if not meter:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meter not found"
-            )
-        return MeterResponse.model_validate(meter)
+    if not meter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Meter not found"
+        )
+    return MeterResponse.model_validate(meter)
 
 
 @router.post("/", response_model=MeterResponse, status_code=status.HTTP_201_CREATED)
 async def create_meter(
         meter_data: MeterCreate,
-        session: AsyncSession = Depends(get_session),
+        db: AsyncSession = Depends(get_write_session),
         current_user=Depends(require_role([UserRole.ADMIN]))
 ):
     """Create a new meter"""
-    async with session as db:
-        # Check if meter number already exists
-        result = await db.execute(
-            select(Meter).where(Meter.meter_number == meter_data.meter_number)
+    # Single round-trip: the unique constraints decide, no check-then-insert race
+    stmt = (
+        pg_insert(Meter)
+        .values(**meter_data.model_dump())
+        .on_conflict_do_nothing()
+        .returning(Meter)
+    )
+    meter = (await db.scalars(stmt)).one_or_none()
+    if meter is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Meter number already exists"
         )
-        if result.scalar_one_or_none():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Meter number already exists"
-            )
-
-        meter = Meter(**meter_data.model_dump())
-        db.add(meter)
-        await db.commit()
-        await db.refresh(meter)
+    await db.commit()
 
-        logger.info(f"Meter created: {meter.meter_number}")
-        return MeterResponse.model_validate(meter)
+    logger.info(f"Meter created: {meter.meter_number}")
+    return MeterResponse.model_validate(meter)
 
 
 
@@ -228,35 +258,36 @@ async def create_meter(
 async def update_meter(
         meter_id: str,
         meter_update: MeterUpdate,
-        session: AsyncSession = Depends(get_session),
+        db: AsyncSession = Depends(get_write_session),
         current_user=Depends(require_role([UserRole.ADMIN]))
 ):
     """Update a meter"""
-    async with session as db:
-        result = await db.execute(select(Meter).where(Meter.id == meter_id))
-        meter = result.scalar_one_or_none()
-
-        if not meter:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meter not found"
-            )
+    patch = meter_update.model_dump(exclude_unset=True)
+    if patch:
+        # UPDATE ... RETURNING: one round-trip, no load-then-flush
+        result = await db.execute(
+            update(Meter).where(Meter.id == meter_id).values(**patch).returning(Meter)
+        )
+    else:
+        result = await db.execute(METER_BY_ID_STMT, {"meter_id": meter_id})
+    meter = result.scalar_one_or_none()
 
-        # Update fields
-        for field, value in meter_update.model_dump(exclude_unset=True).items():
-            setattr(meter, field, value)
+    if not meter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Meter not found"
+        )
 
-        await db.commit()
-        await db.refresh(meter)
+    await db.commit()
 
-        logger.info(f"Meter updated: {meter.meter_number}")
-        return MeterResponse.model_validate(meter)
+    logger.info(f"Meter updated: {meter.meter_number}")
+    return MeterResponse.model_validate(meter)
 
 
 
 @router.delete("/clear", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_all_meters(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_write_session),
     current_user=Depends(require_role([UserRole.ADMIN]))
 ):
     """
@@ -264,14 +295,21 @@ async def delete_all_meters(
     Réservé aux administrateurs.
     """
     try:
-        # ⚠️ Cette approche supprime tout via SQL brut
-        # => les cascades ORM ne sont pas appliquées
-        # => mais plus performant pour de gros volumes
-        stmt = delete(Meter)
-        result = await session.execute(stmt)
+        # Estimation du volume (statistiques du planificateur, sans parcours de la table).
+        # regclass résout la table via le search_path ; reltuples vaut -1 tant que
+        # la table n'a jamais été analysée
+        estimate = await session.scalar(
+            text("SELECT GREATEST(reltuples, 0)::BIGINT FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": Meter.__tablename__}
+        )
+
+        # ⚠️ TRUNCATE : pas de parcours ligne à ligne ni de WAL par ligne
+        # => CASCADE vide aussi les relevés (et leurs photos) liés par clé étrangère
+        # => verrou exclusif sur les tables le temps de l'opération
+        await session.execute(text(f"TRUNCATE TABLE {Meter.__tablename__} RESTART IDENTITY CASCADE"))
         await session.commit()
 
-        logger.warning(f"{result.rowcount} meters supprimés par {current_user.username}")
+        logger.warning(f"~{estimate} meters supprimés (TRUNCATE) par {current_user.username}")
     except Exception as e:
         await session.rollback()
         logger.error(f"Erreur lors de la suppression de tous les meters: {str(e)}")
@@ -284,7 +322,7 @@ async def delete_all_meters(
 @router.post("/import", response_model=MeterImportResponse)
 async def import_meters(
         file: UploadFile = File(...),
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_write_session),
         current_user=Depends(require_role([UserRole.ADMIN]))
 ):
     """Import meters from CSV or XLSX file"""
@@ -300,17 +338,31 @@ async def import_meters(
     logger.info(f"Meters import: {result['success']} success, {result['failed']} failed")
     return result
 
-@router.post("/import-meters", status_code=status.HTTP_202_ACCEPTED)
-async def enqueue_import_meters(
-    file: UploadFile = File(...),
+@router.post("/import-meters/presign", response_model=MeterImportPresignResponse)
+async def presign_import_meters(
+    request: MeterImportPresignRequest,
     current_user=Depends(require_role([UserRole.ADMIN])),
 ):
-    if not file.filename.lower().endswith((".xlsx",)):
+    """URL pré-signée pour déposer le fichier XLSX directement sur S3 avant /import-meters"""
+    if not request.filename.lower().endswith((".xlsx",)):
         raise HTTPException(400, "File must be XLSX")
 
-    # Lire le fichier en mémoire (option: stocker d’abord en S3 si >50 Mo)
-    content = await file.read()
-    task = celery_app.send_task("tasks.import_meters", kwargs={"file_bytes": content}, queue="default")
+    # Signature boto3 synchrone : exécutée hors de la boucle d'événements
+    return await anyio.to_thread.run_sync(storage_service.generate_presigned_import_put, request.filename)
+
+@router.post("/import-meters", status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_import_meters(
+    request: MeterImportRequest,
+    current_user=Depends(require_role([UserRole.ADMIN])),
+):
+    if not request.key.startswith("imports/"):
+        raise HTTPException(400, "Invalid import file key")
+
+    # Seule la clé S3 transite par le broker, le worker télécharge le fichier.
+    # Publication synchrone (kombu) : hors de la boucle d'événements
+    task = await anyio.to_thread.run_sync(
+        partial(celery_app.send_task, "tasks.import_meters", kwargs={"s3_key": request.key}, queue="default")
+    )
     return {
         "task_id": task.id,
         "status_url": f"/api/v1/meters/{task.id}/status",
@@ -320,18 +372,15 @@ async def enqueue_import_meters(
 @router.post("/upload-file")
 async def import_meters(
     file: UploadFile,
-    user: User = Depends(require_role([UserRole.ADMIN]))
+    user: CurrentUser = Depends(require_role([UserRole.ADMIN]))
 ):
     """
     Endpoint synchrone pour importer un fichier Excel de compteurs.
     """
     try:
-        # Lecture fichier en mémoire
-        raw_content = await file.read()
-        file_content_b64 = base64.b64encode(raw_content).decode("utf-8")
-
+        # Le fichier uploadé (SpooledTemporaryFile) est lu directement, sans copie
         result = import_meters_from_file(
-            file_content_b64=file_content_b64,
+            file_obj=file.file,
             file_name=file.filename,
             user_id=user.id,
             file_type=file.filename.split(".")[-1],
@@ -341,41 +390,57 @@ async def import_meters(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _set_task_cache_headers(response: Response, state: str) -> None:
+    response.headers["Cache-Control"] = "no-store" if state in TASK_READY_STATES else "max-age=1"
+
+
 @router.get("/{task_id}/status")
-async def get_task_status(task_id: str, current_user=Depends(require_role([UserRole.ADMIN]))):
-    res = AsyncResult(task_id, app=celery_app)
-    meta = res.info if isinstance(res.info, dict) else {}
-    return {"task_id": task_id, "state": res.state, "meta": meta}
+async def get_task_status(
+        task_id: str,
+        response: Response,
+        current_user=Depends(require_role([UserRole.ADMIN]))
+):
+    state, info = await get_task_meta(task_id)
+    _set_task_cache_headers(response, state)
+    meta = info if isinstance(info, dict) else {}
+    return {"task_id": task_id, "state": state, "meta": meta}
 
 
 @router.get("/{task_id}/result")
-async def get_task_result(task_id: str, current_user=Depends(require_role([UserRole.ADMIN]))):
-    res = AsyncResult(task_id, app=celery_app)
-    if not res.ready():
-        return {"task_id": task_id, "state": res.state, "meta": res.info}
-    if res.failed():
-        raise HTTPException(500, f"Tâche échouée: {res.info}")
-    return {"task_id": task_id, "state": res.state, "result": res.result}
+async def get_task_result(
+        task_id: str,
+        response: Response,
+        current_user=Depends(require_role([UserRole.ADMIN]))
+):
+    state, info = await get_task_meta(task_id)
+    _set_task_cache_headers(response, state)
+    if state not in TASK_READY_STATES:
+        return {"task_id": task_id, "state": state, "meta": info}
+    if state == "FAILURE":
+        detail = info.get("exc_message", info) if isinstance(info, dict) else info
+        raise HTTPException(500, f"Tâche échouée: {detail}")
+    return {"task_id": task_id, "state": state, "result": info}
 
 
 @router.delete("/{meter_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_meter(
         meter_id: str,
-        session: AsyncSession = Depends(get_session),
+        db: AsyncSession = Depends(get_write_session),
         current_user=Depends(require_role([UserRole.ADMIN]))
 ):
     """Delete a meter"""
-    async with session as db:
-        result = await db.execute(select(Meter).where(Meter.id == meter_id))
-        meter = result.scalar_one_or_none()
+    # Readings (and their photos) go with it through ON DELETE CASCADE
+    result = await db.execute(
+        delete(Meter).where(Meter.id == meter_id).returning(Meter.meter_number)
+    )
+    row = result.first()
 
-        if not meter:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meter not found"
-            )
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Meter not found"
+        )
 
-        await db.delete(meter)
-        await db.commit()
+    await db.commit()
 
-        logger.info(f"Meter deleted: {meter.meter_number}")
+    logger.info(f"Meter deleted: {row.meter_number}")
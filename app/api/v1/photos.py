@@ -1,5 +1,6 @@
 import logging
 
+import anyio
 from fastapi import APIRouter, status, HTTPException, Depends, Query
 
 
@@ -8,16 +9,16 @@ from app.core.s3_config import S3Config
 
 from app.schemas.photo import PresignedUrlResponse, PresignedUrlRequest, ImageResponse, \
 	ConfirmUploadRequest
-from app.services.storage_service import StorageService
+from app.services.storage_service import storage_service
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
-storage_service = StorageService()
 
 @router.post("/presigned-url", response_model=PresignedUrlResponse, tags=["Direct Upload"])
 async def get_presigned_upload_url(request: PresignedUrlRequest):
     logger.info(f"Requête reçue: {request.dict()}")
-    result = storage_service.generate_presigned_url_put(request)
+    # Signature boto3 synchrone : exécutée hors de la boucle d'événements
+    result = await anyio.to_thread.run_sync(storage_service.generate_presigned_url_put, request)
     logger.info(f"URL pré-signée générée: {result['upload_url']}")
     return PresignedUrlResponse(**result)
 
@@ -30,7 +31,7 @@ async def confirm_upload(request: ConfirmUploadRequest):
     Après un upload direct réussi, le client doit appeler cette route
     pour confirmer l'upload et enregistrer les métadonnées.
     """
-    result = storage_service.confirm_upload(request)
+    result = await storage_service.confirm_upload(request)
     return ImageResponse(**result)
 
 
@@ -41,7 +42,7 @@ async def verify_upload(file_key: str):
 
     Utile pour vérifier qu'un upload a réussi avant de confirmer.
     """
-    file_info = storage_service.verify_upload(file_key)
+    file_info = await storage_service.verify_upload(file_key)
 
     if not file_info:
         raise HTTPException(
@@ -64,7 +65,7 @@ async def delete_image(image_id: str, current_user= Depends(get_current_admin)):
 
     - **image_id**: Identifiant unique de l'image
     """
-    success = storage_service.delete_image(image_id)
+    success = await storage_service.delete_image(image_id)
 
     if not success:
         raise HTTPException(
@@ -86,7 +87,8 @@ async def get_download_url(
     Utile pour partager des images privées de manière sécurisée.
     """
     try:
-        url = storage_service.generate_presigned_download_url(file_key, expires_in)
+        # URL partagée via Redis : pas de signature à chaque appel, caches clients efficaces
+        url = await storage_service.get_presigned_download_url_cached(file_key, expires_in)
         return {
             "download_url": url,
             "expires_in": expires_in
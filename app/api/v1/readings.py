@@ -3,146 +3,171 @@ from datetime import date, datetime
 from typing import Optional
 from fastapi import APIRouter, HTTPException, status, Query, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.auth.dependencies import get_session, get_current_user
-from sqlalchemy import select, and_, func
+from app.auth.dependencies import get_current_user
+from app.database import get_session, get_write_session
+from sqlalchemy import select, update, and_, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 
 from app.models.meter import Meter
 from app.models.reading import Reading
 from app.schemas.base import PaginatedResponse
 from app.schemas.reading import ReadingResponse, ReadingUpdate, ReadingSyncRequest, ReadingSyncResponse, ReadingCreate
 from app.services.reading_service import ReadingService
+from app.utils.pagination import encode_cursor, decode_cursor, cached_count
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+FOREIGN_KEY_VIOLATION = "23503"
+
+# Colonnes de ReadingResponse : les listes lisent des Row Core, sans hydrater d'objets ORM
+READING_RESPONSE_COLUMNS = tuple(getattr(Reading, name) for name in ReadingResponse.model_fields)
+
 
 @router.get("/", response_model=PaginatedResponse)
 async def list_readings(
-		skip: int = Query(0, ge=0),
+		skip: int = Query(0, ge=0, deprecated=True),
 		limit: int = Query(100, ge=1, le=1000),
+		cursor: Optional[str] = None,
+		include_total: bool = True,
 		meter_id: Optional[str] = None,
 		start_date: Optional[date] = None,
 		end_date: Optional[date] = None,
 		sync_status: Optional[str] = None,
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_session),
 		current_user=Depends(get_current_user)
 ):
-	"""List readings with filters"""
-	async with session as db:
-		query = select(Reading)
-
-		# Apply filters
-		filters = []
-		if meter_id:
-			filters.append(Reading.meter_id == meter_id)
-		if start_date:
-			filters.append(Reading.reading_date >= start_date)
-		if end_date:
-			filters.append(Reading.reading_date <= end_date)
-		if sync_status:
-			filters.append(Reading.sync_status == sync_status)
-
-		# For controllers, only show their own readings
-		if current_user.role == "controller":
-			filters.append(Reading.user_id == current_user.id)
-
+	"""List readings with filters (keyset pagination through `cursor`)"""
+	# Apply filters
+	filters = []
+	if meter_id:
+		filters.append(Reading.meter_id == meter_id)
+	if start_date:
+		filters.append(Reading.reading_date >= start_date)
+	if end_date:
+		filters.append(Reading.reading_date <= end_date)
+	if sync_status:
+		filters.append(Reading.sync_status == sync_status)
+
+	# For controllers, only show their own readings
+	if current_user.role == "controller":
+		filters.append(Reading.user_id == current_user.id)
+
+	query = select(*READING_RESPONSE_COLUMNS)
+	if filters:
+		query = query.where(and_(*filters))
+
+	# Seek past the cursor instead of OFFSET; one extra row tells if a next page exists
+	if cursor:
+		query = query.where(tuple_(Reading.reading_date, Reading.id) < decode_cursor(cursor))
+	else:
+		query = query.offset(skip)
+	query = query.order_by(Reading.reading_date.desc(), Reading.id.desc()).limit(limit + 1)
+	result = await db.execute(query)
+	readings = result.all()
+
+	next_cursor = None
+	if len(readings) > limit:
+		readings = readings[:limit]
+		next_cursor = encode_cursor(readings[-1].reading_date, readings[-1].id)
+
+	# Total is optional and cached briefly per filter set
+	total = 0
+	if include_total:
+		count_query = select(func.count(Reading.id))
 		if filters:
-			query = query.where(and_(*filters))
-
-		# Get total count
-		count_query = select(func.count()).select_from(query.subquery())
-		total = await db.scalar(count_query)
-
-		# Apply pagination and ordering
-		query = query.offset(skip).limit(limit).order_by(Reading.reading_date.desc())
-		result = await db.execute(query)
-		readings = result.scalars().all()
-
-		return PaginatedResponse(
-			total=total,
-			skip=skip,
-			limit=limit,
-			data=[ReadingResponse.model_validate(r) for r in readings]
+			count_query = count_query.where(and_(*filters))
+		total = await cached_count(
+			db, count_query,
+			"readings", meter_id, start_date, end_date, sync_status,
+			str(current_user.id) if current_user.role == "controller" else None
 		)
 
+	return PaginatedResponse(
+		total=total,
+		skip=skip,
+		limit=limit,
+		# Rows come straight from the table: build the models without re-validating
+		data=[ReadingResponse.model_construct(**row._mapping) for row in readings],
+		next_cursor=next_cursor
+	)
+
 
 @router.get("/{reading_id}", response_model=ReadingResponse)
 async def get_reading(
 		reading_id: str,
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_session),
 		current_user=Depends(get_current_user)
 ):
 	"""Get a specific reading"""
-	async with session as db:
-		query = select(Reading).where(Reading.id == reading_id)
+	query = select(Reading).where(Reading.id == reading_id)
 
-		# Controllers can only see their own readings
-		if current_user.role == "controller":
-			query = query.where(Reading.user_id == current_user.id)
+	# Controllers can only see their own readings
+	if current_user.role == "controller":
+		query = query.where(Reading.user_id == current_user.id)
 
-		result = await db.execute(query)
-		reading = result.scalar_one_or_none()
+	result = await db.execute(query)
+	reading = result.scalar_one_or_none()
 
-		if not reading:
-			raise HTTPException(
-				status_code=status.HTTP_404_NOT_FOUND,
-				detail="Reading not found"
-			)
+	if not reading:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Reading not found"
+		)
 
-		return ReadingResponse.model_validate(reading)
+	return ReadingResponse.model_validate(reading)
 
 
 @router.post("/", response_model=ReadingResponse, status_code=status.HTTP_201_CREATED)
 async def create_reading(
 		reading_data: ReadingCreate,
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_write_session),
 		current_user=Depends(get_current_user)
 ):
 	"""Create a new reading"""
-	async with session as db:
-		# Verify meter exists
-		meter_result = await db.execute(
-			select(Meter).where(Meter.id == reading_data.meter_id)
-		)
-		meter = meter_result.scalar_one_or_none()
-
-		if not meter:
+	# One INSERT: the client_id unique constraint handles duplicates (offline sync)
+	# and the meter_id foreign key replaces the meter existence check
+	stmt = (
+		pg_insert(Reading)
+		.values(**reading_data.model_dump(), user_id=current_user.id)
+		.on_conflict_do_nothing(index_elements=["client_id"])
+		.returning(Reading)
+	)
+	try:
+		reading = (await db.scalars(stmt)).one_or_none()
+	except IntegrityError as e:
+		if getattr(e.orig, "sqlstate", None) == FOREIGN_KEY_VIOLATION:
 			raise HTTPException(
 				status_code=status.HTTP_404_NOT_FOUND,
 				detail="Meter not found"
 			)
+		raise
 
-		# Check for duplicate client_id (offline sync)
-		if reading_data.client_id:
-			existing = await db.execute(
-				select(Reading).where(Reading.client_id == reading_data.client_id)
-			)
-			if existing.scalar_one_or_none():
-				raise HTTPException(
-					status_code=status.HTTP_409_CONFLICT,
-					detail="Reading with this client_id already exists"
-				)
-
-		reading = Reading(
-			**reading_data.model_dump(),
-			user_id=current_user.id
+	if reading is None:
+		raise HTTPException(
+			status_code=status.HTTP_409_CONFLICT,
+			detail="Reading with this client_id already exists"
 		)
-		db.add(reading)
 
-		# Update meter's last reading date
-		meter.last_reading_date = reading.reading_date
+	# Update meter's last reading date (same transaction)
+	meter_number = await db.scalar(
+		update(Meter)
+		.where(Meter.id == reading.meter_id)
+		.values(last_reading_date=reading.reading_date)
+		.returning(Meter.meter_number)
+	)
 
-		await db.commit()
-		await db.refresh(reading)
+	await db.commit()
 
-		logger.info(f"Reading created for meter {meter.meter_number}")
-		return ReadingResponse.model_validate(reading)
+	logger.info(f"Reading created for meter {meter_number}")
+	return ReadingResponse.model_validate(reading)
 
 
 @router.post("/sync", response_model=ReadingSyncResponse)
 async def sync_readings(
 		sync_request: ReadingSyncRequest,
-		session: AsyncSession = Depends(get_session),
+		session: AsyncSession = Depends(get_write_session),
 		current_user=Depends(get_current_user)
 ):
 	"""Sync multiple readings from mobile device"""
@@ -161,31 +186,38 @@ async def sync_readings(
 async def update_reading(
 		reading_id: str,
 		reading_update: ReadingUpdate,
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_write_session),
 		current_user=Depends(get_current_user)
 ):
 	"""Update a reading"""
-	async with session as db:
-		query = select(Reading).where(Reading.id == reading_id)
-
-		# Controllers can only update their own readings
-		if current_user.role == "controller":
-			query = query.where(Reading.user_id == current_user.id)
-
-		result = await db.execute(query)
-		reading = result.scalar_one_or_none()
+	criteria = [Reading.id == reading_id]
+
+	# Controllers can only update their own readings
+	if current_user.role == "controller":
+		criteria.append(Reading.user_id == current_user.id)
+
+	patch = reading_update.model_dump(exclude_unset=True)
+	if patch:
+		# UPDATE ... RETURNING: one round-trip instead of SELECT + flush + refresh
+		stmt = (
+			update(Reading)
+			.where(*criteria)
+			.values(**patch)
+			.returning(Reading)
+			.execution_options(synchronize_session=False)
+		)
+	else:
+		stmt = select(Reading).where(*criteria)
 
-		if not reading:
-			raise HTTPException(
-				status_code=status.HTTP_404_NOT_FOUND,
-				detail="Reading not found"
-			)
+	result = await db.execute(stmt)
+	reading = result.scalar_one_or_none()
 
-		# Update fields
-		for field, value in reading_update.model_dump(exclude_unset=True).items():
-			setattr(reading, field, value)
+	if not reading:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Reading not found"
+		)
 
-		await db.commit()
-		await db.refresh(reading)
+	await db.commit()
 
-		return ReadingResponse.model_validate(reading)
\ No newline at end of file
+	return ReadingResponse.model_validate(reading)
\ No newline at end of file
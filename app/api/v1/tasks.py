@@ -1,21 +1,47 @@
 # =====================================
 # api/app/api/v1/tasks.py
 # =====================================
-from celery.result import AsyncResult
 from fastapi import APIRouter, Depends, Query, HTTPException, status
+from pydantic import TypeAdapter
 from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
-from app.database import get_session
+from app.core.celery_app import get_task_meta, get_many_task_meta
+from app.database import get_write_session
 from app.schemas.task import TaskResponse, TaskStatusResponse
 from app.models.task import TaskResult, TaskStatus
 from app.auth.dependencies import get_current_user
 
 router = APIRouter()
 
+# Correspondance états Celery -> TaskStatus
+CELERY_TO_TASK_STATUS = {
+	"PENDING": TaskStatus.PENDING,
+	"RECEIVED": TaskStatus.PENDING,
+	"STARTED": TaskStatus.PROCESSING,
+	"RETRY": TaskStatus.PROCESSING,
+	"PROGRESS": TaskStatus.PROCESSING,
+	"SUCCESS": TaskStatus.COMPLETED,
+	"FAILURE": TaskStatus.FAILED,
+	"REVOKED": TaskStatus.CANCELLED,
+}
+TERMINAL_TASK_STATUSES = {TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED}
+
+_tasks_adapter = TypeAdapter(list[TaskResponse])
+
+
+def _terminal_values(celery_status: TaskStatus, info) -> dict:
+	"""Columns to persist when Celery reports a terminal state"""
+	values = {"status": celery_status}
+	if celery_status == TaskStatus.COMPLETED:
+		values["result"] = info
+	elif celery_status == TaskStatus.FAILED:
+		values["error_message"] = str(info.get("exc_message", info) if isinstance(info, dict) else info)
+	return values
+
 
 @router.get("/", response_model=List[TaskResponse])
 async def list_user_tasks(
@@ -23,88 +49,109 @@ async def list_user_tasks(
 		task_name: Optional[str] = None,
 		skip: int = Query(0, ge=0),
 		limit: int = Query(20, ge=1, le=100),
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_write_session),
 		current_user=Depends(get_current_user)
 ):
 	"""List all tasks for current user"""
-	async with session as db:
-		query = select(TaskResult).where(TaskResult.user_id == current_user.id)
-
-		if status:
-			query = query.where(TaskResult.status == status)
-		if task_name:
-			query = query.where(TaskResult.task_name == task_name)
-
-		query = query.order_by(TaskResult.created_at.desc())
-		query = query.offset(skip).limit(limit)
-
-		result = await db.execute(query)
-		tasks = result.scalars().all()
+	query = select(TaskResult).where(TaskResult.user_id == current_user.id)
+
+	if status:
+		query = query.where(TaskResult.status == status)
+	if task_name:
+		query = query.where(TaskResult.task_name == task_name)
+
+	query = query.order_by(TaskResult.created_at.desc())
+	query = query.offset(skip).limit(limit)
+
+	result = await db.execute(query)
+	tasks = result.scalars().all()
+	responses = _tasks_adapter.validate_python(tasks, from_attributes=True)
+
+	# Refresh every unfinished task from Celery with one MGET
+	pending = [i for i, task in enumerate(tasks) if task.status not in TERMINAL_TASK_STATUSES]
+	metas = await get_many_task_meta([tasks[i].id for i in pending])
+
+	updates = []
+	for i in pending:
+		state, info = metas[tasks[i].id]
+		celery_status = CELERY_TO_TASK_STATUS.get(state, TaskStatus.PROCESSING)
+		if celery_status in TERMINAL_TASK_STATUSES:
+			values = _terminal_values(celery_status, info)
+			updates.append({"id": tasks[i].id, **values})
+		else:
+			values = {"status": celery_status}
+		responses[i] = responses[i].model_copy(update=values)
+
+	# Terminal transitions persisted in a single executemany UPDATE (by primary key)
+	if updates:
+		await db.execute(update(TaskResult), updates)
+		await db.commit()
 
-		return [TaskResponse.model_validate(task) for task in tasks]
+	return responses
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task_details(
 		task_id: str,
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_write_session),
 		current_user=Depends(get_current_user)
 ):
 	"""Get detailed task information"""
-	async with session as db:
-		result = await db.execute(
-			select(TaskResult).where(
-				TaskResult.id == task_id,
-				TaskResult.user_id == current_user.id
-			)
+	result = await db.execute(
+		select(TaskResult).where(
+			TaskResult.id == task_id,
+			TaskResult.user_id == current_user.id
 		)
-		task = result.scalar_one_or_none()
-
-		if not task:
-			raise HTTPException(
-				status_code=status.HTTP_404_NOT_FOUND,
-				detail="Task not found"
-			)
-
-		# Get real-time status from Celery
-		celery_result = AsyncResult(task_id)
-
-		# Update task status if needed
-		if celery_result.state != task.status:
-			task.status = TaskStatus(celery_result.state.lower())
-			if celery_result.state == "SUCCESS":
-				task.result = celery_result.result
-			elif celery_result.state == "FAILURE":
-				task.error_message = str(celery_result.info)
-			await db.commit()
+	)
+	task = result.scalar_one_or_none()
 
+	if not task:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Task not found"
+		)
+
+	# Already final in Postgres: no need to ask Celery
+	if task.status in TERMINAL_TASK_STATUSES:
+		return TaskResponse.model_validate(task)
+
+	# Get real-time status from Celery (non-blocking read of the result backend)
+	state, info = await get_task_meta(task_id)
+	celery_status = CELERY_TO_TASK_STATUS.get(state, TaskStatus.PROCESSING)
+
+	# Persist only terminal transitions; polling while running writes nothing
+	if celery_status in TERMINAL_TASK_STATUSES:
+		for key, value in _terminal_values(celery_status, info).items():
+			setattr(task, key, value)
+		await db.commit()
 		return TaskResponse.model_validate(task)
 
+	return TaskResponse.model_validate(task).model_copy(update={"status": celery_status})
+
 
 @router.delete("/{task_id}")
 async def delete_task_result(
 		task_id: str,
-		session: AsyncSession = Depends(get_session),
+		db: AsyncSession = Depends(get_write_session),
 		current_user=Depends(get_current_user)
 ):
 	"""Delete completed task result"""
-	async with session as db:
-		result = await db.execute(
-			select(TaskResult).where(
-				TaskResult.id == task_id,
-				TaskResult.user_id == current_user.id,
-				TaskResult.status.in_([TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED])
-			)
+	result = await db.execute(
+		select(TaskResult).where(
+			TaskResult.id == task_id,
+			TaskResult.user_id == current_user.id,
+			TaskResult.status.in_([TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED])
 		)
-		task = result.scalar_one_or_none()
+	)
+	task = result.scalar_one_or_none()
 
-		if not task:
-			raise HTTPException(
-				status_code=status.HTTP_404_NOT_FOUND,
-				detail="Task not found or still running"
-			)
+	if not task:
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Task not found or still running"
+		)
 
-		await db.delete(task)
-		await db.commit()
+	await db.delete(task)
+	await db.commit()
 
-		return {"message": "Task result deleted successfully"}
\ No newline at end of file
+	return {"message": "Task result deleted successfully"}
\ No newline at end of file
@@ -1,16 +1,16 @@
 import logging
 
-from datetime import datetime
 from typing import List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import TypeAdapter
 from sqlalchemy import update, select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user, get_current_admin
+from app.auth.dependencies import CurrentUser, get_current_user, get_current_admin, invalidate_user
 from app.auth.jwt import auth_service
-from app.database import get_session
+from app.database import get_session, get_write_session
 from app.models.user import User
 from app.schemas.auth import UserResponse, UpdateProfileRequest, UserProfileResponse, AdminChangePasswordRequest
 
@@ -18,19 +18,21 @@ router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+_users_adapter = TypeAdapter(list[UserProfileResponse])
+
 @router.get("/users", response_model=List[UserProfileResponse], status_code=status.HTTP_200_OK)
 async def get_users(
         session: AsyncSession = Depends(get_session),
-        _: User = Depends(get_current_admin)
+        _: CurrentUser = Depends(get_current_admin)
 ):
     stmt = select(User)
     result = await session.execute(stmt)
     users = result.scalars().all()
-    return users
+    return _users_adapter.validate_python(users, from_attributes=True)
 
 @router.get("/profile", response_model=UserResponse)
 async def get_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_session)
 ):
     """
@@ -52,38 +54,40 @@ async def get_profile(
 async def admin_change_password(
         user_id: UUID,
         body: AdminChangePasswordRequest,
-        session: AsyncSession = Depends(get_session),
-        _: User = Depends(get_current_admin)
+        session: AsyncSession = Depends(get_write_session),
+        _: CurrentUser = Depends(get_current_admin)
 ):
     if body.user_id != user_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inconsistent user_id between URL and request")
-    result = await session.execute(
-        select(User).where(User.id == user_id)
-    )
-    user = result.scalar_one_or_none()
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     try:
-        hashed = auth_service.hash_password(body.new_password)
-        await session.execute(
-            update(User).where(User.id == user_id).values(hashed_password=hashed, updated_at=datetime.utcnow())
+        hashed = await auth_service.hash_password_async(body.new_password)
+        # Single UPDATE ... RETURNING: no prior SELECT, no refresh
+        result = await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(hashed_password=hashed)
+            .returning(User)
+            .execution_options(synchronize_session=False)
         )
-        await session.commit()
-        await session.refresh(user)
-        return UserResponse.from_orm(user)
+        user = result.scalar_one_or_none()
     except Exception as e:
         logger.error(f"Error changing password: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error changing password"
         )
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await session.commit()
+    invalidate_user(user_id)
+    return UserResponse.from_orm(user)
 
 @router.put("/update/{user_id}", response_model=UserProfileResponse)
 async def update_profile(
     user_id: UUID,
     user_data: UpdateProfileRequest,
-    db: AsyncSession = Depends(get_session),
-    _: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_write_session),
+    _: CurrentUser = Depends(get_current_admin)
 ):
     """
     Updates a user's profile (by ID).
@@ -97,16 +101,6 @@ async def update_profile(
     Returns:
     - Updated user information
     """
-    stmt = select(User).where(User.id == user_id)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
     try:
         update_data = user_data.model_dump(exclude_unset=True)
 
@@ -115,13 +109,24 @@ async def update_profile(
         for field in protected_fields:
             update_data.pop(field, None)
 
-        for k, v in update_data.items():
-            setattr(user, k, v)
+        # Single UPDATE ... RETURNING: no prior SELECT, no refresh
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(**update_data)
+            .returning(User)
+            .execution_options(synchronize_session=False)
+        )
+        user = result.scalar_one_or_none()
 
-        user.updated_at = datetime.utcnow()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
 
         await db.commit()
-        await db.refresh(user)
+        invalidate_user(user_id)
 
         return UserProfileResponse.model_validate(user)
 
@@ -138,8 +143,8 @@ async def update_profile(
 @router.delete("/profile/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_profile(
     user_id: UUID,
-    db: AsyncSession = Depends(get_session),
-    current_admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_write_session),
+    current_admin: CurrentUser = Depends(get_current_admin)
 ):
     """
     Permanently deletes a user's account specified by their ID (admin only).
@@ -148,26 +153,26 @@ async def delete_profile(
     - **204 No Content** if deletion is successful.
     """
     try:
-        # Check if the user exists
-        result = await db.execute(select(User).where(User.id == user_id))
-        target_user = result.scalar_one_or_none()
-
-        if not target_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"User with ID {user_id} not found"
-            )
-
         # Prevent admin from deleting their own account
-        if target_user.id == current_admin.id:
+        if user_id == current_admin.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="An administrator cannot delete their own account"
             )
 
-        # Permanently delete the account
-        await db.execute(delete(User).where(User.id == user_id))
+        # Permanently delete the account: DELETE ... RETURNING doubles as the existence check
+        deleted_id = await db.scalar(
+            delete(User)
+            .where(User.id == user_id, User.id != current_admin.id)
+            .returning(User.id)
+        )
+        if deleted_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with ID {user_id} not found"
+            )
         await db.commit()
+        invalidate_user(user_id)
 
         logger.info(f"User permanently deleted (ID: {user_id})")
 
@@ -1,53 +1,139 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from typing import Dict, Set
-import json
+from typing import Dict, Optional, Set
+from weakref import WeakSet
 import asyncio
-from app.auth.jwt import auth_service
-from app.core.celery_app import celery_app
-from celery.result import AsyncResult
+
+import orjson
+from app.auth.dependencies import decode_token_cached
+from app.core.celery_app import get_task_meta
+from app.core.redis import get_redis, WS_USER_CHANNEL, WS_TASK_CHANNEL, WS_BROADCAST_CHANNEL
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Réponse constante, encodée une fois pour toutes
+PONG_PAYLOAD = orjson.dumps({"type": "pong"}).decode()
+
+WS_USER_PREFIX = WS_USER_CHANNEL.format("")
+WS_TASK_PREFIX = WS_TASK_CHANNEL.format("")
+
+
+def _encode(message: dict) -> str:
+	"""Encode a message once (orjson), to be sent as-is to every socket"""
+	return orjson.dumps(message).decode()
+
 
 class ConnectionManager:
-	"""Manage WebSocket connections for real-time updates"""
+	"""
+	Manage WebSocket connections for real-time updates.
+
+	Sockets stay local to each worker; messages go through Redis pub/sub so that
+	any process (API worker or Celery) publishes once and every worker holding a
+	matching socket forwards it.
+	"""
 
 	def __init__(self):
-		self.active_connections: Dict[str, Set[WebSocket]] = {}
-		self.task_subscriptions: Dict[str, Set[str]] = {}  # task_id -> user_ids
+		# WeakSet: a socket dropped without a clean disconnect is reclaimed by the GC
+		self.active_connections: Dict[str, WeakSet[WebSocket]] = {}
+		self.task_subscriptions: Dict[str, Set[str]] = {}  # task_id -> user_ids (local)
+		self._listener: Optional[asyncio.Task] = None
 
 	async def connect(self, websocket: WebSocket, user_id: str):
 		await websocket.accept()
-		if user_id not in self.active_connections:
-			self.active_connections[user_id] = set()
-		self.active_connections[user_id].add(websocket)
+		self.active_connections.setdefault(user_id, WeakSet()).add(websocket)
+		self._ensure_listener()
 		logger.info(f"User {user_id} connected via WebSocket")
 
 	def disconnect(self, websocket: WebSocket, user_id: str):
-		if user_id in self.active_connections:
-			self.active_connections[user_id].discard(websocket)
-			if not self.active_connections[user_id]:
+		conns = self.active_connections.get(user_id)
+		if conns is not None:
+			conns.discard(websocket)
+			if not conns:
 				del self.active_connections[user_id]
 		logger.info(f"User {user_id} disconnected from WebSocket")
 
 	async def send_personal_message(self, message: dict, user_id: str):
-		if user_id in self.active_connections:
-			disconnected = set()
-			for connection in self.active_connections[user_id]:
-				try:
-					await connection.send_json(message)
-				except:
-					disconnected.add(connection)
-
-			# Clean up disconnected
-			for conn in disconnected:
-				self.active_connections[user_id].discard(conn)
+		await self._publish(WS_USER_CHANNEL.format(user_id), _encode(message))
 
 	async def broadcast_to_users(self, message: dict, user_ids: Set[str]):
-		for user_id in user_ids:
-			await self.send_personal_message(message, user_id)
+		# Un seul PUBLISH ; chaque worker ne relaie qu'à ses propres sockets
+		envelope = _encode({"user_ids": list(user_ids), "message": message})
+		await self._publish(WS_BROADCAST_CHANNEL, envelope)
+
+	async def publish_task_update(self, task_id: str, message: dict):
+		"""Send a message to every user subscribed to a task, on any worker"""
+		await self._publish(WS_TASK_CHANNEL.format(task_id), _encode(message))
+
+	async def _publish(self, channel: str, payload: str):
+		try:
+			client = await get_redis()
+			await client.publish(channel, payload)
+		except Exception as e:
+			# Redis indisponible : livraison locale uniquement
+			logger.warning(f"WebSocket publish on {channel} failed: {e}")
+			await self._dispatch(channel, payload)
+
+	def _ensure_listener(self):
+		if self._listener is None or self._listener.done():
+			self._listener = asyncio.create_task(self._listen())
+
+	async def _listen(self):
+		"""Per-worker loop: forward pub/sub messages to the local sockets"""
+		while True:
+			pubsub = None
+			try:
+				client = await get_redis()
+				pubsub = client.pubsub(ignore_subscribe_messages=True)
+				await pubsub.psubscribe(WS_USER_CHANNEL.format("*"), WS_TASK_CHANNEL.format("*"))
+				await pubsub.subscribe(WS_BROADCAST_CHANNEL)
+				async for message in pubsub.listen():
+					if message["type"] not in ("message", "pmessage"):
+						continue
+					# Un message malformé est ignoré sans couper l'abonnement
+					try:
+						await self._dispatch(message["channel"], message["data"])
+					except Exception as e:
+						logger.error(f"WebSocket dispatch on {message['channel']} failed: {e}")
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.error(f"WebSocket pub/sub listener error: {e}")
+				await asyncio.sleep(1)
+			finally:
+				if pubsub is not None:
+					await pubsub.aclose()
+
+	async def _dispatch(self, channel: str, payload: str):
+		if channel == WS_BROADCAST_CHANNEL:
+			envelope = orjson.loads(payload)
+			user_ids = [uid for uid in envelope["user_ids"] if uid in self.active_connections]
+			if not user_ids:
+				return
+			payload = _encode(envelope["message"])
+		elif channel.startswith(WS_TASK_PREFIX):
+			user_ids = list(self.task_subscriptions.get(channel[len(WS_TASK_PREFIX):], ()))
+		elif channel.startswith(WS_USER_PREFIX):
+			user_ids = [channel[len(WS_USER_PREFIX):]]
+		else:
+			return
+
+		await asyncio.gather(
+			*(self._send_payload(payload, user_id) for user_id in user_ids),
+			return_exceptions=True
+		)
+
+	async def _send_payload(self, payload: str, user_id: str):
+		"""Send an already-encoded message to every local socket of a user concurrently"""
+		conns = self.active_connections.get(user_id)
+		if not conns:
+			return
+		# Snapshot: the WeakSet may shrink while the sends are awaited.
+		# Failed sends are ignored; the socket leaves on disconnect or GC
+		await asyncio.gather(
+			*(connection.send_text(payload) for connection in tuple(conns)),
+			return_exceptions=True
+		)
 
 	def subscribe_to_task(self, task_id: str, user_id: str):
 		if task_id not in self.task_subscriptions:
@@ -60,6 +146,16 @@ class ConnectionManager:
 			if not self.task_subscriptions[task_id]:
 				del self.task_subscriptions[task_id]
 
+	async def close(self):
+		"""Stop the pub/sub listener (application shutdown)"""
+		if self._listener is not None:
+			self._listener.cancel()
+			try:
+				await self._listener
+			except asyncio.CancelledError:
+				pass
+			self._listener = None
+
 
 manager = ConnectionManager()
 
@@ -70,8 +166,8 @@ async def websocket_endpoint(
 		token: str = Query(...)
 ):
 	"""WebSocket endpoint for real-time task updates"""
-	# Validate token
-	payload = auth_service.decode_token(token)
+	# Validate token once per connection (shared decode cache, honours revocation)
+	payload = await decode_token_cached(token)
 	if not payload:
 		await websocket.close(code=1008, reason="Invalid token")
 		return
@@ -80,6 +176,7 @@ async def websocket_endpoint(
 	if not user_id:
 		await websocket.close(code=1008, reason="Invalid token payload")
 		return
+	websocket.scope["user_id"] = user_id
 
 	await manager.connect(websocket, user_id)
 
@@ -102,7 +199,7 @@ async def websocket_endpoint(
 					manager.unsubscribe_from_task(task_id, user_id)
 
 			elif message_type == "ping":
-				await websocket.send_json({"type": "pong"})
+				await websocket.send_text(PONG_PAYLOAD)
 
 	except WebSocketDisconnect:
 		manager.disconnect(websocket, user_id)
@@ -113,13 +210,13 @@ async def websocket_endpoint(
 
 async def send_task_status(task_id: str, user_id: str):
 	"""Send current task status to user"""
-	result = AsyncResult(task_id)
+	state, info = await get_task_meta(task_id)
 
 	message = {
 		"type": "task_update",
 		"task_id": task_id,
-		"status": result.state,
-		"info": result.info if result.state != "FAILURE" else str(result.info)
+		"status": state,
+		"info": info if state != "FAILURE" else str(info)
 	}
 
 	await manager.send_personal_message(message, user_id)
\ No newline at end of file
@@ -1,53 +1,161 @@
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TLRUCache, TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.jwt import auth_service
-from app.database import get_session
+from app.auth.jwt import auth_service, token_key as _token_key
+from app.core.redis import get_redis
+from app.database import get_user_lookup_session
 from app.models.user import User, UserRole
 
 security = HTTPBearer()
 
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+	"""Instantané immuable de l'utilisateur authentifié, partageable entre requêtes (pas d'objet ORM)"""
+	id: uuid.UUID
+	username: str
+	full_name: Optional[str]
+	role: UserRole
+	is_active: bool
+
+	@classmethod
+	def from_user(cls, user: User) -> "CurrentUser":
+		return cls(
+			id=user.id,
+			username=user.username,
+			full_name=user.full_name,
+			role=user.role,
+			is_active=user.is_active,
+		)
+
+
+# Durée maximale pendant laquelle un jeton vérifié est servi sans consulter Redis (secondes) :
+# borne le délai de prise en compte d'un logout fait sur un autre worker
+VERIFIED_TOKEN_TTL = 10
+# Jetons révoqués (logout), partagés par tous les workers ; la clé expire avec le jeton
+REVOKED_TOKEN_KEY = "rev:{}"
+
+
+def _verified_ttu(_key, verified: Tuple[Dict[str, Any], str, UserRole, bool], now: float) -> float:
+	"""Une entrée expire après VERIFIED_TOKEN_TTL, jamais après le claim exp du jeton"""
+	return min(now + VERIFIED_TOKEN_TTL, verified[0].get("exp", now))
+
+
+# Caches locaux au processus, indexés par l'empreinte du jeton (jamais le jeton brut)
+# Jetons déjà vérifiés par get_current_user : (payload, user_id, role, is_active)
+_verified_tokens: TLRUCache = TLRUCache(maxsize=10000, ttu=_verified_ttu, timer=time.time)
+# Courte durée : borne le délai de prise en compte d'un changement fait sur un autre worker
+_user_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+
+async def revoke_token(token: str) -> None:
+	"""Refuse ce jeton sur tous les workers jusqu'à son expiration (logout)"""
+	key = _token_key(token)
+	payload = auth_service.decode_token(token)
+	if payload is not None:
+		redis_client = await get_redis()
+		await redis_client.set(REVOKED_TOKEN_KEY.format(key.hex()), 1, pxat=int(payload["exp"] * 1000))
+	_verified_tokens.pop(key, None)
+	auth_service.forget_token(token)
+
+
+async def decode_token_cached(token: str) -> Optional[Dict[str, Any]]:
+	"""Payload d'un jeton valide, ou None s'il est invalide, expiré ou révoqué"""
+	payload = auth_service.decode_token(token)
+	if payload is None:
+		return None
+	redis_client = await get_redis()
+	if await redis_client.exists(REVOKED_TOKEN_KEY.format(_token_key(token).hex())):
+		return None
+	return payload
+
+
+def invalidate_user(user_id) -> None:
+	"""Retire un utilisateur des caches après modification ou suppression"""
+	user_id = str(user_id)
+	_user_cache.pop(user_id, None)
+	for key, verified in list(_verified_tokens.items()):
+		if verified[1] == user_id:
+			_verified_tokens.pop(key, None)
+
+
+async def load_user(user_id: str, session: AsyncSession) -> Optional[CurrentUser]:
+	"""Utilisateur par id, servi depuis le cache quand il y est (pas de SELECT)"""
+	user = _user_cache.get(user_id)
+	if user is None:
+		try:
+			pk = uuid.UUID(str(user_id))
+		except ValueError:
+			return None
+		try:
+			row = await session.get(User, pk)
+			user = CurrentUser.from_user(row) if row is not None else None
+		finally:
+			# Session courte : la connexion retourne au pool avant le handler,
+			# qui n'en tient donc jamais deux à la fois
+			await session.close()
+		if user is None:
+			return None
+		_user_cache[user_id] = user
+	return user
+
+
 async def get_current_user(
 		credentials: HTTPAuthorizationCredentials = Depends(security),
-		session: AsyncSession = Depends(get_session)
-) -> User:
+		session: AsyncSession = Depends(get_user_lookup_session)
+) -> CurrentUser:
 	"""Get current authenticated user"""
 	token = credentials.credentials
-	payload = auth_service.decode_token(token)
+	key = _token_key(token)
 
-	if not payload:
-		raise HTTPException(
-			status_code=status.HTTP_401_UNAUTHORIZED,
-			detail="Invalid authentication credentials",
-			headers={"WWW-Authenticate": "Bearer"}
-		)
-	user_id = payload.get("sub")
-	if not user_id:
-		raise HTTPException(
-			status_code=status.HTTP_401_UNAUTHORIZED,
-			detail="Invalid token payload"
-		)
+	# La révocation (Redis) n'est testée qu'à l'absence du cache, soit au plus
+	# toutes les VERIFIED_TOKEN_TTL secondes par jeton et par worker
+	verified = _verified_tokens.get(key)
+	if verified is None:
+		payload = await decode_token_cached(token)
+		if not payload:
+			raise HTTPException(
+				status_code=status.HTTP_401_UNAUTHORIZED,
+				detail="Invalid authentication credentials",
+				headers={"WWW-Authenticate": "Bearer"}
+			)
 
-	async with session as db:
-		result = await db.execute(select(User).where(User.id == user_id))
-		user = result.scalar_one_or_none()
+		user_id = payload.get("sub")
+		if not user_id:
+			raise HTTPException(
+				status_code=status.HTTP_401_UNAUTHORIZED,
+				detail="Invalid token payload"
+			)
+	else:
+		payload, user_id, _, _ = verified
 
+	user = await load_user(user_id, session)
 	if not user:
 		raise HTTPException(
 			status_code=status.HTTP_404_NOT_FOUND,
 			detail="User not found"
 		)
 
-	if not user.is_active:
+	if verified is None:
+		verified = (payload, user_id, user.role, user.is_active)
+		_verified_tokens[key] = verified
+
+	_, _, _, is_active = verified
+	if not is_active:
 		raise HTTPException(
 			status_code=status.HTTP_400_BAD_REQUEST,
 			detail="Inactive user"
 		)
 	return user
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
 	"""Require admin role"""
 	if current_user.role != UserRole.ADMIN:
 		raise HTTPException(
@@ -56,13 +164,18 @@ async def get_current_admin(current_user: User = Depends(get_current_user)) -> U
 		)
 	return current_user
 
-def require_role(roles: list[UserRole]):
+def require_role(roles: list[UserRole] | tuple[UserRole, ...]):
 	"""Role-based access control decorator"""
-	async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+	# Même jeu de rôles -> même dépendance : FastAPI la résout une seule fois par requête
+	return _role_checker(tuple(roles))
+
+@lru_cache(maxsize=32)
+def _role_checker(roles: tuple[UserRole, ...]):
+	async def role_checker(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
 		if current_user.role not in roles:
 			raise HTTPException(
 				status_code=status.HTTP_403_FORBIDDEN,
-				detail=f"Insufficient permissions. Required roles: {roles}"
+				detail=f"Insufficient permissions. Required roles: {list(roles)}"
 			)
 		return current_user
 	return role_checker
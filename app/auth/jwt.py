@@ -1,7 +1,16 @@
+import asyncio
+import hashlib
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta, datetime, timezone
-from typing import Dict, Any, Optional
-from jose import JWTError, jwt
+from typing import Dict, Any, Optional, Tuple
+
+from cachetools import TLRUCache
+import jwt
+from jwt import InvalidTokenError
 
 from passlib.context import CryptContext
 
@@ -9,7 +18,62 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# argon2id pour les nouveaux hachages ; les hachages bcrypt existants restent valides
+# et sont re-hachés à la prochaine connexion réussie (deprecated="auto")
+pwd_context = CryptContext(
+	schemes=["argon2", "bcrypt"],
+	default="argon2",
+	deprecated="auto",
+	bcrypt__rounds=settings.BCRYPT_ROUNDS,
+	argon2__type="ID",
+	argon2__time_cost=2,
+	argon2__memory_cost=19456,
+	argon2__parallelism=1,
+)
+
+# Hachage/vérification des mots de passe dans des processus dédiés (créés au premier appel) :
+# la boucle d'événements reste libre ; chaque worker gunicorn a son pool, les cœurs sont
+# donc partagés entre les WORKERS pools au lieu d'être tous réclamés par chacun
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+	global _hash_pool
+	if _hash_pool is None:
+		_hash_pool = ProcessPoolExecutor(
+			max_workers=max(1, (os.cpu_count() or 1) // settings.WORKERS),
+			mp_context=multiprocessing.get_context("spawn"),
+		)
+	return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+	"""Stop the password hashing processes (application shutdown)"""
+	global _hash_pool
+	if _hash_pool is not None:
+		_hash_pool.shutdown(wait=False, cancel_futures=True)
+		_hash_pool = None
+
+
+async def _run_in_hash_pool(func, *args):
+	return await asyncio.get_running_loop().run_in_executor(_get_hash_pool(), func, *args)
+
+# Durée maximale de mise en cache d'un jeton décodé (secondes)
+TOKEN_CACHE_TTL = 60
+
+
+def _token_ttu(_key, payload: Dict[str, Any], now: float) -> float:
+	"""Une entrée expire après TOKEN_CACHE_TTL, jamais après le claim exp du jeton"""
+	return min(now + TOKEN_CACHE_TTL, payload.get("exp", now))
+
+
+# Payloads décodés, indexés par l'empreinte du jeton (jamais le jeton brut)
+_token_cache: TLRUCache = TLRUCache(maxsize=10000, ttu=_token_ttu, timer=time.time)
+
+
+def token_key(token: str) -> bytes:
+	"""Empreinte courte d'un jeton servant de clé de cache"""
+	return hashlib.sha256(token.encode()).digest()[:16]
 
 
 class AuthService:
@@ -18,11 +82,26 @@ class AuthService:
 		"""Verify a password against its hash"""
 		return pwd_context.verify(plain_password, hashed_password)
 
+	@staticmethod
+	def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+		"""Verify a password; also returns a new hash when the stored one uses a deprecated scheme"""
+		return pwd_context.verify_and_update(plain_password, hashed_password)
+
 	@staticmethod
 	def hash_password(password: str) -> str:
 		"""Hash a password"""
 		return pwd_context.hash(password)
 
+	@staticmethod
+	async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+		"""verify_and_update_password run in the hashing process pool"""
+		return await _run_in_hash_pool(AuthService.verify_and_update_password, plain_password, hashed_password)
+
+	@staticmethod
+	async def hash_password_async(password: str) -> str:
+		"""hash_password run in the hashing process pool"""
+		return await _run_in_hash_pool(AuthService.hash_password, password)
+
 	@staticmethod
 	def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
 		"""Create JWT access token"""
@@ -41,13 +120,25 @@ class AuthService:
 
 	@staticmethod
 	def decode_token(token: str) -> Optional[Dict[str, Any]]:
-		"""Decode and validate JWT token"""
-		try:
-			payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+		"""Decode and validate JWT token (cached until min(60 s, exp); failures are never cached)"""
+		key = token_key(token)
+		payload = _token_cache.get(key)
+		if payload is not None:
 			return payload
-		except JWTError as e:
+		try:
+			payload = jwt.decode(
+				token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM], options={"require": ["exp"]}
+			)
+		except InvalidTokenError as e:
 			logger.error(f"JWT decode error: {e}")
 			return None
+		_token_cache[key] = payload
+		return payload
+
+	@staticmethod
+	def forget_token(token: str) -> None:
+		"""Drop a token from the decode cache (logout)"""
+		_token_cache.pop(token_key(token), None)
 
 
 auth_service = AuthService()
\ No newline at end of file
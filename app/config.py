@@ -1,6 +1,7 @@
 from functools import lru_cache
 from typing import List, Optional
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from dotenv import load_dotenv
@@ -24,16 +25,21 @@ class Settings(BaseSettings):
 	DATABASE_URL: str
 	PROD_DB_URL: str
 	DB_POOL_SIZE: int = 20
-	DB_MAX_OVERFLOW: int = 40
+	DB_MAX_OVERFLOW: int = 10
+	DB_SYNC_POOL_SIZE: int = 5  # Celery workers (sync engine)
+	DB_POOL_TIMEOUT: int = 5  # seconds to wait for a pooled connection before failing
 	DB_POOL_PRE_PING: bool = True
+	DB_POOL_RECYCLE: int = 1800
 	DB_ECHO: bool = False
+	DB_STATEMENT_CACHE_SIZE: int = 500  # asyncpg prepared statements per connection (0 behind pgbouncer)
 	AUTO_CREATE_TABLES: bool = False
 
 	# Redis
 	REDIS_URL: str
 	PRO_REDIS_URL: str
 	REDIS_TTL: int = 3600
-	REDIS_POOL_SIZE: int = 10
+	REDIS_POOL_SIZE: int = 50  # includes the long-lived pub/sub listener connections
+	REDIS_POOL_TIMEOUT: int = 5  # seconds to wait for a free pooled connection
 
 	# JWT
 	JWT_SECRET: str
@@ -62,6 +68,7 @@ class Settings(BaseSettings):
 	RATE_LIMIT_PER_MINUTE: int = 60
 	ALLOWED_HOSTS: List[str] = ["*"]
 	REQUIRE_API_KEY: bool = False
+	API_KEY_PEPPER: str = ""  # secret key for the stored API key hashes (keyed BLAKE2b)
 
 	# Monitoring
 	EXPOSE_METRICS: bool = True
@@ -76,6 +83,16 @@ class Settings(BaseSettings):
 		case_sensitive=True
 	)
 
+	@model_validator(mode="after")
+	def check_api_key_pepper(self) -> "Settings":
+		# Sans pepper, blake2b(key=b"") redevient un hachage non keyé : refus de démarrer
+		if self.REQUIRE_API_KEY and not self.API_KEY_PEPPER:
+			raise ValueError("API_KEY_PEPPER must be set when REQUIRE_API_KEY is enabled")
+		# Clé BLAKE2b : au plus 64 octets ; tronquer ferait partager les hachages à deux peppers distincts
+		if len(self.API_KEY_PEPPER.encode()) > 64:
+			raise ValueError("API_KEY_PEPPER must be at most 64 bytes")
+		return self
+
 
 @lru_cache()
 def get_settings() -> Settings:
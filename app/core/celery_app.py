@@ -1,6 +1,16 @@
 # app/core/celery_app.py
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
 from celery import Celery
+from celery.result import AsyncResult
+
 from app.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
 
 celery_app = Celery(
     "metersync",
@@ -16,5 +26,47 @@ celery_app.conf.update(
     worker_prefetch_multiplier=1,   # pas de sur-prélecture
     result_expires=3600,            # 1h
     task_track_started=True,
+    # Connexions broker réutilisées entre publications (pas de reconnexion par envoi)
+    broker_pool_limit=10,
+    broker_connection_retry_on_startup=True,
     include=["app.tasks.meter_import"],
 )
+
+
+# États Celery terminaux
+TASK_READY_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+async def get_task_meta(task_id: str) -> Tuple[str, Any]:
+    """État et résultat/meta d'une tâche, lus dans le backend Redis sans bloquer la boucle"""
+    try:
+        client = await get_redis()
+        payload = await client.get(f"celery-task-meta-{task_id}")
+    except Exception as e:
+        # Repli : AsyncResult (bloquant) exécuté dans un thread
+        logger.warning(f"Lecture Redis impossible pour la tâche {task_id}: {e}")
+        res = AsyncResult(task_id, app=celery_app)
+        return await asyncio.to_thread(lambda: (res.state, res.info))
+
+    return _parse_task_meta(payload)
+
+
+async def get_many_task_meta(task_ids: List[str]) -> Dict[str, Tuple[str, Any]]:
+    """État et résultat de plusieurs tâches en un seul MGET sur le backend Redis"""
+    if not task_ids:
+        return {}
+    try:
+        client = await get_redis()
+        payloads = await client.mget([f"celery-task-meta-{task_id}" for task_id in task_ids])
+    except Exception as e:
+        logger.warning(f"Lecture Redis groupée impossible: {e}")
+        return {task_id: await get_task_meta(task_id) for task_id in task_ids}
+
+    return {task_id: _parse_task_meta(payload) for task_id, payload in zip(task_ids, payloads)}
+
+
+def _parse_task_meta(payload) -> Tuple[str, Any]:
+    if payload is None:
+        return "PENDING", None
+    data = json.loads(payload)
+    return data.get("status", "PENDING"), data.get("result")
@@ -1,12 +1,22 @@
 import redis.asyncio as redis
+import redis as redis_sync
 from typing import Optional
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-redis_pool: Optional[redis.ConnectionPool] = None
+redis_pool: Optional[redis.BlockingConnectionPool] = None
 redis_client: Optional[redis.Redis] = None
+redis_sync_client: Optional[redis_sync.Redis] = None
+
+# Pub/sub channels for WebSocket fan-out, shared by every API worker and Celery
+WS_USER_CHANNEL = "ws:user:{}"
+WS_TASK_CHANNEL = "ws:task:{}"
+WS_BROADCAST_CHANNEL = "ws:broadcast"
+
+# Revoked API key digests, dropped from every worker's local cache
+API_KEY_INVALIDATE_CHANNEL = "api_key:invalidate"
 
 
 async def init_redis():
@@ -14,9 +24,12 @@ async def init_redis():
 	global redis_pool, redis_client
 
 	try:
-		redis_pool = redis.ConnectionPool.from_url(
-			settings.REDIS_URL if settings.DEBUG else settings.PRO_REDIS_URL,
+		# Un seul pool par processus ; bloquant : en rafale on attend une connexion
+		# libre (REDIS_POOL_TIMEOUT) au lieu d'échouer sur "Too many connections"
+		redis_pool = redis.BlockingConnectionPool.from_url(
+			_redis_url(),
 			max_connections=settings.REDIS_POOL_SIZE,
+			timeout=settings.REDIS_POOL_TIMEOUT,
 			decode_responses=True,
 			health_check_interval=30
 		)
@@ -32,6 +45,10 @@ async def init_redis():
 		raise
 
 
+def _redis_url() -> str:
+	return settings.REDIS_URL if settings.DEBUG else settings.PRO_REDIS_URL
+
+
 async def get_redis() -> redis.Redis:
 	"""Get Redis client"""
 	if not redis_client:
@@ -62,4 +79,13 @@ async def check_redis_connection() -> bool:
 		return True
 	except Exception as e:
 		logger.error(f"Redis health check failed: {e}")
-		return False
\ No newline at end of file
+		return False
+
+
+def publish_sync(channel: str, payload: str) -> int:
+	"""Publish from synchronous code (Celery workers); returns the number of receivers"""
+	global redis_sync_client
+
+	if redis_sync_client is None:
+		redis_sync_client = redis_sync.Redis.from_url(_redis_url(), decode_responses=True)
+	return redis_sync_client.publish(channel, payload)
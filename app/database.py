@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
@@ -5,7 +6,7 @@ from typing import Any, AsyncGenerator
 
 from sqlalchemy import NullPool, create_engine, text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.config import settings
 
@@ -18,6 +19,7 @@ if settings.DEBUG:
         settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
         echo=settings.DB_ECHO,
         poolclass=NullPool,
+        query_cache_size=1200,
     )
 else:
     # Avec pool en mode production
@@ -26,7 +28,15 @@ else:
         echo=settings.DB_ECHO,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_MAX_OVERFLOW,
+        # Échouer vite quand le pool est saturé plutôt qu'attendre 30 s
+        pool_timeout=settings.DB_POOL_TIMEOUT,
         pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        # Cache des requêtes compilées (défaut 500) : couvre toutes les formes de filtres des listes
+        query_cache_size=1200,
+        # Requêtes préparées asyncpg par connexion (défaut 100) : les requêtes répétées
+        # sautent l'analyse/planification côté serveur
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
     )
 
 # Session factory
@@ -40,7 +50,29 @@ AsyncSessionLocal = async_sessionmaker(
 
 Base = declarative_base()
 
+# Lectures : connexion en autocommit, ni BEGIN ni COMMIT/ROLLBACK autour des SELECT
+AsyncReadSessionLocal = async_sessionmaker(
+    engine.execution_options(isolation_level="AUTOCOMMIT"),
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession | Any, Any]:
+    """Request-scoped read session (autocommit): for endpoints that only read"""
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+async def get_user_lookup_session() -> AsyncGenerator[AsyncSession | Any, Any]:
+    """Read session for the authentication user lookup; closed by load_user right after its SELECT"""
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+async def get_write_session() -> AsyncGenerator[AsyncSession | Any, Any]:
+    """Request-scoped transactional session for endpoints that write"""
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -48,8 +80,6 @@ async def get_session() -> AsyncGenerator[AsyncSession | Any, Any]:
         except Exception:
             await session.rollback()
             raise
-        finally:
-            await session.close()
 
 
 async def init_db():
@@ -69,22 +99,64 @@ async def init_db():
 # Ici on garde l'URL telle quelle (driver psycopg2 / pg8000, etc.),
 # car Celery fonctionne mieux avec SQLAlchemy sync.
 
-engine_sync = create_engine(
-    settings.DATABASE_URL if settings.DEBUG else settings.PROD_DB_URL.replace("postgresql+asyncpg://", "postgresql://"),
-    pool_pre_ping=True,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
-    echo=settings.DB_ECHO,
-)
+# Créé à la première utilisation : le processus FastAPI n'ouvre jamais de pool sync
+_engine_sync = None
+
+SessionLocalSync = sessionmaker(autoflush=False, autocommit=False)
 
 
-SessionLocalSync = sessionmaker(bind=engine_sync, autoflush=False, autocommit=False)
+def get_sync_engine():
+    """Sync engine for Celery tasks, created on first use"""
+    global _engine_sync
+    if _engine_sync is None:
+        _engine_sync = create_engine(
+            settings.DATABASE_URL if settings.DEBUG else settings.PROD_DB_URL.replace("postgresql+asyncpg://", "postgresql://"),
+            pool_pre_ping=True,
+            # Un worker Celery traite une tâche à la fois : petit pool, pas de débordement
+            pool_size=settings.DB_SYNC_POOL_SIZE,
+            max_overflow=0,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            echo=settings.DB_ECHO,
+        )
+        SessionLocalSync.configure(bind=_engine_sync)
+    return _engine_sync
+
+
+def sync_session() -> Session:
+    """New sync session bound to the lazily created engine"""
+    get_sync_engine()
+    return SessionLocalSync()
 
 async def close_db():
     """Close database connections"""
     await engine.dispose()
     logger.info("Database connections closed")
 
+async def warm_db_pool():
+    """Ouvre DB_POOL_SIZE connexions au démarrage pour que les premières requêtes n'en paient pas l'ouverture"""
+    if settings.DEBUG:
+        return  # NullPool : rien à préchauffer
+
+    async def _open_one():
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                # Garder la connexion jusqu'à ce que toutes soient ouvertes
+                await barrier.wait()
+        except asyncio.BrokenBarrierError:
+            pass
+        except Exception:
+            await barrier.abort()  # libère les autres tâches en attente
+            raise
+
+    barrier = asyncio.Barrier(settings.DB_POOL_SIZE)
+    try:
+        await asyncio.gather(*(_open_one() for _ in range(settings.DB_POOL_SIZE)))
+        logger.info(f"Database pool warmed ({settings.DB_POOL_SIZE} connections)")
+    except Exception as e:
+        logger.warning(f"Database pool warm-up failed: {e}")
+
+
 async def check_db_connection() -> bool:
     """Check if database is healthy"""
     try:
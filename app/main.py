@@ -1,23 +1,30 @@
 import logging
 import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from starlette.middleware.gzip import GZipMiddleware
+from brotli_asgi import BrotliMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 
+from app.auth.jwt import shutdown_hash_pool
 from app.config import settings
+from app.database import warm_db_pool
 from app.api.v1 import auth, meters, readings, photos, export, tasks, websocket, user, apk
 from app.middleware.api_key import APIKeyMiddleware
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.monitoring import MonitoringMiddleware
+from app.middleware.process_time import ProcessTimeMiddleware
 from app.middleware.rate_limit import RateLimitMiddleware
 from app.middleware.request_id import RequestIDMiddleware
 from app.middleware.security import SecurityHeadersMiddleware
 from app.monitoring import metrics
+from app.services.api_key_service import start_invalidation_listener, stop_invalidation_listener
+from app.services.storage_service import storage_service
 
 # Configure logging
 # logging.basicConfig(
@@ -31,6 +38,26 @@ from app.monitoring import metrics
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared async clients at startup and close them at shutdown"""
+    await storage_service.open_async_client()
+    await warm_db_pool()
+    if settings.REQUIRE_API_KEY:
+        start_invalidation_listener()
+    if settings.EXPOSE_METRICS:
+        metrics.start_queue_stats_refresh()
+    try:
+        yield
+    finally:
+        await metrics.stop_queue_stats_refresh()
+        await stop_invalidation_listener()
+        await websocket.manager.close()
+        await storage_service.close_async_client()
+        shutdown_hash_pool()
+
+
 app = FastAPI(
     title="MeterSync API",
     description="""
@@ -80,48 +107,24 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc" if settings.DEBUG else None,
     openapi_url="/openapi.json" if settings.DEBUG else "/api/openapi.json",
+    lifespan=lifespan,
+    # Corps JSON encodés par orjson (C) plutôt que json de la stdlib
+    default_response_class=ORJSONResponse,
 )
 
-# =====================================
-# Request ID Middleware
-# =====================================
-@app.middleware("http")
-async def add_request_id(request: Request, call_next):
-    """Add unique request ID to track requests"""
-    import uuid
-
-    request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
-    request.state.request_id = request_id
-
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-
-    return response
-
-
-# =====================================
-# Process Time Middleware
-# =====================================
-@app.middleware("http")
-async def add_process_time(request: Request, call_next):
-    """Add request processing time to response headers"""
-    import time
-
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-
-    response.headers["X-Process-Time"] = f"{process_time:.3f}s"
-
-    return response
-
-
 # =====================================
 # Configure Middleware Stack
 # =====================================
 
-# GZIP Compression (minimum 1KB)
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Brotli compression (minimum 1KB), gzip for clients without "br" in Accept-Encoding.
+# Excel exports are skipped: xlsx is already a zip archive
+app.add_middleware(
+    BrotliMiddleware,
+    quality=4,
+    minimum_size=1000,
+    gzip_fallback=True,
+    excluded_handlers=[r"/export/readings/excel"],
+)
 
 # Session support
 app.add_middleware(
@@ -160,6 +163,7 @@ app.add_middleware(
 app.add_middleware(MonitoringMiddleware)
 # app.add_middleware(RateLimitMiddleware, calls=settings.RATE_LIMIT_PER_MINUTE, period=60)
 app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(ProcessTimeMiddleware)
 app.add_middleware(RequestIDMiddleware)
 app.add_middleware(LoggingMiddleware)
 
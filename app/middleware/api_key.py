@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request, status
@@ -6,6 +6,7 @@ from fastapi.responses import JSONResponse
 from typing import List
 import logging
 from app.config import settings
+from app.services.api_key_service import validate_api_key
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,7 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
 
 	async def dispatch(self, request: Request, call_next):
 		# Skip for excluded paths
-		path = request.url.path
+		path = request.scope["path"]
 		if any(path.startswith(excluded) for excluded in self.exclude_paths):
 			return await call_next(request)
 
@@ -40,7 +41,7 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
 				content={
 					"error": "Unauthorized",
 					"message": "Invalid or missing API key",
-					"timestamp": datetime.utcnow().isoformat()
+					"timestamp": datetime.now(timezone.utc).isoformat()
 				},
 				headers={"WWW-Authenticate": 'ApiKey realm="API"'}
 			)
@@ -52,5 +53,4 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
 
 	async def validate_api_key(self, api_key: str) -> bool:
 		"""Validate API key against database or cache"""
-		from app.services.api_key_service import validate_api_key
 		return await validate_api_key(api_key)
\ No newline at end of file
@@ -1,9 +1,10 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request
 import logging
-import json
+import orjson
 import time
-from datetime import datetime
+
+from app.middleware.monitoring import route_template
 
 logger = logging.getLogger(__name__)
 
@@ -13,36 +14,27 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 
 	async def dispatch(self, request: Request, call_next):
 		# Start timer
-		start_time = time.time()
-
-		# Get request details
-		request_body = None
-		if request.method in ["POST", "PUT", "PATCH"]:
-			try:
-				request_body = await request.body()
-				# Recreate request with body for downstream processing
-				from starlette.requests import Request as StarletteRequest
-				request = StarletteRequest(request.scope, receive=request._receive)
-				request._body = request_body
-			except:
-				pass
+		start_time = time.perf_counter()
 
 		# Process request
 		response = await call_next(request)
 
 		# Calculate duration
-		duration = time.time() - start_time
+		duration = time.perf_counter() - start_time
 
 		# Create structured log
 		log_dict = {
-			"timestamp": datetime.utcnow().isoformat(),
+			"timestamp": time.time(),
 			"level": "INFO",
 			"request_id": getattr(request.state, "request_id", None),
 			"method": request.method,
-			"path": request.url.path,
-			"query_params": dict(request.query_params),
+			"path": request.scope["path"],
+			"route": route_template(request),
+			"query_params": dict(request.query_params) if request.scope["query_string"] else None,
 			"client_host": request.client.host if request.client else None,
 			"user_agent": request.headers.get("user-agent"),
+			# Taille depuis l'en-tête : le corps n'est jamais lu ici (uploads jusqu'à 10 Mo)
+			"content_length": request.headers.get("content-length"),
 			"status_code": response.status_code,
 			"duration_seconds": round(duration, 3),
 		}
@@ -56,10 +48,10 @@ class LoggingMiddleware(BaseHTTPMiddleware):
 			log_dict["level"] = "WARNING" if response.status_code < 500 else "ERROR"
 
 		# Log as JSON for structured logging systems
-		logger.info(json.dumps(log_dict))
+		logger.info(orjson.dumps(log_dict).decode())
 
 		# Add performance warning for slow requests
 		if duration > 1.0:
-			logger.warning(f"Slow request detected: {request.method} {request.url.path} took {duration:.2f}s")
+			logger.warning("Slow request detected: %s %s took %.2fs", request.method, request.scope["path"], duration)
 
 		return response
\ No newline at end of file
@@ -8,25 +8,47 @@ import time
 
 logger = logging.getLogger(__name__)
 
+# Sondes et documentation : aucune métrique enregistrée
+_SKIP = frozenset({
+	"/health", "/ready", "/live", "/internal/metrics",
+	"/openapi.json", "/api/openapi.json", "/docs", "/redoc",
+})
+
+# Séries enfants déjà résolues ; bornées par méthode x route x statut
+_count_series: dict = {}
+_duration_series: dict = {}
+
+
+def _record(method: str, endpoint: str, status_code: int, duration: float) -> None:
+	"""Record a request without going through .labels() (and its lock) once the series exist"""
+	key = (method, endpoint, status_code)
+	counter = _count_series.get(key)
+	if counter is None:
+		counter = _count_series[key] = request_count.labels(method=method, endpoint=endpoint, status=status_code)
+	counter.inc()
+
+	histogram = _duration_series.get(key[:2])
+	if histogram is None:
+		histogram = _duration_series[key[:2]] = request_duration.labels(method=method, endpoint=endpoint)
+	histogram.observe(duration)
+
+
+def route_template(request: Request) -> str:
+	"""Template de la route matchée (/api/v1/meters/{meter_id}) ; "unmatched" pour les 404 de routage"""
+	route = request.scope.get("route")
+	return getattr(route, "path", None) or "unmatched"
+
+
 async def monitoring_middleware(request: Request, call_next):
 	"""Track request metrics"""
-	start_time = time.time()
+	start_time = time.perf_counter()
 
 	response = await call_next(request)
 
-	duration = time.time() - start_time
+	duration = time.perf_counter() - start_time
 
 	# Record metrics
-	request_count.labels(
-		method=request.method,
-		endpoint=request.url.path,
-		status=response.status_code
-	).inc()
-
-	request_duration.labels(
-		method=request.method,
-		endpoint=request.url.path
-	).observe(duration)
+	_record(request.method, route_template(request), response.status_code, duration)
 
 	return response
 
@@ -35,40 +57,29 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
 	"""Track request metrics for Prometheus"""
 
 	async def dispatch(self, request: Request, call_next):
-		# Skip metrics endpoint to avoid recursion
-		if request.url.path == "/internal/metrics":
+		# Skip metrics endpoint (recursion), health probes and docs
+		path = request.scope["path"]
+		if path in _SKIP or path.startswith("/docs"):
 			return await call_next(request)
 
 		# Track active requests
 		active_requests.inc()
 
 		# Start timer
-		start_time = time.time()
+		start_time = time.perf_counter()
 
 		try:
 			# Process request
 			response = await call_next(request)
 
 			# Record metrics
-			duration = time.time() - start_time
-
-			request_count.labels(
-				method=request.method,
-				endpoint=request.url.path,
-				status=response.status_code
-			).inc()
-
-			request_duration.labels(
-				method=request.method,
-				endpoint=request.url.path
-			).observe(duration)
+			duration = time.perf_counter() - start_time
+			# Label borné au nombre de routes, pas au nombre d'ids
+			_record(request.method, route_template(request), response.status_code, duration)
 
 			# Log slow requests
 			if duration > 1.0:
-				logger.warning(
-					f"Slow request: {request.method} {request.url.path} "
-					f"took {duration:.2f}s"
-				)
+				logger.warning("Slow request: %s %s took %.2fs", request.method, request.scope["path"], duration)
 
 			return response
 
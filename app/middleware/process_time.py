@@ -0,0 +1,25 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import time
+
+
+class ProcessTimeMiddleware:
+	"""Add request processing time to response headers (pure ASGI)"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+
+		start_time = time.perf_counter()
+
+		async def send_with_process_time(message: Message):
+			if message["type"] == "http.response.start":
+				process_time = time.perf_counter() - start_time
+				MutableHeaders(scope=message)["X-Process-Time"] = f"{process_time:.3f}s"
+			await send(message)
+
+		await self.app(scope, receive, send_with_process_time)
@@ -1,14 +1,57 @@
+import hashlib
 import logging
+import math
 import time
-import redis.asyncio as redis
 
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from app.config import settings
+from app.core.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
+# GCRA (generic cell rate algorithm) : une seule clé par client et préfixe, 1 aller-retour.
+# La clé contient le "theoretical arrival time" (ms) ; pas de doublement de rafale en
+# bordure de fenêtre comme avec un compteur INCR à fenêtre fixe.
+# Retourne {allowed, retry_after_ms, remaining, reset_ms}
+RATE_LIMIT_SCRIPT = """
+local period = tonumber(ARGV[1])
+local calls = tonumber(ARGV[2])
+local emission = period / calls
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = math.ceil(tat + emission)
+local allow_at = new_tat - period
+
+if now < allow_at then
+    return {0, allow_at - now, 0, tat - now}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, 0, math.floor((now - allow_at) / emission), new_tat - now}
+"""
+
+
+def _path_prefix(path: str) -> str:
+    """Réduit le chemin à la ressource : /api/v1/meters/<uuid> -> /api/v1/meters"""
+    api_prefix = settings.API_V1_PREFIX.rstrip("/")
+    if path.startswith(api_prefix + "/"):
+        resource = path[len(api_prefix) + 1:].split("/", 1)[0]
+        return f"{api_prefix}/{resource}"
+    return "/" + path.lstrip("/").split("/", 1)[0]
+
+
+def _rate_limit_key(client_id: str, path: str) -> str:
+    """Une clé par client et par ressource, pas par URL (les ids ne multiplient pas les clés)"""
+    digest = hashlib.blake2b(_path_prefix(path).encode(), digest_size=8).hexdigest()
+    return f"rl:{client_id}:{digest}"
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Rate limiting middleware using Redis"""
@@ -18,33 +61,35 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         self.calls = calls
         self.period = period
         self.redis_client = None
+        self.script = None
 
     async def dispatch(self, request: Request, call_next):
         # Skip rate limiting for internal endpoints
-        if request.url.path.startswith("/internal"):
+        if request.scope["path"].startswith("/internal"):
             return await call_next(request)
 
         try:
             # Init Redis client
             if not self.redis_client:
-                self.redis_client = await redis.from_url(settings.REDIS_URL)
+                # Pool Redis partagé du processus
+                self.redis_client = await get_redis()
+                # EVALSHA ensuite ; redis-py recharge le script si le cache serveur est vidé
+                self.script = self.redis_client.register_script(RATE_LIMIT_SCRIPT)
 
             # Identifier client
             client_id = request.client.host if request.client else "unknown"
 
             # Rate limit key
-            key = f"rate_limit:{client_id}:{request.url.path}"
+            key = _rate_limit_key(client_id, request.scope["path"])
 
-            # Redis pipeline
-            pipe = self.redis_client.pipeline()
-            pipe.incr(key)
-            pipe.expire(key, self.period)
-            result = await pipe.execute()
-            request_count = result[0]
+            allowed, retry_after_ms, remaining, reset_ms = await self.script(
+                keys=[key], args=[self.period * 1000, self.calls]
+            )
+            now = time.time()
 
             # Trop de requêtes ?
-            if request_count > self.calls:
-                retry_after = await self.redis_client.ttl(key)
+            if not allowed:
+                retry_after = max(1, math.ceil(retry_after_ms / 1000))
                 return JSONResponse(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     content={
@@ -55,7 +100,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     headers={
                         "X-RateLimit-Limit": str(self.calls),
                         "X-RateLimit-Remaining": "0",
-                        "X-RateLimit-Reset": str(int(time.time()) + retry_after),
+                        "X-RateLimit-Reset": str(math.ceil(now + reset_ms / 1000)),
                         "Retry-After": str(retry_after),
                     }
                 )
@@ -64,10 +109,9 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
 
             # Ajouter headers
-            remaining = max(0, self.calls - request_count)
             response.headers["X-RateLimit-Limit"] = str(self.calls)
             response.headers["X-RateLimit-Remaining"] = str(remaining)
-            response.headers["X-RateLimit-Reset"] = str(int(time.time()) + self.period)
+            response.headers["X-RateLimit-Reset"] = str(math.ceil(now + reset_ms / 1000))
 
             return response
 
@@ -1,6 +1,6 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
-import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import os
 import contextvars
 import logging
 
@@ -10,34 +10,46 @@ request_id_context = contextvars.ContextVar("request_id", default=None)
 logger = logging.getLogger(__name__)
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-	"""Generate and track unique request IDs"""
+class RequestIDMiddleware:
+	"""Generate and track unique request IDs (pure ASGI, no BaseHTTPMiddleware task group)"""
+
+	def __init__(self, app: ASGIApp):
+		self.app = app
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
 
-	async def dispatch(self, request: Request, call_next):
 		# Get or generate request ID
-		request_id = request.headers.get("X-Request-ID")
+		request_id = Headers(scope=scope).get("X-Request-ID")
 		if not request_id:
-			request_id = str(uuid.uuid4())
+			# 128 bits aléatoires en hex : pas d'objet UUID à construire puis formater
+			request_id = os.urandom(16).hex()
 
 		# Store in request state and context
-		request.state.request_id = request_id
-		request_id_context.set(request_id)
-
-		# Add to logging context
-		logger.info(f"Request started: {request.method} {request.url.path} [{request_id}]")
-
-		# Process request
-		response = await call_next(request)
+		scope.setdefault("state", {})["request_id"] = request_id
+		token = request_id_context.set(request_id)
 
-		# Add request ID to response headers
-		response.headers["X-Request-ID"] = request_id
-		response.headers["X-Correlation-ID"] = request_id
+		method, path = scope["method"], scope["path"]
+		# Formatage différé (%s) : rien n'est rendu si INFO est désactivé
+		logger.info("Request started: %s %s [%s]", method, path, request_id)
 
-		logger.info(f"Request completed: {request.method} {request.url.path} [{request_id}] - {response.status_code}")
+		async def send_with_request_id(message: Message):
+			if message["type"] == "http.response.start":
+				# Add request ID to response headers
+				headers = MutableHeaders(scope=message)
+				headers["X-Request-ID"] = request_id
+				headers["X-Correlation-ID"] = request_id
+				logger.info("Request completed: %s %s [%s] - %s", method, path, request_id, message["status"])
+			await send(message)
 
-		return response
+		try:
+			await self.app(scope, receive, send_with_request_id)
+		finally:
+			request_id_context.reset(token)
 
 
 def get_request_id() -> str:
 	"""Get current request ID from context"""
-	return request_id_context.get() or "unknown"
\ No newline at end of file
+	return request_id_context.get() or "unknown"
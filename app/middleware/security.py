@@ -1,67 +1,92 @@
 # app/middleware/security.py
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-DOC_PATHS = {"/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"}
+DOC_PATHS = frozenset({"/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"})
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add comprehensive security headers to all responses, with relaxed CSP on docs."""
+# Endpoints internes (scrape Prometheus, sondes de santé) : jamais chargés par un navigateur,
+# ils doivent être filtrés au niveau réseau ; CSP/HSTS n'y apportent rien
+EXCLUDED_PATHS = frozenset({"/internal/metrics", "/metrics", "/health", "/healthz", "/ready", "/readyz", "/live"})
 
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
+# Swagger/Redoc ont besoin de jsdelivr + fonts + inline styles
+DOC_CSP = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com; "
+    "font-src 'self' https://fonts.gstatic.com data:; "
+    "img-src 'self' data: https:; "
+    "connect-src 'self' https: wss:; "
+    "object-src 'none'; "
+    "base-uri 'self'; "
+    "frame-ancestors 'none'"
+)
 
-        path = request.url.path
+# Politique plus stricte pour l’API
+STRICT_CSP = (
+    "default-src 'self'; "
+    "script-src 'self'; "
+    "style-src 'self'; "
+    "font-src 'self' data:; "
+    "img-src 'self' data:; "
+    "connect-src 'self'; "
+    "object-src 'none'; "
+    "base-uri 'self'; "
+    "frame-ancestors 'none'"
+)
 
-        # Commun headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        # Obsolète mais safe pour vieux navigateurs
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = (
-            "accelerometer=(), camera=(), geolocation=(), gyroscope=(), magnetometer=(), "
-            "microphone=(), payment=(), usb=()"
-        )
-        response.headers["X-Permitted-Cross-Domain-Policies"] = "none"
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
-        response.headers["Pragma"] = "no-cache"
 
+def _encode(headers: dict) -> tuple:
+    return tuple((name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items())
+
+
+class SecurityHeadersMiddleware:
+    """Add comprehensive security headers to all responses, with relaxed CSP on docs (pure ASGI)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+        # Commun headers
+        common = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            # Obsolète mais safe pour vieux navigateurs
+            "X-XSS-Protection": "1; mode=block",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+            "Permissions-Policy": (
+                "accelerometer=(), camera=(), geolocation=(), gyroscope=(), magnetometer=(), "
+                "microphone=(), payment=(), usb=()"
+            ),
+            "X-Permitted-Cross-Domain-Policies": "none",
+            "Cache-Control": "no-store, no-cache, must-revalidate, private",
+            "Pragma": "no-cache",
+        }
         # HSTS uniquement en prod / HTTPS
         if not settings.DEBUG:
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+            common["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
+
+        # Encodés une fois : la réponse ne reçoit qu'une extension de liste
+        self._doc_headers = _encode({**common, "Content-Security-Policy": DOC_CSP})
+        self._strict_headers = _encode({**common, "Content-Security-Policy": STRICT_CSP})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = scope.get("path")
+        if scope["type"] != "http" or path in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
 
         # CSP : relax pour la doc, strict ailleurs
-        if path in DOC_PATHS:
-            # Swagger/Redoc ont besoin de jsdelivr + fonts + inline styles
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; "
-                "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com; "
-                "font-src 'self' https://fonts.gstatic.com data:; "
-                "img-src 'self' data: https:; "
-                "connect-src 'self' https: wss:; "
-                "object-src 'none'; "
-                "base-uri 'self'; "
-                "frame-ancestors 'none'"
-            )
-        else:
-            # Politique plus stricte pour l’API
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self'; "
-                "style-src 'self'; "
-                "font-src 'self' data:; "
-                "img-src 'self' data:; "
-                "connect-src 'self'; "
-                "object-src 'none'; "
-                "base-uri 'self'; "
-                "frame-ancestors 'none'"
-            )
-
-        response.headers["Content-Security-Policy"] = csp
-
-        return response
+        headers = self._doc_headers if path in DOC_PATHS else self._strict_headers
+
+        async def send_with_security_headers(message: Message):
+            if message["type"] == "http.response.start":
+                # Un en-tête déjà posé par l'endpoint (ex. Cache-Control + ETag) est conservé
+                raw = list(message.get("headers", ()))
+                present = {name.lower() for name, _ in raw}
+                raw.extend(h for h in headers if h[0] not in present)
+                message["headers"] = raw
+            await send(message)
+
+        await self.app(scope, receive, send_with_security_headers)
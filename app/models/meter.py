@@ -1,5 +1,6 @@
 # models/meter.py
-from sqlalchemy import Column, String, Text, Float, DateTime, JSON
+from sqlalchemy import Column, String, Text, Float, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import BaseModel
@@ -17,7 +18,25 @@ class Meter(Base, BaseModel):
     # Date du dernier passage si dispo (colonne "Дата обхода")
     last_reading_date = Column(DateTime(timezone=True))
 
-    status = Column(String(50), default="active", index=True)
-    meter_metadata = Column(JSON, default=dict)
+    status = Column(String(50), server_default=text("'active'"), index=True)
+    meter_metadata = Column(JSONB, server_default=text("'{}'::jsonb"))
 
-    readings = relationship("Reading", back_populates="meter", cascade="all, delete-orphan")
+    # Jamais chargée implicitement (selectinload() si besoin) ; la suppression en cascade
+    # est faite par la FK ON DELETE CASCADE, sans charger les relevés
+    readings = relationship(
+        "Reading", back_populates="meter", cascade="all, delete-orphan", lazy="raise", passive_deletes=True
+    )
+
+    # Index trigrammes (pg_trgm) pour les recherches ILIKE '%...%'
+    __table_args__ = (
+        Index("ix_meters_meter_number_trgm", "meter_number",
+              postgresql_using="gin", postgresql_ops={"meter_number": "gin_trgm_ops"}),
+        Index("ix_meters_client_name_trgm", "client_name",
+              postgresql_using="gin", postgresql_ops={"client_name": "gin_trgm_ops"}),
+        Index("ix_meters_location_address_trgm", "location_address",
+              postgresql_using="gin", postgresql_ops={"location_address": "gin_trgm_ops"}),
+        # Tri des listes (created_at DESC, id DESC), avec ou sans filtre status/type
+        Index("ix_meters_created_at_desc", text("created_at DESC"), text("id DESC")),
+        Index("ix_meters_status_created_at_desc", "status", text("created_at DESC")),
+        Index("ix_meters_type_created_at_desc", "type", text("created_at DESC")),
+    )
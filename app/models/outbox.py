@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, JSON, Integer, Text, DateTime, func
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql.base import UUID
 
 from app.database import Base
@@ -11,10 +12,20 @@ class Outbox(Base, BaseModel):
 	entity_type = Column(String(50), nullable=False)
 	entity_id = Column(UUID(as_uuid=True), nullable=False)
 	operation = Column(String(20), nullable=False)
-	payload = Column(JSON, nullable=False)
-	retry_count = Column(Integer, default=0)
-	max_retries = Column(Integer, default=5)
-	status = Column(String(50), default="pending", index=True)
+	payload = Column(JSONB, nullable=False)
+	retry_count = Column(Integer, server_default=text("0"))
+	max_retries = Column(Integer, server_default=text("5"))
+	status = Column(String(50), server_default=text("'pending'"))
 	error_message = Column(Text)
-	scheduled_at = Column(DateTime(timezone=True), default=func.now(), index=True)
+	scheduled_at = Column(DateTime(timezone=True), server_default=func.now())
 	processed_at = Column(DateTime(timezone=True))
+
+	__table_args__ = (
+		# Dispatcher : status = 'pending' AND scheduled_at <= now() ORDER BY scheduled_at.
+		# Index partiel : les lignes traitées (l'essentiel de l'historique) n'y entrent pas ;
+		# 'processing' pour reprendre les lots réclamés par un worker disparu
+		Index(
+			'ix_outbox_pending', 'status', 'scheduled_at',
+			postgresql_where=text("status IN ('pending', 'processing', 'failed')")
+		),
+	)
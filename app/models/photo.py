@@ -1,4 +1,5 @@
-from sqlalchemy import Column, ForeignKey, String, Text, DateTime, BigInteger, JSON, Float
+from sqlalchemy import Column, ForeignKey, String, Text, DateTime, BigInteger, Float, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql.base import UUID
 
 
@@ -13,11 +14,19 @@ class Photo(Base, BaseModel):
 	storage_path = Column(String(500))
 	presigned_url = Column(Text)
 	presigned_expires_at = Column(DateTime(timezone=True))
-	upload_status = Column(String(50), default="pending", index=True)
+	upload_status = Column(String(50), server_default=text("'pending'"))
 	file_size_bytes = Column(BigInteger)
 	mime_type = Column(String(100))
-	exif_data = Column(JSON)
+	exif_data = Column(JSONB)
 	latitude = Column(Float)
 	longitude = Column(Float)
 	taken_at = Column(DateTime(timezone=True))
-	uploaded_at = Column(DateTime(timezone=True))
\ No newline at end of file
+	uploaded_at = Column(DateTime(timezone=True))
+
+	__table_args__ = (
+		# Seuls les uploads en attente sont recherchés par statut
+		Index(
+			'ix_photos_upload_status_pending', 'created_at',
+			postgresql_where=text("upload_status = 'pending'")
+		),
+	)
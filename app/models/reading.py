@@ -1,7 +1,7 @@
 
 
-from sqlalchemy import Column, ForeignKey, Float, DateTime, String, Text, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import Column, ForeignKey, Float, DateTime, String, Text, UniqueConstraint, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -15,21 +15,30 @@ class Reading(Base, BaseModel):
 	user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
 	reading_value = Column(Float, nullable=False)
 	reading_date = Column(DateTime(timezone=True), nullable=False)
-	reading_type = Column(String(50), default="manual")
+	reading_type = Column(String(50), server_default=text("'manual'"))
 	device_id = Column(String(255))
 	latitude = Column(Float)
 	longitude = Column(Float)
 	accuracy_meters = Column(Float)
 	notes = Column(Text)
-	sync_status = Column(String(50), default="synced", index=True)
+	sync_status = Column(String(50), server_default=text("'synced'"), index=True)
 	client_id = Column(String(255), unique=True, index=True)  # For offline conflict resolution
-	photos = Column(ARRAY(String), nullable=False)
+	photos = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))  # Liste d'URLs
 
 	# Relationships
-	meter = relationship("Meter", back_populates="readings")
-	user = relationship("User", back_populates="readings")
+	# lazy="raise" : aucun chargement implicite (N+1) ; charger explicitement via joinedload()
+	meter = relationship("Meter", back_populates="readings", lazy="raise")
+	user = relationship("User", back_populates="readings", lazy="raise")
 
 
 	__table_args__ = (
 		UniqueConstraint('client_id', name='unique_client_reading'),
+		# Pagination keyset (reading_date DESC, id DESC), globale ou par contrôleur / compteur
+		Index('ix_readings_reading_date_desc', text('reading_date DESC'), text('id DESC')),
+		Index('ix_readings_user_reading_date_desc', 'user_id', text('reading_date DESC'), text('id DESC')),
+		Index('ix_readings_meter_reading_date_desc', 'meter_id', text('reading_date DESC'), text('id DESC')),
+		# Contrôleur filtrant par sync_status : même ordre, sans tri en mémoire
+		Index('ix_readings_user_sync_status_reading_date_desc', 'user_id', 'sync_status', text('reading_date DESC'), text('id DESC')),
+		# Recherche par URL de photo (photos @> '["..."]')
+		Index('ix_readings_photos_gin', 'photos', postgresql_using='gin', postgresql_ops={'photos': 'jsonb_path_ops'}),
 	)
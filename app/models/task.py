@@ -1,7 +1,8 @@
 # =====================================
 # api/app/models/task.py
 # =====================================
-from sqlalchemy import Column, String, DateTime, JSON, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 from app.models.base import BaseModel
@@ -23,9 +24,15 @@ class TaskResult(Base, BaseModel):
 	task_name = Column(String, nullable=False, index=True)
 	user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
 	status = Column(SQLEnum(TaskStatus), default=TaskStatus.PENDING, index=True)
-	params = Column(JSON)
-	result = Column(JSON)
+	params = Column(JSONB)
+	result = Column(JSONB)
 	error_message = Column(String)
 	started_at = Column(DateTime(timezone=True))
 	completed_at = Column(DateTime(timezone=True))
-	progress = Column(JSON)  # Store progress updates
+	progress = Column(JSONB)  # Store progress updates
+
+	__table_args__ = (
+		# list_user_tasks : tâches d'un utilisateur, récentes d'abord, avec ou sans filtre de statut
+		Index('ix_task_results_user_created_at_desc', 'user_id', text('created_at DESC')),
+		Index('ix_task_results_user_status_created_at_desc', 'user_id', 'status', text('created_at DESC')),
+	)
@@ -23,5 +23,5 @@ class User(Base, BaseModel):
 	is_active = Column(Boolean, default=True)
 
 	# Relationships
-	readings = relationship("Reading", back_populates="user")
+	readings = relationship("Reading", back_populates="user", lazy="raise")
 	
\ No newline at end of file
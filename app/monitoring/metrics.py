@@ -1,12 +1,13 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import anyio
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
 from fastapi import APIRouter
 from fastapi.responses import PlainTextResponse
 
-import redis
-
-from app.config import settings
-
-r = redis.Redis.from_url(settings.REDIS_URL)
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -57,20 +58,64 @@ redis_connections = Gauge(
 )
 
 
+# inspect() diffuse sur le broker et attend les réponses : jamais dans le chemin du scrape
+QUEUE_STATS_REFRESH_SECONDS = 30
+QUEUE_STATS_TIMEOUT = 2.0
+
+_cached_queue_sizes: Dict[str, int] = {}
+_queue_stats_task: Optional[asyncio.Task] = None
+
+
+def _inspect_queue_sizes() -> Dict[str, int]:
+	"""Blocking broker round-trip, run in a worker thread"""
+	from app.core.celery_app import celery_app
+	stats = celery_app.control.inspect(timeout=QUEUE_STATS_TIMEOUT).stats() or {}
+
+	total = 0
+	for worker, info in stats.items():
+		# 'total' : nombre de tâches traitées par nom de tâche
+		counts = info.get('total') or {}
+		total += sum(counts.values()) if isinstance(counts, dict) else int(counts)
+	return {'default': total}
+
+
+async def _refresh_queue_sizes():
+	while True:
+		try:
+			sizes = await anyio.to_thread.run_sync(_inspect_queue_sizes)
+			_cached_queue_sizes.clear()
+			_cached_queue_sizes.update(sizes)
+		except asyncio.CancelledError:
+			raise
+		except Exception:
+			logger.exception("Celery queue stats refresh failed")
+		await asyncio.sleep(QUEUE_STATS_REFRESH_SECONDS)
+
+
+def start_queue_stats_refresh() -> None:
+	"""Start the background refresh of Celery stats (application startup)"""
+	global _queue_stats_task
+	if _queue_stats_task is None or _queue_stats_task.done():
+		_queue_stats_task = asyncio.create_task(_refresh_queue_sizes())
+
+
+async def stop_queue_stats_refresh() -> None:
+	"""Stop the background refresh (application shutdown)"""
+	global _queue_stats_task
+	if _queue_stats_task is not None:
+		_queue_stats_task.cancel()
+		try:
+			await _queue_stats_task
+		except asyncio.CancelledError:
+			pass
+		_queue_stats_task = None
+
+
 @router.get("/metrics", response_class=PlainTextResponse)
 async def metrics():
 	"""Prometheus metrics endpoint"""
-	# Update dynamic metrics
-	try:
-		from app.core.celery_app import celery_app
-		inspector = celery_app.control.inspect()
-		stats = inspector.stats()
-
-		if stats:
-			for worker, info in stats.items():
-				if 'total' in info:
-					task_queue_size.labels(queue_name='default').set(info.get('total', 0))
-	except:
-		pass
-
-	return generate_latest()
\ No newline at end of file
+	# Valeurs rafraîchies en arrière-plan : aucun appel au broker ici
+	for queue_name, size in _cached_queue_sizes.items():
+		task_queue_size.labels(queue_name=queue_name).set(size)
+
+	return generate_latest()
@@ -1,11 +1,14 @@
+import re
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr, Field, validator, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
 
 from app.models.user import UserRole
 
+_DIGIT_RE = re.compile(r"\d")
+
 
 class LoginRequest(BaseModel):
     username: str = Field(..., min_length=3)
@@ -18,11 +21,12 @@ class RegisterRequest(BaseModel):
     full_name: Optional[str] = None
     role: UserRole = UserRole.CONTROLLER
 
-    @validator("password")
+    @field_validator("password")
+    @classmethod
     def validate_password(cls, v):
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters")
-        if not any(char.isdigit() for char in v):
+        if not _DIGIT_RE.search(v):
             raise ValueError("Password must contain at least")
         return v
 
@@ -78,4 +82,8 @@ class UpdateProfileRequest(BaseModel):
 	
 class AdminChangePasswordRequest(BaseModel):
     user_id: UUID
-    new_password: str = Field(min_length=8)
\ No newline at end of file
+    new_password: str = Field(min_length=8)
+
+
+class InvalidateAPIKeyRequest(BaseModel):
+    api_key: str = Field(..., min_length=1)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel, ConfigDict
 
@@ -30,3 +31,4 @@ class PaginatedResponse(BaseModel):
 	skip: int
 	limit: int
 	data: list
+	next_cursor: Optional[str] = None
@@ -52,4 +52,20 @@ class MeterResponseWithReading(MeterBase):
 
 class MeterListResponse(BaseModel):
     total: int
-    data: List[MeterResponse]
\ No newline at end of file
+    data: List[MeterResponse]
+
+
+class MeterImportPresignRequest(BaseModel):
+    filename: str = Field(..., description="Nom du fichier XLSX à importer")
+
+
+class MeterImportPresignResponse(BaseModel):
+    upload_url: str
+    upload_method: str = "PUT"
+    upload_headers: Dict[str, str]
+    file_key: str
+    expires_at: datetime
+
+
+class MeterImportRequest(BaseModel):
+    key: str = Field(..., description="Clé S3 renvoyée par /import-meters/presign")
@@ -4,10 +4,14 @@ from typing import Optional, List
 from uuid import UUID
 from typing import Dict
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, field_validator
 
 from app.core.s3_config import S3Config
 
+# Figés une fois à l'import : test d'appartenance direct dans les validateurs
+_ALLOWED_CONTENT_TYPES = frozenset(S3Config.ALLOWED_CONTENT_TYPES)
+_ALLOWED_EXTENSIONS = frozenset(S3Config.ALLOWED_EXTENSIONS)
+
 
 class PhotoBase(BaseModel):
     reading_id: UUID
@@ -19,22 +23,25 @@ class PresignedUrlRequest(BaseModel):
     file_size: Optional[int] = Field(None, description="Taille du fichier en octets (optionnel)")
     metadata: Optional[Dict[str, str]] = Field(None, description="Métadonnées additionnelles")
 
-    @validator('content_type')
+    @field_validator('content_type')
+    @classmethod
     def validate_content_type(cls, v):
-        if v not in S3Config.ALLOWED_CONTENT_TYPES:
+        if v not in _ALLOWED_CONTENT_TYPES:
             raise ValueError(f"Type de contenu non autorisé: {v}")
         return v
 
-    @validator('file_size', always=True)
+    @field_validator('file_size')
+    @classmethod
     def validate_file_size(cls, v):
         if v is not None and v > S3Config.MAX_FILE_SIZE:
             raise ValueError(f"Fichier trop volumineux: {v} octets (max: {S3Config.MAX_FILE_SIZE})")
         return v
 
-    @validator('filename')
+    @field_validator('filename')
+    @classmethod
     def validate_filename(cls, v):
         ext = os.path.splitext(v)[1].lower()
-        if ext not in S3Config.ALLOWED_EXTENSIONS:
+        if ext not in _ALLOWED_EXTENSIONS:
             raise ValueError(f"Extension non autorisée: {ext}")
         return v
 
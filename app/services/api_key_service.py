@@ -1,14 +1,30 @@
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
-from app.core.redis import get_redis
+from app.core.redis import get_redis, API_KEY_INVALIDATE_CHANNEL
+from app.config import settings
 from app.database import get_session
 from sqlalchemy import select
+from cachetools import TTLCache
+import asyncio
 import hashlib
 import secrets
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Cache local au processus (clé = empreinte, jamais la clé brute) devant le cache Redis.
+# Les révocations arrivent par pub/sub ; le TTL court borne l'effet d'un message perdu
+_api_key_cache: TTLCache = TTLCache(maxsize=10000, ttl=60)
+_invalidation_listener: Optional[asyncio.Task] = None
+
+# Longueur (au plus 64 octets, limite de clé BLAKE2b) vérifiée au démarrage par Settings
+_API_KEY_PEPPER = settings.API_KEY_PEPPER.encode()
+
+
+def _api_key_digest(api_key: str) -> str:
+	"""Empreinte blake2b-128 de la clé, utilisée pour les deux niveaux de cache"""
+	return hashlib.blake2b(api_key.encode(), digest_size=16).hexdigest()
+
 
 class APIKeyService:
 	"""Service for managing API keys"""
@@ -19,9 +35,9 @@ class APIKeyService:
 		return f"msk_{secrets.token_urlsafe(32)}"
 
 	@staticmethod
-	async def hash_api_key(api_key: str) -> str:
-		"""Hash API key for storage"""
-		return hashlib.sha256(api_key.encode()).hexdigest()
+	def hash_api_key(api_key: str) -> str:
+		"""Hash API key for storage (keyed BLAKE2b: the pepper never lives in the database)"""
+		return hashlib.blake2b(api_key.encode("utf-8"), digest_size=32, key=_API_KEY_PEPPER).hexdigest()
 
 	@staticmethod
 	async def validate_api_key(api_key: str) -> bool:
@@ -29,24 +45,31 @@ class APIKeyService:
 		if not api_key or not api_key.startswith("msk_"):
 			return False
 
-		# Check cache first
+		# Check caches first: process memory, then Redis
+		digest = _api_key_digest(api_key)
+		cached = _api_key_cache.get(digest)
+		if cached is not None:
+			return cached
+
 		redis_client = await get_redis()
-		cache_key = f"api_key:valid:{api_key[:8]}"  # Use prefix for privacy
+		# Empreinte complète : un préfixe de la clé ferait valider des clés différentes
+		cache_key = f"api_key:valid:{digest}"
 
 		cached = await redis_client.get(cache_key)
 		if cached is not None:
+			_api_key_cache[digest] = cached == "1"
 			return cached == "1"
 
 		# Check database
 		# This is a placeholder - implement based on your API key storage
 		# For now, accept a test key in development
-		from app.config import settings
 		if settings.DEBUG and api_key == "msk_test_key_development_only":
 			await redis_client.setex(cache_key, 300, "1")  # Cache for 5 minutes
+			_api_key_cache[digest] = True
 			return True
 
 		# In production, check against database
-		# hashed_key = await APIKeyService.hash_api_key(api_key)
+		# hashed_key = APIKeyService.hash_api_key(api_key)
 		# result = await db.execute(
 		#     select(APIKey).where(APIKey.hashed_key == hashed_key, APIKey.is_active == True)
 		# )
@@ -57,6 +80,16 @@ class APIKeyService:
 		await redis_client.setex(cache_key, 60, "0")  # Cache negative result for 1 minute
 		return False
 
+	@staticmethod
+	async def invalidate_api_key(api_key: str) -> None:
+		"""Drop a key from both caches so a revocation applies on the next request"""
+		digest = _api_key_digest(api_key)
+		_api_key_cache.pop(digest, None)
+		redis_client = await get_redis()
+		await redis_client.delete(f"api_key:valid:{digest}")
+		# Les autres workers vident aussi leur cache local
+		await redis_client.publish(API_KEY_INVALIDATE_CHANNEL, digest)
+
 
 # Global instance
 api_key_service = APIKeyService()
@@ -64,4 +97,46 @@ api_key_service = APIKeyService()
 
 async def validate_api_key(api_key: str) -> bool:
 	"""Global function for API key validation"""
-	return await api_key_service.validate_api_key(api_key)
\ No newline at end of file
+	return await api_key_service.validate_api_key(api_key)
+
+
+async def _listen_for_invalidations():
+	"""Per-worker loop: drop revoked digests from the local cache"""
+	while True:
+		pubsub = None
+		try:
+			redis_client = await get_redis()
+			pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+			await pubsub.subscribe(API_KEY_INVALIDATE_CHANNEL)
+			async for message in pubsub.listen():
+				if message["type"] == "message":
+					_api_key_cache.pop(message["data"], None)
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			logger.error(f"API key invalidation listener error: {e}")
+			# Messages manqués pendant la coupure : on repart d'un cache vide
+			_api_key_cache.clear()
+			await asyncio.sleep(1)
+		finally:
+			if pubsub is not None:
+				await pubsub.aclose()
+
+
+def start_invalidation_listener() -> None:
+	"""Start the revocation listener (application startup)"""
+	global _invalidation_listener
+	if _invalidation_listener is None or _invalidation_listener.done():
+		_invalidation_listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+	"""Stop the revocation listener (application shutdown)"""
+	global _invalidation_listener
+	if _invalidation_listener is not None:
+		_invalidation_listener.cancel()
+		try:
+			await _invalidation_listener
+		except asyncio.CancelledError:
+			pass
+		_invalidation_listener = None
@@ -1,15 +1,15 @@
 from __future__ import annotations
-from typing import Optional, List
+from typing import Optional, IO, Any, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import Select, select, desc
 from datetime import date, datetime, timezone
-import io
+import asyncio
 import logging
+import tempfile
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.worksheet import Worksheet
+from xlsxwriter import Workbook
+from xlsxwriter.format import Format
+from xlsxwriter.worksheet import Worksheet
 
 from app.models.reading import Reading
 from app.models.meter import Meter
@@ -18,83 +18,187 @@ from app.services.storage_service import storage_service
 
 logger = logging.getLogger(__name__)
 
+# Le fichier généré reste en mémoire jusqu'à 16 Mo, puis bascule sur disque
+EXPORT_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+# Nombre de lignes lues par lot depuis le curseur serveur
+EXPORT_YIELD_PER = 2000
+
+# constant_memory : chaque ligne est écrite sur disque dès qu'on passe à la suivante,
+# la mémoire reste constante quel que soit le nombre de relevés.
+# Les textes saisis (notes, adresses) ne sont jamais interprétés comme formules ou liens.
+WORKBOOK_OPTIONS = {
+	"constant_memory": True,
+	"strings_to_formulas": False,
+	"strings_to_urls": False,
+	"strings_to_numbers": False,
+}
+
+# Formats partagés, déclarés une fois et enregistrés par classeur (add_format)
+BORDER = {"border": 1}
+FORMATS = {
+	"header_row1": {**BORDER, "bold": True, "font_size": 11, "align": "center", "valign": "vcenter", "text_wrap": True},
+	"header_row2": {**BORDER, "bold": True, "align": "center", "valign": "vcenter", "text_wrap": True},
+	"data": BORDER,
+	"num": {**BORDER, "num_format": "#,##0"},
+	"date_time": {**BORDER, "num_format": "dd.mm.yyyy hh:mm"},
+	"link": {**BORDER, "font_color": "#0563C1", "underline": 1, "align": "center", "valign": "vcenter"},
+	"title": {"bold": True, "font_size": 14},
+	"summary_header": {**BORDER, "bold": True, "font_size": 11},
+}
+
+COLUMN_WIDTHS = (30, 35, 30, 25, 25, 20, 20, 20, 15, 15, 25, 25, 25, 40)  # A-N
+# (première ligne, première colonne, dernière ligne, dernière colonne), indices 0
+HEADER_MERGED_RANGES = (
+	(0, 0, 0, 4),    # A1:E1
+	(0, 5, 0, 6),    # F1:G1
+	(0, 7, 1, 7),    # H1:H2
+	(0, 8, 0, 9),    # I1:J1
+	(0, 10, 0, 11),  # K1:L1
+	(0, 12, 1, 12),  # M1:M2
+	(0, 13, 1, 13),  # N1:N2
+)
+HEADERS_ROW1 = (
+	"Информация об элементе сети", None, None, None, None,
+	"Показания", None,
+	"Дата обхода",
+	"Координаты", None,
+	"Фотографии", None,
+	"Исполнитель",
+	"Комментарии",
+)
+HEADERS_ROW2 = (
+	"Идентификационный код",
+	"Адрес",
+	"Наименование объекта сети",
+	"Тип прибора учета",
+	"Номер ПУ",
+	"Предыдущие показания",
+	"Текущие показания",
+	None,
+	"Долгота",
+	"Широта",
+	"Показания",
+	"Счетчик",
+	None,
+	None,
+)
+PHOTO_LINK_LABELS = ("Фото показаний", "Фото счетчика")
+PHOTO_COLUMNS = (10, 11)  # K, L
+
 
 class ExportService:
 	def __init__(self, session: AsyncSession):
 		self.session = session
 		self.storage_service = storage_service
 
-	def _draw_report_header(self, worksheet: Worksheet) -> None:
-		"""Dessine les en-têtes avec cellules fusionnées"""
-		# Première ligne avec cellules fusionnées
-		worksheet.merge_cells("A1:E1")
-		worksheet.merge_cells("F1:G1")
-		worksheet.merge_cells("H1:H2")
-		worksheet.merge_cells("I1:J1")
-		worksheet.merge_cells("K1:L1")
-		worksheet.merge_cells("M1:M2")
-		worksheet.merge_cells("N1:N2")
-
-		# Valeurs première ligne
-		worksheet.cell(row=1, column=1).value = "Информация об элементе сети"
-		worksheet.cell(row=1, column=6).value = "Показания"
-		worksheet.cell(row=1, column=8).value = "Дата обхода"
-		worksheet.cell(row=1, column=9).value = "Координаты"
-		worksheet.cell(row=1, column=11).value = "Фотографии"
-		worksheet.cell(row=1, column=13).value = "Исполнитель"
-		worksheet.cell(row=1, column=14).value = "Комментарии"
-
-		# Alignement et style première ligne
-		for col in [1, 6, 8, 9, 11, 13, 14]:
-			cell = worksheet.cell(row=1, column=col)
-			cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-			cell.font = Font(bold=True, size=11)
-
-		# Deuxième ligne - sous-colonnes
-		headers_row2 = [
-			(1, "Идентификационный код"),
-			(2, "Адрес"),
-			(3, "Наименование объекта сети"),
-			(4, "Тип прибора учета"),
-			(5, "Номер ПУ"),
-			(6, "Предыдущие показания"),
-			(7, "Текущие показания"),
-			(9, "Долгота"),
-			(10, "Широта"),
-			(11, "Показания"),
-			(12, "Счетчик"),
-		]
-
-		for col, value in headers_row2:
-			cell = worksheet.cell(row=2, column=col, value=value)
-			cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-			cell.font = Font(bold=True)
-
-		# Largeurs de colonnes
-		column_widths = {
-			"A": 30, "B": 35, "C": 30, "D": 25, "E": 25,
-			"F": 20, "G": 20, "H": 20, "I": 15, "J": 15,
-			"K": 25, "L": 25, "M": 25, "N": 40
-		}
-
-		for col_letter, width in column_widths.items():
-			worksheet.column_dimensions[col_letter].width = width
-
-		# Hauteur des lignes d'en-tête
-		worksheet.row_dimensions[1].height = 30
-		worksheet.row_dimensions[2].height = 30
-
-		# Bordures pour les en-têtes
-		thin_border = Border(
-			left=Side(style='thin'),
-			right=Side(style='thin'),
-			top=Side(style='thin'),
-			bottom=Side(style='thin')
+	def _write_report_header(self, ws: Worksheet, formats: Dict[str, Format]) -> None:
+		"""Écrit les deux lignes d'en-têtes fusionnées (ordre strict des lignes en constant_memory)"""
+		for col, width in enumerate(COLUMN_WIDTHS):
+			ws.set_column(col, col, width)
+		ws.set_row(0, 30)
+		ws.set_row(1, 30)
+		ws.freeze_panes(2, 0)
+
+		# Fusions sans format : les cellules vides de la ligne 2 ne sont pas écrites,
+		# la ligne 1 n'est donc pas encore vidée sur disque quand on la réécrit avec son format
+		for first_row, first_col, last_row, last_col in HEADER_MERGED_RANGES:
+			ws.merge_range(first_row, first_col, last_row, last_col, HEADERS_ROW1[first_col])
+		ws.write_row(0, 0, HEADERS_ROW1, formats["header_row1"])
+		ws.write_row(1, 0, HEADERS_ROW2, formats["header_row2"])
+
+	@staticmethod
+	def _naive_datetime(value: Any) -> Any:
+		"""Excel ne gère pas les fuseaux horaires : retire tzinfo (ou garde le texte brut)"""
+		if isinstance(value, datetime):
+			return value.replace(tzinfo=None)
+		try:
+			return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+		except Exception:
+			return str(value)
+
+	def _write_reading_row(
+			self,
+			ws: Worksheet,
+			row: int,
+			data,
+			include_photos: bool,
+			formats: Dict[str, Format]
+	) -> None:
+		"""Écrit les cellules A-N d'un relevé"""
+		prev_value = data.get("prev_reading_value")
+		curr_value = data.get("reading_value")
+		reading_date = data.get("reading_date")
+		longitude = data.get("reading_longitude")
+		latitude = data.get("reading_latitude")
+		data_format = formats["data"]
+
+		ws.write_row(row, 0, (
+			data.get("meter_id_code"),
+			data.get("location_address"),
+			data.get("client_name"),
+			data.get("meter_type"),
+			data.get("meter_number"),
+		), data_format)
+		ws.write(row, 5, float(prev_value) if prev_value is not None else None, formats["num"])
+		ws.write(row, 6, float(curr_value) if curr_value is not None else None, formats["num"])
+		ws.write(row, 7, self._naive_datetime(reading_date) if reading_date else None, formats["date_time"])
+		ws.write_row(row, 8, (
+			f"{float(longitude):.6f}" if longitude is not None else None,
+			f"{float(latitude):.6f}" if latitude is not None else None,
+		), data_format)
+
+		# Colonnes K et L: Фотографии (liens courts)
+		photos = (data.get("photos") or []) if include_photos else []
+		for i, col in enumerate(PHOTO_COLUMNS):
+			if i < len(photos):
+				# Au-delà de la limite Excel (65 530 liens par feuille, URL > 2 079 caractères),
+				# l'URL est écrite en texte plutôt que perdue
+				if ws.write_url(row, col, photos[i], formats["link"], PHOTO_LINK_LABELS[i]):
+					ws.write_string(row, col, photos[i], data_format)
+			else:
+				ws.write_blank(row, col, None, data_format)
+
+		ws.write_row(row, 12, (data.get("controller_name"), data.get("notes", "")), data_format)
+
+	@staticmethod
+	def _build_query(
+			start_date: Optional[date] = None,
+			end_date: Optional[date] = None,
+			user_id: Optional[str] = None
+	) -> Select:
+		"""Relevés joints au compteur et au contrôleur, filtrés par période et/ou utilisateur"""
+		query = (
+			select(
+				Reading.id.label("reading_id"),
+				Reading.reading_value,
+				Reading.reading_date,
+				Reading.latitude.label("reading_latitude"),
+				Reading.longitude.label("reading_longitude"),
+				Reading.notes,
+				Reading.photos,
+				Meter.meter_number,
+				Meter.type.label("meter_type"),
+				Meter.location_address,
+				Meter.client_name,
+				Meter.prev_reading_value,
+				Meter.meter_id_code,
+				User.full_name.label("controller_name"),
+			)
+			.join(Meter, Reading.meter_id == Meter.id)
+			.join(User, Reading.user_id == User.id)
+			.order_by(desc(Reading.reading_date))
 		)
-
-		for row in range(1, 3):
-			for col in range(1, 15):
-				worksheet.cell(row=row, column=col).border = thin_border
+		if start_date:
+			query = query.where(
+				Reading.reading_date >= datetime.combine(start_date, datetime.min.time(), tzinfo=timezone.utc)
+			)
+		if end_date:
+			query = query.where(
+				Reading.reading_date <= datetime.combine(end_date, datetime.max.time(), tzinfo=timezone.utc)
+			)
+		if user_id:
+			query = query.where(Reading.user_id == user_id)
+		return query
 
 	async def export_readings(
 			self,
@@ -102,465 +206,135 @@ class ExportService:
 			end_date: date,
 			include_photos: bool = True,
 			user_id: Optional[str] = None
-	) -> io.BytesIO:
+	) -> IO[bytes]:
 		"""
 		Exporte les relevés en Excel avec la structure d'en-têtes définie.
-		Retourne un BytesIO positionné au début.
-		"""
-		# 1) Récupération des données avec photos JSON
-		async with self.session as db:
-			query = (
-				select(
-					Reading.id.label("reading_id"),
-					Reading.reading_value,
-					Reading.reading_date,
-					Reading.latitude.label("reading_latitude"),
-					Reading.longitude.label("reading_longitude"),
-					Reading.notes,
-					Reading.photos,  # Ajout du champ photos JSON
-					Meter.meter_number,
-					Meter.type.label("meter_type"),
-					Meter.location_address,
-					Meter.client_name,
-					Meter.prev_reading_value,
-					Meter.meter_id_code,
-					User.full_name.label("controller_name"),
-				)
-				.join(Meter, Reading.meter_id == Meter.id)
-				.join(User, Reading.user_id == User.id)
-				.where(
-					and_(
-						Reading.reading_date >= datetime.combine(start_date, datetime.min.time(), tzinfo=timezone.utc),
-						Reading.reading_date <= datetime.combine(end_date, datetime.max.time(), tzinfo=timezone.utc),
-					)
-				)
-				.order_by(desc(Reading.reading_date))
-			)
-			if user_id:
-				query = query.where(Reading.user_id == user_id)
-
-			result = await db.execute(query)
-			rows: List[tuple] = result.all()
-
-		# 2) Création du workbook
-		wb = Workbook()
-		ws = wb.active
-		ws.title = "Отчет по показаниям"
-
-		# 3) Ajout des en-têtes personnalisés
-		self._draw_report_header(ws)
-
-		# 4) Styles pour les données
-		date_style = NamedStyle(name="date_time_style")
-		date_style.number_format = "dd.mm.yyyy hh:mm"
-		num_style = NamedStyle(name="num_style")
-		num_style.number_format = "#,##0"
-
-		for st in (date_style, num_style):
-			if st.name not in wb.named_styles:
-				wb.add_named_style(st)
-
-		# Bordure pour les cellules de données
-		thin_border = Border(
-			left=Side(style='thin'),
-			right=Side(style='thin'),
-			top=Side(style='thin'),
-			bottom=Side(style='thin')
-		)
 
-		# 5) Ajout des données (commence à la ligne 3)
-		for row_idx, row in enumerate(rows, start=3):
-			data = row._mapping
-
-			# Colonne A: Идентификационный код
-			ws.cell(row=row_idx, column=1, value=data.get("meter_id_code"))
-
-			# Colonne B: Адрес
-			ws.cell(row=row_idx, column=2, value=data.get("location_address"))
-
-			# Colonne C: Наименование объекта сети (client_name)
-			ws.cell(row=row_idx, column=3, value=data.get("client_name"))
-
-			# Colonne D: Тип прибора учета
-			ws.cell(row=row_idx, column=4, value=data.get("meter_type"))
-
-			# Colonne E: Номер ПУ
-			ws.cell(row=row_idx, column=5, value=data.get("meter_number"))
-
-			# Colonne F: Предыдущие показания
-			prev_value = data.get("prev_reading_value")
-			if prev_value is not None:
-				cell = ws.cell(row=row_idx, column=6, value=float(prev_value))
-				cell.style = "num_style"
-
-			# Colonne G: Текущие показания
-			curr_value = data.get("reading_value")
-			if curr_value is not None:
-				cell = ws.cell(row=row_idx, column=7, value=float(curr_value))
-				cell.style = "num_style"
-
-			# Colonne H: Дата обхода
-			reading_date = data.get("reading_date")
-			if reading_date:
-				if isinstance(reading_date, datetime):
-					# Convert to timezone-naive datetime by removing tzinfo
-					reading_date_naive = reading_date.replace(tzinfo=None)
-					cell = ws.cell(row=row_idx, column=8, value=reading_date_naive)
-				else:
-					try:
-						dt = datetime.fromisoformat(str(reading_date))
-						# Ensure the parsed datetime is timezone-naive
-						dt_naive = dt.replace(tzinfo=None)
-						cell = ws.cell(row=row_idx, column=8, value=dt_naive)
-					except Exception:
-						cell = ws.cell(row=row_idx, column=8, value=str(reading_date))
-				cell.style = "date_time_style"
-
-			# Colonne I: Долгота
-			longitude = data.get("reading_longitude")
-			if longitude is not None:
-				ws.cell(row=row_idx, column=9, value=f"{float(longitude):.6f}")
-
-			# Colonne J: Широта
-			latitude = data.get("reading_latitude")
-			if latitude is not None:
-				ws.cell(row=row_idx, column=10, value=f"{float(latitude):.6f}")
-
-			# Colonnes K et L: Фотографии (liens courts)
-			photos = data.get("photos", [])
-			if photos and include_photos:
-				# Colonne K: Photo des relevés
-				if len(photos) > 0:
-					self._add_photo_link(ws, row_idx, 11, photos[0], "Фото показаний")
-
-				# Colonne L: Photo du compteur
-				if len(photos) > 1:
-					self._add_photo_link(ws, row_idx, 12, photos[1], "Фото счетчика")
-
-			# Colonne M: Исполнитель
-			ws.cell(row=row_idx, column=13, value=data.get("controller_name"))
-
-			# Colonne N: Комментарии
-			ws.cell(row=row_idx, column=14, value=data.get("notes", ""))
-
-			# Appliquer les bordures à toutes les cellules de la ligne
-			for col in range(1, 15):
-				ws.cell(row=row_idx, column=col).border = thin_border
-
-		# 6) Filtres automatiques (commence après les en-têtes fusionnés)
-		if rows:
-			ws.auto_filter.ref = f"A2:N{len(rows) + 2}"
-
-		# Freeze panes après les deux lignes d'en-tête
-		ws.freeze_panes = "A3"
-
-		# 7) Ajout de l'onglet résumé
-		self._add_summary_sheet(wb, rows, start_date, end_date)
-
-		# 8) Sauvegarde dans BytesIO
-		out = io.BytesIO()
-		wb.save(out)
-		out.seek(0)
-		return out
+		Les lignes sont lues en streaming et écrites au fil de l'eau dans un
+		classeur write-only ; retourne un fichier temporaire positionné au début
+		(à fermer par l'appelant).
+		"""
+		query = self._build_query(start_date, end_date, user_id)
+		return await self._write_workbook(query, include_photos, start_date, end_date)
 
 	async def export_readings_all(
 			self,
 			include_photos: bool = True,
 			user_id: Optional[str] = None
-	) -> io.BytesIO:
+	) -> IO[bytes]:
 		"""
 		Exporte tous les relevés en Excel sans filtrer par date.
-		Retourne un BytesIO positionné au début.
+		Même écriture en streaming que export_readings ; retourne un fichier
+		temporaire positionné au début (à fermer par l'appelant).
 		"""
-		# 1) Récupération de toutes les données avec photos JSON
-		async with self.session as db:
-			query = (
-				select(
-					Reading.id.label("reading_id"),
-					Reading.reading_value,
-					Reading.reading_date,
-					Reading.latitude.label("reading_latitude"),
-					Reading.longitude.label("reading_longitude"),
-					Reading.notes,
-					Reading.photos,
-					Meter.meter_number,
-					Meter.type.label("meter_type"),
-					Meter.location_address,
-					Meter.client_name,
-					Meter.prev_reading_value,
-					Meter.meter_id_code,
-					User.full_name.label("controller_name"),
-				)
-				.join(Meter, Reading.meter_id == Meter.id)
-				.join(User, Reading.user_id == User.id)
-				.order_by(desc(Reading.reading_date))
-			)
-			if user_id:
-				query = query.where(Reading.user_id == user_id)
-
-			result = await db.execute(query)
-			rows: List[tuple] = result.all()
-
-		# 2) Création du workbook
-		wb = Workbook()
-		ws = wb.active
-		ws.title = "Отчет по показаниям"
-
-		# 3) Ajout des en-têtes personnalisés
-		self._draw_report_header(ws)
-
-		# 4) Styles pour les données
-		date_style = NamedStyle(name="date_time_style")
-		date_style.number_format = "dd.mm.yyyy hh:mm"
-		num_style = NamedStyle(name="num_style")
-		num_style.number_format = "#,##0"
-
-		for st in (date_style, num_style):
-			if st.name not in wb.named_styles:
-				wb.add_named_style(st)
-
-		# Bordure pour les cellules de données
-		thin_border = Border(
-			left=Side(style='thin'),
-			right=Side(style='thin'),
-			top=Side(style='thin'),
-			bottom=Side(style='thin')
-		)
+		query = self._build_query(user_id=user_id)
+		return await self._write_workbook(query, include_photos)
 
-		# 5) Ajout des données (commence à la ligne 3)
-		for row_idx, row in enumerate(rows, start=3):
-			data = row._mapping
-
-			# Colonne A: Идентификационный код
-			ws.cell(row=row_idx, column=1, value=data.get("meter_id_code"))
-
-			# Colonne B: Адрес
-			ws.cell(row=row_idx, column=2, value=data.get("location_address"))
-
-			# Colonne C: Наименование объекта сети (client_name)
-			ws.cell(row=row_idx, column=3, value=data.get("client_name"))
-
-			# Colonne D: Тип прибора учета
-			ws.cell(row=row_idx, column=4, value=data.get("meter_type"))
-
-			# Colonne E: Номер ПУ
-			ws.cell(row=row_idx, column=5, value=data.get("meter_number"))
-
-			# Colonne F: Предыдущие показания
-			prev_value = data.get("prev_reading_value")
-			if prev_value is not None:
-				cell = ws.cell(row=row_idx, column=6, value=float(prev_value))
-				cell.style = "num_style"
-
-			# Colonne G: Текущие показания
-			curr_value = data.get("reading_value")
-			if curr_value is not None:
-				cell = ws.cell(row=row_idx, column=7, value=float(curr_value))
-				cell.style = "num_style"
-
-			# Colonne H: Дата обхода
-			reading_date = data.get("reading_date")
-			if reading_date:
-				if isinstance(reading_date, datetime):
-					# Convert to timezone-naive datetime by removing tzinfo
-					reading_date_naive = reading_date.replace(tzinfo=None)
-					cell = ws.cell(row=row_idx, column=8, value=reading_date_naive)
-				else:
-					try:
-						dt = datetime.fromisoformat(str(reading_date))
-						# Ensure the parsed datetime is timezone-naive
-						dt_naive = dt.replace(tzinfo=None)
-						cell = ws.cell(row=row_idx, column=8, value=dt_naive)
-					except Exception:
-						cell = ws.cell(row=row_idx, column=8, value=str(reading_date))
-				cell.style = "date_time_style"
-
-			# Colonne I: Долгота
-			longitude = data.get("reading_longitude")
-			if longitude is not None:
-				ws.cell(row=row_idx, column=9, value=f"{float(longitude):.6f}")
-
-			# Colonne J: Широта
-			latitude = data.get("reading_latitude")
-			if latitude is not None:
-				ws.cell(row=row_idx, column=10, value=f"{float(latitude):.6f}")
-
-			# Colonnes K et L: Фотографии (liens courts)
-			photos = data.get("photos", [])
-			if photos and include_photos:
-				# Colonne K: Photo des relevés
-				if len(photos) > 0:
-					self._add_photo_link(ws, row_idx, 11, photos[0], "Фото показаний")
-
-				# Colonne L: Photo du compteur
-				if len(photos) > 1:
-					self._add_photo_link(ws, row_idx, 12, photos[1], "Фото счетчика")
-
-			# Colonne M: Исполнитель
-			ws.cell(row=row_idx, column=13, value=data.get("controller_name"))
-
-			# Colonne N: Комментарии
-			ws.cell(row=row_idx, column=14, value=data.get("notes", ""))
-
-			# Appliquer les bordures à toutes les cellules de la ligne
-			for col in range(1, 15):
-				ws.cell(row=row_idx, column=col).border = thin_border
-
-		# 6) Filtres automatiques (commence après les en-têtes fusionnés)
-		if rows:
-			ws.auto_filter.ref = f"A2:N{len(rows) + 2}"
-
-		# Freeze panes après les deux lignes d'en-tête
-		ws.freeze_panes = "A3"
-
-		# 7) Ajout de l'onglet résumé (sans période)
-		self._add_summary_sheet_all(wb, rows)
-
-		# 8) Sauvegarde dans BytesIO
-		out = io.BytesIO()
-		wb.save(out)
+	async def _write_workbook(
+			self,
+			query: Select,
+			include_photos: bool,
+			start_date: Optional[date] = None,
+			end_date: Optional[date] = None
+	) -> IO[bytes]:
+		"""Écrit les lignes de `query` dans un classeur xlsxwriter et retourne le fichier temporaire"""
+		# 1) Création du workbook (constant_memory : les lignes ne sont pas gardées en mémoire)
+		out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+		wb = None
+		try:
+			wb = Workbook(out, WORKBOOK_OPTIONS)
+			ws = wb.add_worksheet("Отчет по показаниям")
+
+			# 2) Formats des cellules
+			formats = {name: wb.add_format(props) for name, props in FORMATS.items()}
+
+			# 3) Ajout des en-têtes personnalisés
+			self._write_report_header(ws, formats)
+
+			# 4) Ajout des données (à partir de la ligne 3) et statistiques du résumé en une passe
+			total_readings = 0
+			meter_numbers = set()
+			controllers = set()
+			meter_types_count = {}
+
+			result = await self.session.stream(query.execution_options(yield_per=EXPORT_YIELD_PER))
+			async for row in result:
+				data = row._mapping
+				self._write_reading_row(ws, total_readings + 2, data, include_photos, formats)
+
+				total_readings += 1
+				if data.get("meter_number"):
+					meter_numbers.add(data["meter_number"])
+				if data.get("controller_name"):
+					controllers.add(data["controller_name"])
+				mt = data.get("meter_type", "Не указан")
+				meter_types_count[mt] = meter_types_count.get(mt, 0) + 1
+
+			# 5) Filtres automatiques (commence après les en-têtes fusionnés)
+			if total_readings:
+				ws.autofilter(1, 0, total_readings + 1, 13)
+
+			# 6) Ajout de l'onglet résumé (période seulement pour un export daté)
+			self._add_summary_sheet(
+				wb, formats, total_readings, len(meter_numbers), len(controllers), meter_types_count, start_date, end_date
+			)
+		except BaseException:
+			# Échec (requête, écriture, annulation) : ni le fichier temporaire ni les
+			# fichiers de lignes du classeur ne doivent survivre à l'export
+			if wb is not None:
+				try:
+					wb.close()
+				except Exception as e:
+					logger.warning(f"Fermeture du classeur après échec impossible: {e}")
+			out.close()
+			raise
+
+		# 7) Assemblage du fichier (hors de la boucle d'événements)
+		await asyncio.to_thread(wb.close)
 		out.seek(0)
 		return out
 
-	def _add_summary_sheet_all(self, wb: Workbook, rows: List[tuple]):
-		"""Crée un onglet 'Сводка' avec les statistiques, sans période spécifique."""
-		ws = wb.create_sheet("Сводка")
-		ws.column_dimensions["A"].width = 35
-		ws.column_dimensions["B"].width = 30
-
-		# Style pour le titre
-		title_font = Font(bold=True, size=14)
-		header_font = Font(bold=True, size=11)
+	def _add_summary_sheet(
+			self,
+			wb: Workbook,
+			formats: Dict[str, Format],
+			total_readings: int,
+			unique_meters: int,
+			controllers: int,
+			meter_types_count: dict,
+			start_date: Optional[date] = None,
+			end_date: Optional[date] = None
+	):
+		"""Crée un onglet 'Сводка' avec les statistiques, avec la période si fournie."""
+		ws = wb.add_worksheet("Сводка")
+		ws.set_column(0, 0, 35)
+		ws.set_column(1, 1, 30)
+
+		rows = []
+		if start_date and end_date:
+			rows.append(("Период", f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"))
+		rows += [
+			("Всего показаний", total_readings),
+			("Уникальных приборов учета", unique_meters),
+			("Контролеров", controllers),
+			(None, None),
+		]
 
 		# Titre
-		title = ws.cell(row=1, column=1, value="Сводка по экспорту (tous les relevés)")
-		title.font = title_font
-
-		# Total des relevés
-		total_readings = len(rows)
-		ws.cell(row=3, column=1, value="Всего показаний")
-		ws.cell(row=3, column=2, value=total_readings)
-
-		# Compteurs uniques et contrôleurs
-		meter_numbers = set()
-		controllers = set()
-		meter_types_count = {}
-
-		for r in rows:
-			m = r._mapping
-			if m.get("meter_number", "Не указан"):
-				meter_numbers.add(m["meter_number"])
-			if m.get("controller_name"):
-				controllers.add(m["controller_name"])
-			mt = m.get("meter_type", "Не указан")
-			meter_types_count[mt] = meter_types_count.get(mt, 0) + 1
-
-		ws.cell(row=4, column=1, value="Уникальных приборов учета")
-		ws.cell(row=4, column=2, value=len(meter_numbers))
-
-		ws.cell(row=5, column=1, value="Контролеров")
-		ws.cell(row=5, column=2, value=len(controllers))
+		title = "Сводка по экспорту" if start_date else "Сводка по экспорту (tous les relevés)"
+		ws.write(0, 0, title, formats["title"])
 
-		# Statistiques par type
-		ws.cell(row=7, column=1, value="Показания по типам приборов")
-		ws.cell(row=7, column=1).font = header_font
-
-		row_cursor = 8
-		for mt, count in sorted(meter_types_count.items(), key=lambda x: x[0] or ""):
-			ws.cell(row=row_cursor, column=1, value=mt)
-			ws.cell(row=row_cursor, column=2, value=count)
+		# Période, total, compteurs uniques et contrôleurs (à partir de la ligne 3)
+		row_cursor = 2
+		for values in rows:
+			ws.write_row(row_cursor, 0, values, formats["data"])
 			row_cursor += 1
 
-		# Bordures pour la section de résumé
-		thin_border = Border(
-			left=Side(style='thin'),
-			right=Side(style='thin'),
-			top=Side(style='thin'),
-			bottom=Side(style='thin')
-		)
-
-		for row in range(3, row_cursor):
-			for col in range(1, 3):
-				ws.cell(row=row, column=col).border = thin_border
-
-	def _add_photo_link(self, ws: Worksheet, row: int, col: int, url: str, display_text: str):
-		"""
-		Ajoute un lien hypertexte court dans une cellule.
-
-		Args:
-			ws: La feuille de calcul
-			row: Numéro de ligne
-			col: Numéro de colonne
-			url: URL complète de la photo
-			display_text: Texte affiché pour le lien
-		"""
-		cell = ws.cell(row=row, column=col)
-		cell.value = display_text
-		cell.hyperlink = url
-		cell.font = Font(color="0563C1", underline="single")  # Bleu avec soulignement
-		cell.alignment = Alignment(horizontal="center", vertical="center")
-
-	def _add_summary_sheet(self, wb: Workbook, rows: List[tuple], start_date: date, end_date: date):
-		"""Crée un onglet 'Сводка' avec les statistiques."""
-		ws = wb.create_sheet("Сводка")
-		ws.column_dimensions["A"].width = 35
-		ws.column_dimensions["B"].width = 30
-
-		# Style pour le titre
-		title_font = Font(bold=True, size=14)
-		header_font = Font(bold=True, size=11)
-
-		# Titre
-		title = ws.cell(row=1, column=1, value="Сводка по экспорту")
-		title.font = title_font
-
-		# Période
-		ws.cell(row=3, column=1, value="Период")
-		ws.cell(row=3, column=2, value=f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}")
-
-		# Total des relevés
-		total_readings = len(rows)
-		ws.cell(row=4, column=1, value="Всего показаний")
-		ws.cell(row=4, column=2, value=total_readings)
-
-		# Compteurs uniques et contrôleurs
-		meter_numbers = set()
-		controllers = set()
-		meter_types_count = {}
-
-		for r in rows:
-			m = r._mapping
-			if m.get("meter_number"):
-				meter_numbers.add(m["meter_number"])
-			if m.get("controller_name"):
-				controllers.add(m["controller_name"])
-			mt = m.get("meter_type", "Не указан")
-			meter_types_count[mt] = meter_types_count.get(mt, 0) + 1
-
-		ws.cell(row=5, column=1, value="Уникальных приборов учета")
-		ws.cell(row=5, column=2, value=len(meter_numbers))
-
-		ws.cell(row=6, column=1, value="Контролеров")
-		ws.cell(row=6, column=2, value=len(controllers))
-
 		# Statistiques par type
-		ws.cell(row=8, column=1, value="Показания по типам приборов")
-		ws.cell(row=8, column=1).font = header_font
+		ws.write(row_cursor, 0, "Показания по типам приборов", formats["summary_header"])
+		ws.write_blank(row_cursor, 1, None, formats["data"])
+		row_cursor += 1
 
-		row_cursor = 9
 		for mt, count in sorted(meter_types_count.items(), key=lambda x: x[0] or ""):
-			ws.cell(row=row_cursor, column=1, value=mt)
-			ws.cell(row=row_cursor, column=2, value=count)
+			ws.write_row(row_cursor, 0, (mt, count), formats["data"])
 			row_cursor += 1
-
-		# Bordures pour la section de résumé
-		thin_border = Border(
-			left=Side(style='thin'),
-			right=Side(style='thin'),
-			top=Side(style='thin'),
-			bottom=Side(style='thin')
-		)
-
-		for row in range(3, row_cursor):
-			for col in range(1, 3):
-				ws.cell(row=row, column=col).border = thin_border
\ No newline at end of file
@@ -3,9 +3,10 @@
 from typing import Dict, Any, List
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select, text, table, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timezone
-import logging, io
+import logging, uuid
 
 from openpyxl import load_workbook
 
@@ -30,6 +31,13 @@ REQUIRED = [
     RUS_COLS["meter_number"],
 ]
 
+# Table temporaire alimentée par COPY avant l'insertion dans meters
+IMPORT_TEMP_TABLE = "_meter_import"
+IMPORT_COLUMNS = [
+    "id", "meter_id_code", "meter_number", "type", "location_address", "client_name",
+    "prev_reading_value", "last_reading_date", "status",
+]
+
 def _to_str(x):
     if x is None:
         return None
@@ -71,20 +79,26 @@ class MeterService:
         - 'Предыдущие показания' → prev_reading_value sur Meter.
         - 'Дата обхода' (si présente) → last_reading_date.
         """
+        wb = None
         try:
             if not file.filename.lower().endswith(".xlsx"):
                 raise ValueError("Format non supporté : fournir un fichier .xlsx")
 
-            content = await file.read()
-            wb = load_workbook(io.BytesIO(content), data_only=True)
+            # Lecture seule : les lignes sont lues à la volée, sans graphe de cellules en mémoire.
+            # Le classeur est lu directement depuis le fichier temporaire de l'upload
+            # (déjà sur disque au-delà de 1 Mo), sans copie en bytes
+            await file.seek(0)
+            wb = load_workbook(file.file, read_only=True, data_only=True)
             sheet = wb.active
 
             # Ligne 1 = groupes fusionnés, Ligne 2 = en-têtes réels
-            headers_row2 = [str(c.value).strip() if c.value else None for c in sheet[2]]
+            header_rows = list(sheet.iter_rows(min_row=1, max_row=2, values_only=True))
+            first_row, headers_row2 = (header_rows + [(), ()])[:2]
+            headers_row2 = [str(v).strip() if v else None for v in headers_row2]
             header_index = {h: i for i, h in enumerate(headers_row2) if h}
 
             # Détection optionnelle de "Дата обхода" (souvent en 8e colonne)
-            first_row = [str(c.value).strip() if c.value else None for c in sheet[1]]
+            first_row = [str(v).strip() if v else None for v in first_row]
             has_visit_date = "Дата обхода" in first_row
             visit_date_col_idx = 7 if has_visit_date and len(headers_row2) >= 8 else None  # 0-based
 
@@ -99,70 +113,71 @@ class MeterService:
             errors: List[str] = []
             meters: List[MeterResponse] = []
 
-            async with self.session as db:
-                # Données à partir de la ligne 3
-                for row_idx, row in enumerate(sheet.iter_rows(min_row=3, values_only=True), start=3):
-                    try:
-                        def val(col_name):
-                            idx = header_index.get(col_name)
-                            return row[idx] if idx is not None and idx < len(row) else None
-
-                        meter_id_code = _to_str(val(RUS_COLS["id_code"]))
-                        meter_number  = _to_str(val(RUS_COLS["meter_number"]))
-                        meter_type    = _to_str(val(RUS_COLS["meter_type"]))
-
-                        if not meter_id_code or not meter_number or not meter_type:
-                            failed += 1
-                            errors.append(f"Ligne {row_idx}: champs requis manquants (id/num/type).")
-                            continue
-
-                        # Doublon si même meter_number OU même meter_id_code
-                        existing_q = await db.execute(
-                            select(Meter).where(
-                                or_(Meter.meter_number == meter_number,
-                                    Meter.meter_id_code == meter_id_code)
-                            )
-                        )
-                        if existing_q.scalar_one_or_none():
-                            failed += 1
-                            errors.append(
-                                f"Ligne {row_idx}: compteur {meter_number}/{meter_id_code} existe déjà."
-                            )
-                            continue
-
-                        location_address = _to_str(val(RUS_COLS["address"]))
-                        client_name      = _to_str(val(RUS_COLS["client_name"]))
-                        prev_read        = _to_float(val(RUS_COLS["prev_reading"]))   # ← stocké sur Meter
-                        # curr_read        = _to_float(val(RUS_COLS["curr_reading"])) # ← ignoré à l'import
-
-                        # Date de passage si fournie (considérée comme date du relevé précédent)
-                        last_prev_dt = None
-                        if visit_date_col_idx is not None and visit_date_col_idx < len(row):
-                            last_prev_dt = _to_dt_tz(row[visit_date_col_idx])
-
-                        meter = Meter(
-                            meter_id_code=meter_id_code,
-                            meter_number=meter_number,
-                            type=meter_type,
-                            location_address=location_address,
-                            client_name=client_name,
-                            prev_reading_value=prev_read,
-                            last_reading_date=last_prev_dt,
-                            status="active",
-                            meter_metadata={},  # minimal
-                        )
-                        db.add(meter)
-                        await db.flush()
+            # Doublons à l'intérieur du fichier
+            seen_numbers, seen_codes = set(), set()
+            records: List[tuple] = []
+            record_rows: List[tuple] = []  # (ligne, meter_number, meter_id_code)
 
-                        meters.append(MeterResponse.model_validate(meter))
-                        success += 1
+            # Données à partir de la ligne 3
+            for row_idx, row in enumerate(sheet.iter_rows(min_row=3, values_only=True), start=3):
+                try:
+                    def val(col_name):
+                        idx = header_index.get(col_name)
+                        return row[idx] if idx is not None and idx < len(row) else None
+
+                    meter_id_code = _to_str(val(RUS_COLS["id_code"]))
+                    meter_number  = _to_str(val(RUS_COLS["meter_number"]))
+                    meter_type    = _to_str(val(RUS_COLS["meter_type"]))
 
-                    except Exception as e:
+                    if not meter_id_code or not meter_number or not meter_type:
                         failed += 1
-                        errors.append(f"Ligne {row_idx}: {str(e)}")
+                        errors.append(f"Ligne {row_idx}: champs requis manquants (id/num/type).")
+                        continue
 
-                if success > 0:
-                    await db.commit()
+                    # Doublon si même meter_number OU même meter_id_code
+                    if meter_number in seen_numbers or meter_id_code in seen_codes:
+                        failed += 1
+                        errors.append(
+                            f"Ligne {row_idx}: compteur {meter_number}/{meter_id_code} en double dans le fichier."
+                        )
+                        continue
+
+                    location_address = _to_str(val(RUS_COLS["address"]))
+                    client_name      = _to_str(val(RUS_COLS["client_name"]))
+                    prev_read        = _to_float(val(RUS_COLS["prev_reading"]))   # ← stocké sur Meter
+                    # curr_read        = _to_float(val(RUS_COLS["curr_reading"])) # ← ignoré à l'import
+
+                    # Date de passage si fournie (considérée comme date du relevé précédent)
+                    last_prev_dt = None
+                    if visit_date_col_idx is not None and visit_date_col_idx < len(row):
+                        last_prev_dt = _to_dt_tz(row[visit_date_col_idx])
+
+                    # Même ordre que IMPORT_COLUMNS
+                    records.append((
+                        uuid.uuid4(), meter_id_code, meter_number, meter_type, location_address,
+                        client_name, prev_read, last_prev_dt, "active",
+                    ))
+                    record_rows.append((row_idx, meter_number, meter_id_code))
+                    seen_numbers.add(meter_number)
+                    seen_codes.add(meter_id_code)
+
+                except Exception as e:
+                    failed += 1
+                    errors.append(f"Ligne {row_idx}: {str(e)}")
+
+            if records:
+                inserted = await self._copy_meters(records)
+                meters = [MeterResponse.model_validate(m) for m in inserted]
+                inserted_codes = {m.meter_id_code for m in inserted}
+                for row_idx, meter_number, meter_id_code in record_rows:
+                    if meter_id_code in inserted_codes:
+                        success += 1
+                    else:
+                        failed += 1
+                        errors.append(
+                            f"Ligne {row_idx}: compteur {meter_number}/{meter_id_code} existe déjà."
+                        )
+                await self.session.commit()
 
             logger.info(f"Import terminé: {success} succès, {failed} échecs")
             return {"success": success, "failed": failed, "errors": errors, "meters": meters}
@@ -170,3 +185,34 @@ class MeterService:
         except Exception as e:
             logger.error(f"Échec import: {str(e)}")
             raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            # Lecture seule : le classeur garde le fichier ouvert jusqu'à close()
+            if wb is not None:
+                wb.close()
+
+    async def _copy_meters(self, records: List[tuple]) -> List[Meter]:
+        """
+        Charge les lignes par COPY (asyncpg) dans une table temporaire, puis les insère
+        dans meters avec ON CONFLICT DO NOTHING. Retourne les compteurs réellement créés.
+        """
+        conn = await self.session.connection()
+        # La table temporaire ouvre la transaction ; elle disparaît au commit
+        await conn.execute(text(
+            f"CREATE TEMP TABLE {IMPORT_TEMP_TABLE} "
+            f"(LIKE {Meter.__tablename__} INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            IMPORT_TEMP_TABLE, records=records, columns=IMPORT_COLUMNS
+        )
+
+        temp = table(IMPORT_TEMP_TABLE, *[column(c) for c in IMPORT_COLUMNS])
+        stmt = (
+            pg_insert(Meter.__table__)
+            .from_select(IMPORT_COLUMNS, select(*temp.c))
+            .on_conflict_do_nothing()
+            .returning(*Meter.__table__.c)
+        )
+        result = await self.session.scalars(select(Meter).from_statement(stmt))
+        return list(result)
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, and_
+from sqlalchemy import select, update, insert, and_, or_, func
 from datetime import datetime, timedelta
 from app.models.outbox import Outbox
 import logging
@@ -8,6 +8,9 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# Au-delà, un lot réclamé par un worker disparu redevient disponible
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=10)
+
 
 class OutboxService:
 	def __init__(self, session: AsyncSession):
@@ -22,8 +25,11 @@ class OutboxService:
 			max_retries: int = 5
 	) -> Outbox:
 		"""Add an item to the outbox for processing"""
-		async with self.session as db:
-			outbox_item = Outbox(
+		db = self.session
+		# INSERT ... RETURNING: server defaults come back with the insert, no refresh
+		outbox_item = await db.scalar(
+			insert(Outbox)
+			.values(
 				entity_type=entity_type,
 				entity_id=entity_id,
 				operation=operation,
@@ -31,12 +37,12 @@ class OutboxService:
 				max_retries=max_retries,
 				status="pending"
 			)
-			db.add(outbox_item)
-			await db.commit()
-			await db.refresh(outbox_item)
+			.returning(Outbox)
+		)
+		await db.commit()
 
-			logger.info(f"Added to outbox: {entity_type}/{entity_id} - {operation}")
-			return outbox_item
+		logger.info(f"Added to outbox: {entity_type}/{entity_id} - {operation}")
+		return outbox_item
 
 	async def get_pending_items(
 			self,
@@ -44,36 +50,71 @@ class OutboxService:
 			entity_type: Optional[str] = None
 	) -> List[Outbox]:
 		"""Get pending items from outbox"""
-		async with self.session as db:
-			query = select(Outbox).where(
-				and_(
-					Outbox.status == "pending",
-					Outbox.retry_count < Outbox.max_retries,
-					Outbox.scheduled_at <= datetime.utcnow()
-				)
+		db = self.session
+		query = select(Outbox).where(
+			and_(
+				Outbox.status == "pending",
+				Outbox.retry_count < Outbox.max_retries,
+				Outbox.scheduled_at <= datetime.utcnow()
 			)
+		)
 
-			if entity_type:
-				query = query.where(Outbox.entity_type == entity_type)
+		if entity_type:
+			query = query.where(Outbox.entity_type == entity_type)
 
-			query = query.order_by(Outbox.scheduled_at).limit(limit)
+		query = query.order_by(Outbox.scheduled_at).limit(limit)
 
-			result = await db.execute(query)
-			return result.scalars().all()
+		result = await db.execute(query)
+		return result.scalars().all()
+
+	async def claim_pending_items(
+			self,
+			limit: int = 100,
+			entity_type: Optional[str] = None
+	) -> List[Outbox]:
+		"""Atomically claim a batch of due items for this worker (status -> processing)"""
+		db = self.session
+		due = or_(
+			and_(
+				Outbox.status == "pending",
+				Outbox.retry_count < Outbox.max_retries,
+				Outbox.scheduled_at <= func.now()
+			),
+			and_(
+				Outbox.status == "processing",
+				Outbox.updated_at < func.now() - OUTBOX_CLAIM_TIMEOUT
+			)
+		)
+		candidates = select(Outbox.id).where(due)
+		if entity_type:
+			candidates = candidates.where(Outbox.entity_type == entity_type)
+
+		# SKIP LOCKED : les workers concurrents se partagent les lignes au lieu de s'attendre
+		candidates = candidates.order_by(Outbox.scheduled_at).limit(limit).with_for_update(skip_locked=True)
+		result = await db.scalars(
+			update(Outbox)
+			.where(Outbox.id.in_(candidates.scalar_subquery()))
+			.values(status="processing")
+			.returning(Outbox)
+			.execution_options(synchronize_session=False)
+		)
+		items = result.all()
+		await db.commit()
+		return items
 
 	async def mark_as_processed(self, outbox_id: str):
 		"""Mark an outbox item as processed"""
-		async with self.session as db:
-			await db.execute(
-				update(Outbox)
-				.where(Outbox.id == outbox_id)
-				.values(
-					status="processed",
-					processed_at=datetime.utcnow()
-				)
+		db = self.session
+		await db.execute(
+			update(Outbox)
+			.where(Outbox.id == outbox_id)
+			.values(
+				status="processed",
+				processed_at=datetime.utcnow()
 			)
-			await db.commit()
-			logger.info(f"Outbox item {outbox_id} marked as processed")
+		)
+		await db.commit()
+		logger.info(f"Outbox item {outbox_id} marked as processed")
 
 	async def mark_as_failed(
 			self,
@@ -82,50 +123,51 @@ class OutboxService:
 			retry_delay_minutes: int = None
 	):
 		"""Mark an outbox item as failed and schedule retry"""
-		async with self.session as db:
-			result = await db.execute(
-				select(Outbox).where(Outbox.id == outbox_id)
-			)
-			outbox_item = result.scalar_one_or_none()
+		db = self.session
+		result = await db.execute(
+			select(Outbox).where(Outbox.id == outbox_id)
+		)
+		outbox_item = result.scalar_one_or_none()
 
-			if not outbox_item:
-				return
+		if not outbox_item:
+			return
 
-			outbox_item.retry_count += 1
-			outbox_item.error_message = error_message
+		outbox_item.retry_count += 1
+		outbox_item.error_message = error_message
 
-			if outbox_item.retry_count >= outbox_item.max_retries:
-				outbox_item.status = "failed"
-				logger.error(f"Outbox item {outbox_id} permanently failed after {outbox_item.retry_count} retries")
-			else:
-				# Exponential backoff
-				if retry_delay_minutes is None:
-					retry_delay_minutes = min(2 ** outbox_item.retry_count, 60)
+		if outbox_item.retry_count >= outbox_item.max_retries:
+			outbox_item.status = "failed"
+			logger.error(f"Outbox item {outbox_id} permanently failed after {outbox_item.retry_count} retries")
+		else:
+			# Exponential backoff
+			if retry_delay_minutes is None:
+				retry_delay_minutes = min(2 ** outbox_item.retry_count, 60)
 
-				outbox_item.scheduled_at = datetime.utcnow() + timedelta(minutes=retry_delay_minutes)
-				logger.info(f"Outbox item {outbox_id} scheduled for retry #{outbox_item.retry_count} at {outbox_item.scheduled_at}")
+			outbox_item.status = "pending"
+			outbox_item.scheduled_at = datetime.utcnow() + timedelta(minutes=retry_delay_minutes)
+			logger.info(f"Outbox item {outbox_id} scheduled for retry #{outbox_item.retry_count} at {outbox_item.scheduled_at}")
 
-			await db.commit()
+		await db.commit()
 
 	async def cleanup_old_items(self, days: int = 30):
 		"""Clean up old processed items"""
 		cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-		async with self.session as db:
-			result = await db.execute(
-				select(Outbox).where(
-					and_(
-						Outbox.status.in_(["processed", "failed"]),
-						Outbox.created_at < cutoff_date
-					)
+		db = self.session
+		result = await db.execute(
+			select(Outbox).where(
+				and_(
+					Outbox.status.in_(["processed", "failed"]),
+					Outbox.created_at < cutoff_date
 				)
 			)
+		)
 
-			items_to_delete = result.scalars().all()
-			for item in items_to_delete:
-				await db.delete(item)
+		items_to_delete = result.scalars().all()
+		for item in items_to_delete:
+			await db.delete(item)
 
-			await db.commit()
+		await db.commit()
 
-			if items_to_delete:
-				logger.info(f"Cleaned up {len(items_to_delete)} old outbox items")
+		if items_to_delete:
+			logger.info(f"Cleaned up {len(items_to_delete)} old outbox items")
@@ -1,7 +1,7 @@
 from typing import List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.reading import Reading
 from app.models.meter import Meter
 from app.schemas.reading import ReadingCreate
@@ -20,77 +20,113 @@ class ReadingService:
 			user_id: str,
 			device_id: str
 	) -> Dict[str, Any]:
-		"""Sync multiple readings from mobile device"""
+		"""Sync multiple readings from mobile device (bulk: a fixed number of round-trips per batch)"""
 		synced = 0
 		failed = 0
 		conflicts = []
 
-		async with self.session as db:
-			for reading_data in readings:
-				try:
-					# Check for existing reading with same client_id
-					if reading_data.client_id:
-						existing = await db.execute(
-							select(Reading).where(Reading.client_id == reading_data.client_id)
-						)
-						existing_reading = existing.scalar_one_or_none()
-
-						if existing_reading:
-							# Conflict resolution: Last-write-wins
-							if reading_data.reading_date > existing_reading.reading_date:
-								# Update existing reading
-								for field, value in reading_data.model_dump().items():
-									if field != 'client_id':
-										setattr(existing_reading, field, value)
-								existing_reading.sync_status = "synced"
-								synced += 1
-							else:
-								conflicts.append({
-									"client_id": reading_data.client_id,
-									"reason": "Newer reading exists on server"
-								})
-								failed += 1
-							continue
-
-					# Verify meter exists
-					meter_result = await db.execute(
-						select(Meter).where(Meter.id == reading_data.meter_id)
-					)
-					meter = meter_result.scalar_one_or_none()
-
-					if not meter:
+		db = self.session
+
+		# Existing readings and meters of the batch, one query each
+		client_ids = {r.client_id for r in readings if r.client_id}
+		existing_by_client_id = {}
+		if client_ids:
+			result = await db.execute(select(Reading).where(Reading.client_id.in_(client_ids)))
+			existing_by_client_id = {r.client_id: r for r in result.scalars()}
+
+		meter_ids = {r.meter_id for r in readings}
+		result = await db.execute(
+			select(Meter.id, Meter.last_reading_date).where(Meter.id.in_(meter_ids))
+		)
+		last_date_by_meter = {row.id: row.last_reading_date for row in result}
+
+		new_rows = []
+		seen_client_ids = set()
+		meter_updates = {}
+		for reading_data in readings:
+			try:
+				if reading_data.client_id:
+					if reading_data.client_id in seen_client_ids:
 						conflicts.append({
-							"meter_id": str(reading_data.meter_id),
-							"reason": "Meter not found"
+							"client_id": reading_data.client_id,
+							"reason": "Duplicate client_id in batch"
 						})
 						failed += 1
 						continue
+					seen_client_ids.add(reading_data.client_id)
 
-					# Create new reading
-					reading = Reading(
-						**reading_data.model_dump(),
-						user_id=user_id,
-						device_id=device_id,
-						sync_status="synced"
-					)
-					db.add(reading)
-
-					# Update meter's last reading date
-					if reading.reading_date > (meter.last_reading_date or datetime.min):
-						meter.last_reading_date = reading.reading_date
-
-					synced += 1
+					existing_reading = existing_by_client_id.get(reading_data.client_id)
+					if existing_reading:
+						# Conflict resolution: Last-write-wins
+						if reading_data.reading_date > existing_reading.reading_date:
+							# Update existing reading
+							for field, value in reading_data.model_dump().items():
+								if field != 'client_id':
+									setattr(existing_reading, field, value)
+							existing_reading.sync_status = "synced"
+							synced += 1
+						else:
+							conflicts.append({
+								"client_id": reading_data.client_id,
+								"reason": "Newer reading exists on server"
+							})
+							failed += 1
+						continue
 
-				except Exception as e:
-					logger.error(f"Sync error for reading: {str(e)}")
+				# Verify meter exists
+				if reading_data.meter_id not in last_date_by_meter:
 					conflicts.append({
-						"error": str(e),
-						"reading": reading_data.model_dump_json()
+						"meter_id": str(reading_data.meter_id),
+						"reason": "Meter not found"
 					})
 					failed += 1
+					continue
+
+				new_rows.append({
+					**reading_data.model_dump(),
+					"user_id": user_id,
+					"device_id": device_id,
+					"sync_status": "synced"
+				})
+
+				# Track meter's last reading date
+				last_date = meter_updates.get(reading_data.meter_id) or last_date_by_meter[reading_data.meter_id]
+				if last_date is None or reading_data.reading_date > last_date:
+					meter_updates[reading_data.meter_id] = reading_data.reading_date
+
+			except Exception as e:
+				logger.error(f"Sync error for reading: {str(e)}")
+				conflicts.append({
+					"error": str(e),
+					"reading": reading_data.model_dump_json()
+				})
+				failed += 1
+
+		if new_rows:
+			# Multi-row INSERT (insertmanyvalues); a concurrent sync of the same client_id is skipped
+			result = await db.execute(
+				pg_insert(Reading)
+				.on_conflict_do_nothing(index_elements=["client_id"])
+				.returning(Reading.client_id),
+				new_rows
+			)
+			inserted = len(result.all())
+			synced += inserted
+			if inserted < len(new_rows):
+				failed += len(new_rows) - inserted
+				conflicts.append({
+					"reason": f"{len(new_rows) - inserted} reading(s) already synced concurrently"
+				})
+
+		if meter_updates:
+			# Bulk UPDATE by primary key (executemany)
+			await db.execute(
+				update(Meter),
+				[{"id": meter_id, "last_reading_date": date} for meter_id, date in meter_updates.items()]
+			)
 
-			if synced > 0:
-				await db.commit()
+		if synced > 0:
+			await db.commit()
 
 		return {
 			"synced": synced,
@@ -1,23 +1,70 @@
+import functools
+import hashlib
+import hmac
 import mimetypes
 import os
-from typing import Dict, Any, Optional
+from contextlib import AsyncExitStack
+from typing import Dict, Any, Optional, Tuple
 
+import aioboto3
 import boto3
+from aiobotocore.config import AioConfig
+from cachetools import TTLCache
 from botocore.client import Config as BotoConfig
 from botocore.exceptions import ClientError
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, urlsplit
 
 from fastapi import HTTPException, status, UploadFile
 
 import uuid
 import logging
 
+from app.core.redis import get_redis
 from app.core.s3_config import S3Config
 from app.schemas.photo import PresignedUrlRequest, ConfirmUploadRequest
 
 logging.basicConfig(level="INFO")
 logger = logging.getLogger(__name__)
 
+# Dernière APK connue par (bucket, préfixe) : (version, url, changelog) ou None
+_latest_apk_cache: TTLCache = TTLCache(maxsize=2, ttl=300)
+
+# Durées de signature fixes (secondes) pour que les URLs de téléchargement soient partagées en cache
+PRESIGN_DOWNLOAD_BUCKETS = (3600, 21600, 86400, 604800)
+# Durée minimale de mise en cache Redis d'une URL signée
+PRESIGN_CACHE_MIN_TTL = 300
+
+# Options communes aux clients S3 synchrone (boto3) et asynchrone (aioboto3)
+_S3_CLIENT_OPTIONS = dict(
+    signature_version="s3v4",
+    request_checksum_calculation="when_required",
+    response_checksum_validation="when_required",
+    s3={
+        "addressing_style": "path",
+        "payload_signing_enabled": True,
+    },
+)
+
+# Limite de validité d'une URL signée SigV4 (7 jours)
+SIGV4_MAX_EXPIRES = 604800
+
+
+@functools.lru_cache(maxsize=4)
+def _sigv4_signing_key(secret_key: str, date_stamp: str, region: str) -> bytes:
+    """Clé de signature SigV4 S3 du jour (kSigning), recalculée une fois par date"""
+    k_date = hmac.new(f"AWS4{secret_key}".encode(), date_stamp.encode(), hashlib.sha256).digest()
+    k_region = hmac.new(k_date, region.encode(), hashlib.sha256).digest()
+    k_service = hmac.new(k_region, b"s3", hashlib.sha256).digest()
+    return hmac.new(k_service, b"aws4_request", hashlib.sha256).digest()
+
+# Pool HTTP du client asynchrone : connexions keep-alive réutilisées entre requêtes
+_S3_ASYNC_POOL_OPTIONS = dict(
+    max_pool_connections=100,
+    connector_args={"keepalive_timeout": 75},
+)
+
+
 class StorageService:
     """Service pour gérer les opérations S3"""
 
@@ -28,20 +75,45 @@ class StorageService:
             aws_access_key_id=S3Config.ACCESS_KEY_ID,
             aws_secret_access_key=S3Config.SECRET_ACCESS_KEY,
             region_name=S3Config.REGION,
-            config=BotoConfig(
-                signature_version="s3v4",
-                request_checksum_calculation="when_required",
-                response_checksum_validation="when_required",
-                s3={
-                    "addressing_style": "path",
-                    "payload_signing_enabled": True,
-                },
-            ),
+            config=BotoConfig(**_S3_CLIENT_OPTIONS),
         )
         self.bucket_name = S3Config.BUCKET_NAME
+        # Client aioboto3, ouvert/fermé par le lifespan de l'application
+        self._async_client = None
+        self._async_exit_stack: Optional[AsyncExitStack] = None
         self._ensure_bucket_exists()
         # self._configure_cors()
 
+    @property
+    def async_client(self):
+        """Client S3 asynchrone à utiliser depuis les endpoints async"""
+        if self._async_client is None:
+            raise RuntimeError("Client S3 asynchrone non initialisé (open_async_client)")
+        return self._async_client
+
+    async def open_async_client(self):
+        """Ouvrir le client S3 asynchrone (démarrage de l'application)"""
+        if self._async_client is not None:
+            return
+        self._async_exit_stack = AsyncExitStack()
+        self._async_client = await self._async_exit_stack.enter_async_context(
+            aioboto3.Session().client(
+                "s3",
+                endpoint_url=S3Config.ENDPOINT_URL,
+                aws_access_key_id=S3Config.ACCESS_KEY_ID,
+                aws_secret_access_key=S3Config.SECRET_ACCESS_KEY,
+                region_name=S3Config.REGION,
+                config=AioConfig(**_S3_CLIENT_OPTIONS, **_S3_ASYNC_POOL_OPTIONS),
+            )
+        )
+
+    async def close_async_client(self):
+        """Fermer le client S3 asynchrone (arrêt de l'application)"""
+        if self._async_exit_stack is not None:
+            await self._async_exit_stack.aclose()
+        self._async_client = None
+        self._async_exit_stack = None
+
     def _ensure_bucket_exists(self):
         """Créer le bucket s'il n'existe pas"""
         try:
@@ -184,10 +256,43 @@ class StorageService:
                 detail=f"Erreur lors de la génération de l'URL: {str(e)}"
             )
 
-    def verify_upload(self, file_key: str) -> Optional[dict]:
-        """Vérifier qu'un fichier a bien été uploadé"""
+    def generate_presigned_import_put(self, filename: str) -> dict:
+        """Générer une URL pré-signée PUT pour déposer un fichier d'import XLSX"""
         try:
-            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=file_key)
+            file_extension = os.path.splitext(filename)[1].lower()
+            timestamp = datetime.now().strftime('%Y/%m/%d')
+            file_key = f"imports/{timestamp}/{uuid.uuid4()}{file_extension}"
+            content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+            presigned_url = self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': file_key,
+                    'ContentType': content_type,
+                },
+                ExpiresIn=S3Config.PRESIGNED_URL_EXPIRATION
+            )
+
+            return {
+                "upload_url": presigned_url,
+                "upload_method": "PUT",
+                "upload_headers": {"Content-Type": content_type},
+                "file_key": file_key,
+                "expires_at": datetime.now() + timedelta(seconds=S3Config.PRESIGNED_URL_EXPIRATION),
+            }
+
+        except ClientError as e:
+            logger.error(f"Erreur génération URL pré-signée d'import: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erreur lors de la génération de l'URL: {str(e)}"
+            )
+
+    async def verify_upload(self, file_key: str) -> Optional[dict]:
+        """Vérifier qu'un fichier a bien été uploadé (HEAD via le client asynchrone partagé)"""
+        try:
+            response = await self.async_client.head_object(Bucket=self.bucket_name, Key=file_key)
             return {
                 "size": response['ContentLength'],
                 "content_type": response['ContentType'],
@@ -202,9 +307,9 @@ class StorageService:
             logger.error(f"Erreur vérification upload: {e}")
             raise
 
-    def confirm_upload(self, request: ConfirmUploadRequest) -> dict:
+    async def confirm_upload(self, request: ConfirmUploadRequest) -> dict:
         """Confirmer qu'un upload a réussi et enregistrer les métadonnées"""
-        file_info = self.verify_upload(request.file_key)
+        file_info = await self.verify_upload(request.file_key)
         if not file_info:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fichier non trouvé sur S3")
 
@@ -297,6 +402,8 @@ class StorageService:
                 ContentType=content_type,
                 Metadata=metadata,
             )
+            # La nouvelle APK doit être visible immédiatement par /app/version et /check-update
+            _latest_apk_cache.clear()
 
             public_url = f"{S3Config.ENDPOINT_URL}/{self.bucket_name}/{key}"
 
@@ -319,17 +426,59 @@ class StorageService:
             logger.error(f"Erreur inattendue lors de l'upload de l'APK: {e}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur inattendue: {str(e)}")
 
-    def delete_image(self, file_key: str) -> bool:
+    async def delete_image(self, file_key: str) -> bool:
         """Supprimer une image"""
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=file_key)
+            await self.async_client.delete_object(Bucket=self.bucket_name, Key=file_key)
             return True
         except ClientError as e:
             logger.error(f"Erreur lors de la suppression: {e}")
             return False
 
+    def fast_presign(self, file_key: str, expires_in: int = 3600) -> Optional[str]:
+        """
+        URL GET pré-signée (SigV4, style chemin) construite sans passer par le signataire boto3 :
+        seule la dernière HMAC est calculée à chaque appel. Retourne None si le cas n'est pas
+        couvert (identifiants ou endpoint inhabituels) ; l'appelant repasse alors par boto3.
+        """
+        if not (S3Config.ACCESS_KEY_ID and S3Config.SECRET_ACCESS_KEY and S3Config.REGION):
+            return None
+        if not 1 <= expires_in <= SIGV4_MAX_EXPIRES:
+            return None
+        endpoint = urlsplit(S3Config.ENDPOINT_URL or "")
+        if endpoint.scheme not in ("http", "https") or not endpoint.netloc or endpoint.path.strip("/"):
+            return None
+        # En-tête Host signé sans le port par défaut, comme botocore
+        host = endpoint.netloc
+        if (endpoint.scheme, endpoint.port) in (("https", 443), ("http", 80)):
+            host = host.rsplit(":", 1)[0]
+
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = amz_date[:8]
+        scope = f"{date_stamp}/{S3Config.REGION}/s3/aws4_request"
+        path = f"/{self.bucket_name}/{quote(file_key, safe='/~')}"
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(f'{S3Config.ACCESS_KEY_ID}/{scope}', safe='-_.~')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={expires_in}"
+            "&X-Amz-SignedHeaders=host"
+        )
+        canonical_request = f"GET\n{path}\n{query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+            f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
+        )
+        signing_key = _sigv4_signing_key(S3Config.SECRET_ACCESS_KEY, date_stamp, S3Config.REGION)
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{endpoint.scheme}://{endpoint.netloc}{path}?{query}&X-Amz-Signature={signature}"
+
     def generate_presigned_download_url(self, file_key: str, expires_in: int = 3600) -> str:
         """Générer une URL pré-signée pour télécharger un fichier privé"""
+        url = self.fast_presign(file_key, expires_in)
+        if url:
+            return url
         try:
             url = self.s3_client.generate_presigned_url(
                 'get_object',
@@ -341,6 +490,36 @@ class StorageService:
             logger.error(f"Erreur génération URL téléchargement: {e}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+    async def get_presigned_download_url_cached(self, file_key: str, expires_in: int = 3600) -> str:
+        """
+        URL de téléchargement mise en cache dans Redis.
+        L'URL est signée pour une durée fixe (bucket) et la clé Redis expire avant que
+        la validité restante ne descende sous expires_in.
+        """
+        bucket = next(
+            (b for b in PRESIGN_DOWNLOAD_BUCKETS if b - expires_in >= PRESIGN_CACHE_MIN_TTL),
+            None
+        )
+        if bucket is None:
+            return self.generate_presigned_download_url(file_key, expires_in)
+
+        cache_key = f"s3:presign:{hashlib.sha1(file_key.encode()).hexdigest()}:{bucket}"
+        try:
+            redis_client = await get_redis()
+            url = await redis_client.get(cache_key)
+            if url:
+                return url
+        except Exception as e:
+            logger.warning(f"Cache Redis indisponible pour les URLs signées: {e}")
+            return self.generate_presigned_download_url(file_key, expires_in)
+
+        url = self.generate_presigned_download_url(file_key, bucket)
+        try:
+            await redis_client.setex(cache_key, bucket - expires_in, url)
+        except Exception as e:
+            logger.warning(f"Écriture du cache d'URL signée impossible: {e}")
+        return url
+
     def get_latest_apk(self) -> Optional[dict]:
         """Récupérer la dernière APK uploadée (par date)"""
         try:
@@ -375,6 +554,37 @@ class StorageService:
             logger.error(f"Erreur récupération APK: {e}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erreur lors de la récupération de l'APK")
 
+    async def _get_latest_apk(self, prefix: str) -> Optional[Tuple[Optional[str], str, Optional[str]]]:
+        """Trouver l'APK la plus récente sous un préfixe"""
+        response = await self.async_client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
+        contents = response.get("Contents")
+        if not contents:
+            return None
+
+        key = max(contents, key=lambda x: x["LastModified"])["Key"]
+        head = await self.async_client.head_object(Bucket=self.bucket_name, Key=key)
+        metadata = head.get("Metadata", {})
+
+        # Version depuis les métadonnées, sinon depuis le nom (ex: apk/mon_app_v1.2.0.apk)
+        version = metadata.get("version")
+        if not version and "_v" in key:
+            version = key.split("_v")[-1].replace(".apk", "")
+
+        url = f"{S3Config.ENDPOINT_URL}/{self.bucket_name}/{key}"
+        return version, url, metadata.get("changelog")
+
+    async def get_latest_apk_cached(self, prefix: str = "apks/") -> Optional[Tuple[Optional[str], str, Optional[str]]]:
+        """Dernière APK (version, url, changelog), mise en cache pendant 5 minutes"""
+        cache_key = (self.bucket_name, prefix)
+        try:
+            return _latest_apk_cache[cache_key]
+        except KeyError:
+            pass
+
+        latest = await self._get_latest_apk(prefix)
+        _latest_apk_cache[cache_key] = latest
+        return latest
+
 
 # Initialiser le service S3
 storage_service = StorageService()
\ No newline at end of file
@@ -2,6 +2,8 @@
 import io
 import math
 import logging
+import tempfile
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 
@@ -13,8 +15,10 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from app.core.celery_app import celery_app
-from app.database import SessionLocalSync
+from app.database import sync_session
 from app.models.meter import Meter
+from app.services.storage_service import storage_service
+from app.workers.tasks.base import CallbackTask
 
 logger = logging.getLogger(__name__)
 
@@ -58,10 +62,45 @@ def _to_dt_tz(x):
         dt = dt.replace(tzinfo=timezone.utc)
     return dt
 
+# Le fichier téléchargé reste en mémoire jusqu'à 16 Mo, puis bascule sur disque
+IMPORT_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+@contextmanager
+def _open_workbook(s3_key: Optional[str], file_bytes: Optional[bytes]):
+    """
+    Ouvre le classeur en lecture seule depuis S3 (ou depuis des bytes pour les tâches déjà en file).
+    Le classeur et le fichier temporaire sont fermés à la sortie, même en cas d'erreur.
+    """
+    if s3_key:
+        source = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_SIZE)
+    elif file_bytes is not None:
+        source = io.BytesIO(file_bytes)
+    else:
+        raise ValueError("s3_key ou file_bytes requis")
+    with source:
+        if s3_key:
+            storage_service.s3_client.download_fileobj(storage_service.bucket_name, s3_key, source)
+            source.seek(0)
+        wb = load_workbook(source, read_only=True, data_only=True)
+        try:
+            yield wb
+        finally:
+            wb.close()
+
+def _delete_import_object(s3_key: str) -> None:
+    """Le fichier déposé sous imports/ ne sert qu'à un import : supprimé une fois la tâche terminée"""
+    try:
+        storage_service.s3_client.delete_object(Bucket=storage_service.bucket_name, Key=s3_key)
+    except Exception:
+        logger.warning("Suppression de %s impossible", s3_key, exc_info=True)
+
 def _read_sheet_headers(sheet):
-    headers_row2 = [str(c.value).strip() if c.value else None for c in sheet[2]]
+    # En lecture seule, on lit les deux lignes d'en-tête en un seul passage
+    header_rows = list(sheet.iter_rows(min_row=1, max_row=2, values_only=True))
+    first_row, headers_row2 = (header_rows + [(), ()])[:2]
+    headers_row2 = [str(v).strip() if v else None for v in headers_row2]
     header_index = {h: i for i, h in enumerate(headers_row2) if h}
-    first_row = [str(c.value).strip() if c.value else None for c in sheet[1]]
+    first_row = [str(v).strip() if v else None for v in first_row]
     has_visit_date = "Дата обхода" in first_row
     visit_date_col_idx = 7 if has_visit_date and len(headers_row2) >= 8 else None
     missing = [c for c in REQUIRED if c not in header_index]
@@ -74,98 +113,110 @@ def _yield_rows(sheet):
         yield row_idx, row
 
 
-@celery_app.task(bind=True, name="tasks.import_meters", queue="default")
-def import_meters_task(self, *, file_bytes: bytes) -> Dict[str, Any]:
+@celery_app.task(bind=True, base=CallbackTask, name="tasks.import_meters", queue="default")
+def import_meters_task(self, *, s3_key: Optional[str] = None, file_bytes: Optional[bytes] = None) -> Dict[str, Any]:
     """
     Tâche d’import:
-      - parse XLSX depuis bytes
+      - parse XLSX (lecture seule) depuis la clé S3 déposée via URL pré-signée
       - upsert par lot (ON CONFLICT DO NOTHING sur meter_number ou meter_id_code)
-      - progression via self.update_state
+      - progression via self.update_state, résultat final publié aux WebSockets (CallbackTask)
     """
     try:
-        wb = load_workbook(io.BytesIO(file_bytes), data_only=True)
-        sheet = wb.active
-
-        header_index, visit_idx = _read_sheet_headers(sheet)
-
-        success = 0
-        failed = 0
-        errors: List[str] = []
-
-        # Compter total pour progression
-        total_rows = sheet.max_row - 2 if sheet.max_row > 2 else 0
-        processed = 0
-
-        BATCH = 500
-        buffer: List[dict] = []
-
-        def emit_progress():
-            pct = int((processed / max(total_rows, 1)) * 100)
-            self.update_state(
-                state="PROGRESS",
-                meta={
-                    "processed": processed,
-                    "total": total_rows,
-                    "percent": pct,
-                    "success": success,
-                    "failed": failed,
-                },
-            )
-
-        with SessionLocalSync() as db:  # sync session
-            for row_idx, row in _yield_rows(sheet):
-                try:
-                    def val(col_name):
-                        idx = header_index.get(col_name)
-                        return row[idx] if idx is not None and idx < len(row) else None
-
-                    meter_id_code = _to_str(val(RUS_COLS["id_code"]))
-                    meter_number  = _to_str(val(RUS_COLS["meter_number"]))
-                    meter_type    = _to_str(val(RUS_COLS["meter_type"]))
-
-                    if not meter_id_code:
-                        failed += 1
-                        errors.append(f"Ligne {row_idx}: champs requis manquants (id).")
-                        continue
-
-                    location_address = _to_str(val(RUS_COLS["address"]))
-                    client_name      = _to_str(val(RUS_COLS["client_name"]))
-                    prev_read        = _to_float(val(RUS_COLS["prev_reading"]))
-
-                    last_prev_dt = None
-                    if visit_idx is not None and visit_idx < len(row):
-                        last_prev_dt = _to_dt_tz(row[visit_idx])
-
-                    buffer.append({
-                        "meter_id_code": meter_id_code,
-                        "meter_number": meter_number,
-                        "type": meter_type,
-                        "location_address": location_address,
-                        "client_name": client_name,
-                        "prev_reading_value": prev_read,
-                        "last_reading_date": last_prev_dt,
-                        "status": "active",
-                        "meter_metadata": {},
-                    })
-
-                    if len(buffer) >= BATCH:
-                        _flush_batch(db, buffer)
-                        success += len(buffer)
-                        buffer.clear()
-
-                except Exception as e:
-                    failed += 1
-                    errors.append(f"Ligne {row_idx}: {e}")
-
-                finally:
-                    processed += 1
-                    if processed % 200 == 0:  # push progress de temps en temps
-                        emit_progress()
-
-            if buffer:
-                _flush_batch(db, buffer)
-                success += len(buffer)
+        with _open_workbook(s3_key, file_bytes) as wb:
+            sheet = wb.active
+
+            header_index, visit_idx = _read_sheet_headers(sheet)
+
+            success = 0
+            failed = 0
+            errors: List[str] = []
+
+            # Compter total pour progression
+            max_row = sheet.max_row or 0  # peut être inconnu en lecture seule
+            total_rows = max_row - 2 if max_row > 2 else 0
+            processed = 0
+
+            BATCH = 500
+            buffer: List[dict] = []
+            buffer_rows: List[int] = []
+
+            def flush(db):
+                nonlocal success, failed
+                inserted = _flush_batch(db, buffer)
+                success += inserted
+                # ON CONFLICT DO NOTHING : les lignes ignorées sont des échecs, pas des succès
+                skipped = len(buffer) - inserted
+                if skipped:
+                    failed += skipped
+                    errors.append(
+                        f"Lignes {buffer_rows[0]}-{buffer_rows[-1]}: {skipped} compteur(s) existe(nt) déjà."
+                    )
                 buffer.clear()
+                buffer_rows.clear()
+
+            def emit_progress():
+                pct = int((processed / max(total_rows, 1)) * 100)
+                self.update_state(
+                    state="PROGRESS",
+                    meta={
+                        "processed": processed,
+                        "total": total_rows,
+                        "percent": pct,
+                        "success": success,
+                        "failed": failed,
+                    },
+                )
+
+            with sync_session() as db:  # sync session
+                for row_idx, row in _yield_rows(sheet):
+                    try:
+                        def val(col_name):
+                            idx = header_index.get(col_name)
+                            return row[idx] if idx is not None and idx < len(row) else None
+
+                        meter_id_code = _to_str(val(RUS_COLS["id_code"]))
+                        meter_number  = _to_str(val(RUS_COLS["meter_number"]))
+                        meter_type    = _to_str(val(RUS_COLS["meter_type"]))
+
+                        if not meter_id_code:
+                            failed += 1
+                            errors.append(f"Ligne {row_idx}: champs requis manquants (id).")
+                            continue
+
+                        location_address = _to_str(val(RUS_COLS["address"]))
+                        client_name      = _to_str(val(RUS_COLS["client_name"]))
+                        prev_read        = _to_float(val(RUS_COLS["prev_reading"]))
+
+                        last_prev_dt = None
+                        if visit_idx is not None and visit_idx < len(row):
+                            last_prev_dt = _to_dt_tz(row[visit_idx])
+
+                        buffer.append({
+                            "meter_id_code": meter_id_code,
+                            "meter_number": meter_number,
+                            "type": meter_type,
+                            "location_address": location_address,
+                            "client_name": client_name,
+                            "prev_reading_value": prev_read,
+                            "last_reading_date": last_prev_dt,
+                            "status": "active",
+                        })
+                        buffer_rows.append(row_idx)
+
+                        if len(buffer) >= BATCH:
+                            flush(db)
+
+                    except Exception as e:
+                        failed += 1
+                        errors.append(f"Ligne {row_idx}: {e}")
+
+                    finally:
+                        processed += 1
+                        if processed % 200 == 0:  # push progress de temps en temps
+                            emit_progress()
+
+                if buffer:
+                    flush(db)
 
         self.update_state(
             state=states.SUCCESS,
@@ -178,18 +229,25 @@ def import_meters_task(self, *, file_bytes: bytes) -> Dict[str, Any]:
         self.update_state(state=states.FAILURE, meta={"exc": str(e)})
         raise
 
-def _flush_batch(db: Session, rows: List[dict]):
+    finally:
+        # État terminal (succès ou échec, pas de nouvelle tentative) : l'objet déposé n'est plus utile
+        if s3_key:
+            _delete_import_object(s3_key)
+
+def _flush_batch(db: Session, rows: List[dict]) -> int:
     """
-    Insertion en lot avec UPSERT idempotent.
-    On déduplique par (meter_number) OU (meter_id_code).
-    NB: ajuster les index/contrainte unique côté DB pour garantir l’unicité.
+    Insertion en lot avec UPSERT idempotent ; retourne le nombre de lignes réellement insérées.
+    On déduplique par (meter_number) OU (meter_id_code) : ON CONFLICT sans cible
+    couvre les deux contraintes uniques, un doublon n'invalide pas le lot.
     """
     if not rows:
-        return
+        return 0
     stmt = (
         pg_insert(Meter.__table__)
         .values(rows)
-        .on_conflict_do_nothing(index_elements=["meter_number"])
+        .on_conflict_do_nothing()
+        .returning(Meter.__table__.c.id)
     )
-    db.execute(stmt)
+    inserted = len(db.execute(stmt).all())
     db.commit()
+    return inserted
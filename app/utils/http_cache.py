@@ -0,0 +1,34 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+# Les clients mobiles interrogent souvent ces endpoints : 60 s de cache côté client
+VERSION_CACHE_CONTROL = "public, max-age=60"
+
+
+def make_etag(*parts: str) -> str:
+    """ETag fort (entre guillemets) dérivé des valeurs qui définissent la réponse"""
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match du client couvre cet ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str, cache_control: str = VERSION_CACHE_CONTROL) -> Response:
+    """Réponse 304 sans corps"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str = VERSION_CACHE_CONTROL) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
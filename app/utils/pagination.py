@@ -0,0 +1,52 @@
+import base64
+import hashlib
+import logging
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Durée de vie des totaux mis en cache (secondes)
+COUNT_CACHE_TTL = 30
+
+
+def encode_cursor(sort_value: datetime, row_id) -> str:
+    """Curseur opaque (keyset) : base64 de `valeur_de_tri|id` de la dernière ligne d'une page"""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse de encode_cursor ; 400 si le curseur est invalide"""
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def cached_count(db: AsyncSession, count_stmt, *key_parts) -> int:
+    """COUNT mis en cache dans Redis quelques secondes, par jeu de filtres"""
+    digest = hashlib.sha1(repr(key_parts).encode()).hexdigest()
+    cache_key = f"count:{digest}"
+    try:
+        redis_client = await get_redis()
+        cached = await redis_client.get(cache_key)
+        if cached is not None:
+            return int(cached)
+    except Exception as e:
+        logger.warning(f"Cache Redis indisponible pour les totaux: {e}")
+        return await db.scalar(count_stmt)
+
+    total = await db.scalar(count_stmt)
+    try:
+        await redis_client.setex(cache_key, COUNT_CACHE_TTL, total)
+    except Exception as e:
+        logger.warning(f"Écriture du total en cache impossible: {e}")
+    return total
@@ -1,7 +1,7 @@
 # app/services/meter_import.py
 from __future__ import annotations
-import base64, io, logging
-from typing import Dict, Any, List, Optional
+import logging
+from typing import Dict, Any, List, Optional, BinaryIO
 from datetime import datetime, timezone
 
 from sqlalchemy.orm import Session
@@ -11,7 +11,7 @@ from sqlalchemy.dialects.postgresql import insert
 
 from openpyxl import load_workbook
 
-from app.database import SessionLocalSync
+from app.database import sync_session
 from app.models.meter import Meter
 from app.models.task import TaskResult, TaskStatus
 
@@ -20,7 +20,7 @@ logger = logging.getLogger(__name__)
 
 def import_meters_from_file(
     *,
-    file_content_b64: str,
+    file_obj: BinaryIO,
     file_name: str,
     user_id: str,
     file_type: str = "xlsx",
@@ -58,7 +58,7 @@ def import_meters_from_file(
             db.rollback()
 
     tid = task_id or f"manual-{datetime.utcnow().timestamp()}"
-    db = SessionLocalSync()
+    db = sync_session()
     try:
         # Assurer un enregistrement TaskResult (si non existant)
         tr = db.execute(select(TaskResult).where(TaskResult.id == tid)).scalar_one_or_none()
@@ -76,8 +76,7 @@ def import_meters_from_file(
             db.commit()
 
         # === Lecture fichier ===
-        raw = base64.b64decode(file_content_b64)
-        wb = load_workbook(io.BytesIO(raw), data_only=True)
+        wb = load_workbook(file_obj, read_only=True, data_only=True)
         sheet = wb.active
 
         # Colonnes attendues
@@ -91,13 +90,14 @@ def import_meters_from_file(
         # Désormais seule id_code est obligatoire
         REQUIRED = [RUS_COLS["id_code"]]
 
-        headers_row2 = [str(c.value).strip() if c.value else None for c in sheet[2]]
+        header_rows = list(sheet.iter_rows(min_row=1, max_row=2, values_only=True))
+        headers_row2 = [str(v).strip() if v else None for v in (header_rows + [(), ()])[1]]
         header_index = {h: i for i, h in enumerate(headers_row2) if h}
         missing = [c for c in REQUIRED if c not in header_index]
         if missing:
             raise ValueError(f"Colonnes manquantes: {missing}. Colonnes détectées: {headers_row2}")
 
-        total_rows = max(0, sheet.max_row - 2)
+        total_rows = max(0, (sheet.max_row or 0) - 2)  # max_row peut être inconnu en lecture seule
         safe_progress(db, tid, 0, total_rows, 0, 0)
 
         success = failed = processed = 0
@@ -113,24 +113,34 @@ def import_meters_from_file(
             return row[idx] if idx is not None and idx < len(row) else None
 
         def flush():
-            """Insert bulk avec ON CONFLICT DO NOTHING."""
+            """Insert bulk avec ON CONFLICT DO NOTHING RETURNING : les lignes non retournées existent déjà."""
             nonlocal buffer, success, failed
             if not buffer:
                 return
+            table = Meter.__table__
             try:
-                stmt = insert(Meter.__table__).values(buffer)
-                stmt = stmt.on_conflict_do_nothing(index_elements=["meter_number"])
-                db.execute(stmt)
+                stmt = insert(table).values(buffer).on_conflict_do_nothing().returning(table.c.meter_id_code)
+                inserted = set(db.execute(stmt).scalars())
                 db.commit()
+                success += len(inserted)
+                for row in buffer:
+                    if row["meter_id_code"] not in inserted:
+                        failed += 1
+                        errors.append({"row": None, "meter_number": row.get("meter_number"), "error": "Already exists"})
             except IntegrityError as e:
                 logger.warning("Erreur intégrité, fallback unitaire: %s", e)
                 db.rollback()
                 for row in buffer:
                     try:
-                        db.execute(
-                            insert(Meter.__table__).values(row).on_conflict_do_nothing(index_elements=["meter_number"])
-                        )
+                        inserted = db.execute(
+                            insert(table).values(row).on_conflict_do_nothing().returning(table.c.id)
+                        ).first()
                         db.commit()
+                        if inserted:
+                            success += 1
+                        else:
+                            failed += 1
+                            errors.append({"row": None, "meter_number": row.get("meter_number"), "error": "Already exists"})
                     except Exception as ex:
                         db.rollback()
                         errors.append({"row": None, "meter_number": row.get("meter_number"), "error": str(ex)})
@@ -166,9 +176,7 @@ def import_meters_from_file(
                     "location_address": str(get_val(row, RUS_COLS["address"]) or "").strip(),
                     "client_name": str(get_val(row, RUS_COLS["client_name"]) or "").strip(),
                     "status": "active",
-                    "meter_metadata": {},
                 })
-                success += 1
 
                 if len(buffer) >= BATCH:
                     flush()
@@ -181,6 +189,7 @@ def import_meters_from_file(
                 safe_progress(db, tid, processed, total_rows, success, failed)
 
         flush()
+        wb.close()
         safe_progress(db, tid, processed, total_rows, success, failed)
 
         result = {"file": file_name, "success": success, "failed": failed, "total": total_rows, "errors": errors[:200]}
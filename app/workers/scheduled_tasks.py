@@ -4,7 +4,7 @@ import uuid
 from typing import Dict, Any
 
 from celery.schedules import crontab
-from sqlalchemy import select, func
+from sqlalchemy import select, func, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.celery_app import celery_app
@@ -14,6 +14,7 @@ from app.models.task import TaskResult, TaskStatus
 from app.models.meter import Meter
 from app.models.reading import Reading
 from app.models.photo import Photo
+from app.services.outbox_service import OutboxService
 from datetime import datetime, timedelta
 import logging
 
@@ -52,17 +53,8 @@ async def _process_outbox_async():
 	failed = 0
 
 	async with AsyncSessionLocal() as db:
-		# Get pending items
-		result = await db.execute(
-			select(Outbox)
-			.where(
-				Outbox.status == "pending",
-				Outbox.retry_count < Outbox.max_retries,
-				Outbox.scheduled_at <= datetime.utcnow()
-			)
-			.limit(100)
-		)
-		items = result.scalars().all()
+		# Claim pending items (FOR UPDATE SKIP LOCKED, status -> processing)
+		items = await OutboxService(db).claim_pending_items(limit=100)
 
 		for item in items:
 			try:
@@ -85,6 +77,7 @@ async def _process_outbox_async():
 					item.status = "failed"
 				else:
 					# Exponential backoff
+					item.status = "pending"
 					item.scheduled_at = datetime.utcnow() + timedelta(
 						minutes=2 ** item.retry_count
 					)
@@ -117,13 +110,13 @@ async def _sync_reading(item: Outbox, db: AsyncSession):
 			raise ValueError(f"Meter with ID {payload['meter_id']} not found")
 
 		# Check for duplicate readings
-		existing_reading = await db.execute(
-			select(Reading).where(
+		reading_exists = await db.scalar(
+			select(exists().where(
 				Reading.meter_id == payload["meter_id"],
 				Reading.reading_date == payload["reading_date"]
-			)
+			))
 		)
-		if existing_reading.scalar_one_or_none():
+		if reading_exists:
 			logger.warning(f"Reading already exists for meter {payload['meter_id']} on {payload['reading_date']}")
 			return
 
@@ -134,9 +127,7 @@ async def _sync_reading(item: Outbox, db: AsyncSession):
 			"value": float(payload["value"]),
 			"reading_date": datetime.fromisoformat(payload["reading_date"]).date()
 			if isinstance(payload["reading_date"], str)
-			else payload["reading_date"],
-			"created_at": datetime.utcnow(),
-			"updated_at": datetime.utcnow()
+			else payload["reading_date"]
 		}
 
 		# Add optional fields
@@ -170,29 +161,24 @@ async def _sync_photo(item: Outbox, db: AsyncSession):
 
 		# Validate entity exists based on type
 		if payload["entity_type"] == "reading":
-			entity_result = await db.execute(
-				select(Reading).where(Reading.id == payload["entity_id"])
-			)
+			entity_exists = exists().where(Reading.id == payload["entity_id"])
 		elif payload["entity_type"] == "meter":
-			entity_result = await db.execute(
-				select(Meter).where(Meter.id == payload["entity_id"])
-			)
+			entity_exists = exists().where(Meter.id == payload["entity_id"])
 		else:
 			raise ValueError(f"Unsupported entity type: {payload['entity_type']}")
 
-		entity = entity_result.scalar_one_or_none()
-		if not entity:
+		if not await db.scalar(select(entity_exists)):
 			raise ValueError(f"Entity {payload['entity_type']} with ID {payload['entity_id']} not found")
 
 		# Check for duplicate photos
-		existing_photo = await db.execute(
-			select(Photo).where(
+		photo_exists = await db.scalar(
+			select(exists().where(
 				Photo.entity_type == payload["entity_type"],
 				Photo.entity_id == payload["entity_id"],
 				Photo.file_path == payload["file_path"]
-			)
+			))
 		)
-		if existing_photo.scalar_one_or_none():
+		if photo_exists:
 			logger.warning(f"Photo already exists for {payload['entity_type']} {payload['entity_id']}")
 			return
 
@@ -201,9 +187,7 @@ async def _sync_photo(item: Outbox, db: AsyncSession):
 			"id": payload.get("id", str(uuid.uuid4())),
 			"file_path": payload["file_path"],
 			"entity_type": payload["entity_type"],
-			"entity_id": payload["entity_id"],
-			"created_at": datetime.utcnow(),
-			"updated_at": datetime.utcnow()
+			"entity_id": payload["entity_id"]
 		}
 
 		# Add optional fields
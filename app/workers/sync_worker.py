@@ -1,6 +1,6 @@
 import asyncio
 from datetime import datetime
-from app.database import get_session
+from app.database import AsyncSessionLocal
 from app.services.outbox_service import OutboxService
 import logging
 
@@ -34,11 +34,11 @@ class SyncWorker:
 
 	async def process_outbox(self):
 		"""Process pending outbox items"""
-		async with get_session() as session:
+		async with AsyncSessionLocal() as session:
 			outbox_service = OutboxService(session)
 
-			# Get pending items
-			pending_items = await outbox_service.get_pending_items(limit=50)
+			# Claim pending items (other workers skip them)
+			pending_items = await outbox_service.claim_pending_items(limit=50)
 
 			if not pending_items:
 				return
@@ -1,6 +1,10 @@
 from celery import Task
-from app.api.v1.websocket import manager
-import asyncio
+import json
+import logging
+
+from app.core.redis import publish_sync, WS_TASK_CHANNEL
+
+logger = logging.getLogger(__name__)
 
 
 class CallbackTask(Task):
@@ -8,7 +12,7 @@ class CallbackTask(Task):
 
 	def on_success(self, retval, task_id, args, kwargs):
 		"""Called on successful task completion"""
-		asyncio.create_task(self.send_update(
+		self.send_update(
 			task_id,
 			{
 				"type": "task_update",
@@ -16,11 +20,11 @@ class CallbackTask(Task):
 				"status": "SUCCESS",
 				"result": retval
 			}
-		))
+		)
 
 	def on_failure(self, exc, task_id, args, kwargs, einfo):
 		"""Called on task failure"""
-		asyncio.create_task(self.send_update(
+		self.send_update(
 			task_id,
 			{
 				"type": "task_update",
@@ -28,12 +32,11 @@ class CallbackTask(Task):
 				"status": "FAILURE",
 				"error": str(exc)
 			}
-		))
+		)
 
-	async def send_update(self, task_id: str, message: dict):
-		"""Send update to subscribed users"""
-		if task_id in manager.task_subscriptions:
-			await manager.broadcast_to_users(
-				message,
-				manager.task_subscriptions[task_id]
-			)
+	def send_update(self, task_id: str, message: dict):
+		"""Publish once on the task channel; API workers relay to subscribed sockets"""
+		try:
+			publish_sync(WS_TASK_CHANNEL.format(task_id), json.dumps(message, default=str))
+		except Exception as e:
+			logger.warning(f"Task update publish failed for {task_id}: {e}")
@@ -12,7 +12,7 @@ from sqlalchemy.dialects.postgresql import insert
 from openpyxl import load_workbook
 
 from app.core.celery_app import celery_app
-from app.database import SessionLocalSync
+from app.database import sync_session
 from app.models.meter import Meter
 from app.models.task import TaskResult, TaskStatus
 
@@ -85,7 +85,8 @@ def import_meters_from_file(
                 db.rollback()  # on abandonne la MAJ de progression si la DB est KO
 
     tid = task_id or self.request.id
-    db = SessionLocalSync()
+    db = sync_session()
+    wb = None
     try:
         # Assure un enregistrement TaskResult (si non créé côté API)
         tr = db.execute(select(TaskResult).where(TaskResult.id == tid)).scalar_one_or_none()
@@ -104,7 +105,8 @@ def import_meters_from_file(
 
         # ===== Décode le payload =====
         raw = base64.b64decode(file_content_b64)
-        wb = load_workbook(io.BytesIO(raw), data_only=True)
+        # Lecture seule : les lignes sont lues à la volée, sans graphe de cellules en mémoire
+        wb = load_workbook(io.BytesIO(raw), read_only=True, data_only=True)
         sheet = wb.active
 
         # Ligne 2 = en-têtes russes
@@ -119,13 +121,14 @@ def import_meters_from_file(
         }
         REQUIRED = [RUS_COLS["id_code"], RUS_COLS["meter_type"], RUS_COLS["meter_number"]]
 
-        headers_row2 = [str(c.value).strip() if c.value else None for c in sheet[2]]
+        header_row = next(sheet.iter_rows(min_row=2, max_row=2, values_only=True), ())
+        headers_row2 = [str(v).strip() if v else None for v in header_row]
         header_index = {h: i for i, h in enumerate(headers_row2) if h}
         missing = [c for c in REQUIRED if c not in header_index]
         if missing:
             raise ValueError(f"Colonnes manquantes: {missing}. Colonnes détectées (ligne 2): {headers_row2}")
 
-        total_rows = max(0, sheet.max_row - 2)
+        total_rows = max(0, (sheet.max_row or 0) - 2)  # peut être inconnu en lecture seule
         safe_progress(db, tid, 0, total_rows, 0, 0)
 
         success = failed = processed = 0
@@ -144,14 +147,14 @@ def import_meters_from_file(
             return row[idx] if idx is not None and idx < len(row) else None
 
         def flush():
-            """Insert bulk avec ON CONFLICT DO NOTHING sur meter_number."""
+            """Insert bulk avec ON CONFLICT DO NOTHING (meter_number ou meter_id_code)."""
             nonlocal buffer, success, failed
             if not buffer:
                 return
             try:
-                stmt = insert(Meter.__table__).values(buffer)
-                # 🔑 Si ta contrainte unique porte un autre nom/colonnes, adapte ici :
-                stmt = stmt.on_conflict_do_nothing(index_elements=["meter_number"])
+                # Sans cible : un doublon sur n'importe quelle contrainte unique est ignoré,
+                # le lot n'échoue pas (et ne repasse pas ligne par ligne) sur un meter_id_code existant
+                stmt = insert(Meter.__table__).values(buffer).on_conflict_do_nothing()
                 result = db.execute(stmt)  # result.rowcount peut être -1 selon le driver
                 db.commit()
             except IntegrityError as e:
@@ -161,7 +164,7 @@ def import_meters_from_file(
                 for row in buffer:
                     try:
                         db.execute(
-                            insert(Meter.__table__).values(row).on_conflict_do_nothing(index_elements=["meter_number"])
+                            insert(Meter.__table__).values(row).on_conflict_do_nothing()
                         )
                         db.commit()
                     except Exception as ex:
@@ -180,7 +183,7 @@ def import_meters_from_file(
                 for row in buffer:
                     try:
                         db.execute(
-                            insert(Meter.__table__).values(row).on_conflict_do_nothing(index_elements=["meter_number"])
+                            insert(Meter.__table__).values(row).on_conflict_do_nothing()
                         )
                         db.commit()
                     except Exception as ex:
@@ -235,7 +238,6 @@ def import_meters_from_file(
                     "prev_reading_value": None,  # adapter si tu veux parser "Предыдущие показания"
                     "last_reading_date": None,   # idem si tu as une date
                     "status": "active",
-                    "meter_metadata": {},
                 }
                 buffer.append(row_dict)
                 success += 1
@@ -310,6 +312,8 @@ def import_meters_from_file(
             db.rollback()
         raise
     finally:
+        if wb is not None:
+            wb.close()
         db.close()
 
 
@@ -4,7 +4,7 @@ from typing import AsyncGenerator
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from app.main import app
-from app.database import Base, get_session
+from app.database import Base, get_session, get_write_session, get_user_lookup_session
 from app.config import settings
 from app.auth.jwt import auth_service
 from app.models.user import User, UserRole
@@ -50,13 +50,20 @@ async def db_session(engine) -> AsyncGenerator[AsyncSession, None]:
 
 
 @pytest.fixture
-async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def client(engine, db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
 	"""Create a test client"""
 
 	def override_get_session():
 		return db_session
 
+	async def override_get_user_lookup_session():
+		# Session distincte : load_user la ferme juste après son SELECT
+		async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+			yield session
+
 	app.dependency_overrides[get_session] = override_get_session
+	app.dependency_overrides[get_write_session] = override_get_session
+	app.dependency_overrides[get_user_lookup_session] = override_get_user_lookup_session
 
 	async with AsyncClient(app=app, base_url="http://test") as client:
 		yield client
@@ -68,7 +75,7 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
 async def test_user(db_session: AsyncSession) -> User:
 	"""Create a test user"""
 	user = User(
-		email="test@example.com",
+		username="testuser",
 		hashed_password=auth_service.hash_password("testpass123"),
 		full_name="Test User",
 		role=UserRole.CONTROLLER,
@@ -84,7 +91,7 @@ async def test_user(db_session: AsyncSession) -> User:
 async def admin_user(db_session: AsyncSession) -> User:
 	"""Create a test admin user"""
 	user = User(
-		email="admin@example.com",
+		username="admin",
 		hashed_password=auth_service.hash_password("adminpass123"),
 		full_name="Admin User",
 		role=UserRole.ADMIN,
@@ -92,4 +92,14 @@ async def test_invalid_token(client: AsyncClient):
         "/api/v1/auth/me",
         headers={"Authorization": "Bearer invalid_token"}
     )
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token(client: AsyncClient, auth_token: str):
+    """Test that a token is rejected after logout"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = await client.post("/api/v1/auth/logout", headers=headers)
+    assert response.status_code == 200
+
+    response = await client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 401
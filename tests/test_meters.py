@@ -9,11 +9,10 @@ from app.models.user import User
 async def test_meter(db_session) -> Meter:
 	"""Create a test meter"""
 	meter = Meter(
+		meter_id_code="TEST-001",
 		meter_number="TEST-001",
 		type="electricity",
 		location_address="123 Test St",
-		latitude=48.8566,
-		longitude=2.3522,
 		client_name="Test Client",
 		status="active"
 	)
@@ -37,6 +36,34 @@ async def test_list_meters(client: AsyncClient, test_meter: Meter, auth_token: s
 	assert any(m["meter_number"] == test_meter.meter_number for m in data["data"])
 
 
+@pytest.mark.asyncio
+async def test_list_meters_cursor(client: AsyncClient, db_session, test_meter: Meter, auth_token: str):
+	"""Test keyset pagination with next_cursor"""
+	db_session.add(Meter(meter_id_code="TEST-002", meter_number="TEST-002", type="water", location_address="124 Test St", status="active"))
+	await db_session.commit()
+
+	headers = {"Authorization": f"Bearer {auth_token}"}
+	response = await client.get("/api/v1/meters", params={"limit": 1}, headers=headers)
+	assert response.status_code == 200
+	cursor = response.json()["next_cursor"]
+	assert cursor
+	seen = [response.json()["data"][0]["id"]]
+
+	# Every page handed out by a cursor holds rows; the last one has no next_cursor
+	while cursor:
+		response = await client.get("/api/v1/meters", params={"limit": 1, "cursor": cursor}, headers=headers)
+		assert response.status_code == 200
+		data = response.json()["data"]
+		assert len(data) == 1
+		assert data[0]["id"] not in seen
+		seen.append(data[0]["id"])
+		cursor = response.json()["next_cursor"]
+	assert str(test_meter.id) in seen
+
+	response = await client.get("/api/v1/meters", params={"cursor": "not-a-cursor"}, headers=headers)
+	assert response.status_code == 400
+
+
 @pytest.mark.asyncio
 async def test_get_meter(client: AsyncClient, test_meter: Meter, auth_token: str):
 	"""Test getting a specific meter"""